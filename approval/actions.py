@@ -1,14 +1,21 @@
 from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.http import HttpResponseRedirect
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
 
+from common.notifications import queue_mails
 from ordering.models import Order
 
+from .approve import (
+    APPROVED,
+    NOT_PROJECT_LEADER,
+    OLIGO_NOT_ALLOWED,
+    ORDER_NOT_ALLOWED,
+    bulk_approve,
+)
 from .models import Approval
 
 User = get_user_model()
@@ -20,100 +27,18 @@ SERVER_EMAIL_ADDRESS = getattr(settings, "SERVER_EMAIL_ADDRESS", "email@example.
 def approve_records(modeladmin, request, queryset):
     """Approve records"""
 
-    def approve_collection_model(approval):
-        """Approve a collection record that is not an oligo"""
-
-        obj = approval.content_object
-        if request.user.id in obj.formz_projects.all().values_list(
-            "project_leader__id", flat=True
-        ):
-            model = obj._meta.model
-            if approval.activity_type == "created":
-                if not obj.last_changed_approval_by_pi:
-                    model.objects.filter(id=obj.id).update(
-                        created_approval_by_pi=True,
-                        last_changed_approval_by_pi=True,
-                        approval_by_pi_date_time=now,
-                        approval_user=request.user,
-                    )
-                else:
-                    model.objects.filter(id=obj.id).update(
-                        created_approval_by_pi=True,
-                        approval_by_pi_date_time=now,
-                        approval_user=request.user,
-                    )
-            elif approval.activity_type == "changed":
-                model.objects.filter(id=obj.id).update(
-                    last_changed_approval_by_pi=True,
-                    approval_by_pi_date_time=now,
-                    approval_user=request.user,
-                )
-            approval.delete()
-            msg["success_message"] = True
-        else:
-            msg["warning_message"] = True
-
-    def approve_oligo(oligo_approval_record):
-        """Approve an oligo"""
-
-        oligo = oligo_approval_record.content_object
-        # New oligos
-        if oligo_approval_record.activity_type == "created":
-            if not oligo.last_changed_approval_by_pi:
-                oligo._meta.model.objects.filter(id=oligo.id).update(
-                    created_approval_by_pi=True,
-                    last_changed_approval_by_pi=True,
-                    approval_by_pi_date_time=now,
-                )
-            else:
-                oligo._meta.model.objects.filter(id=oligo.id).update(
-                    created_approval_by_pi=True,
-                    approval_by_pi_date_time=now,
-                )
-        # Existing changed oligos
-        elif oligo_approval_record.activity_type == "changed":
-            oligo._meta.model.objects.filter(id=oligo.id).update(
-                last_changed_approval_by_pi=True,
-                approval_by_pi_date_time=now,
-            )
-
-    now = timezone.now()
-    msg = {"success_message": False, "warning_message": False}
+    outcomes = bulk_approve(queryset, request.user)
 
-    # Collection records
-    collection_approvals = queryset.filter(content_type__app_label="collection")
-
-    # Collection records, except oligos
-    [
-        approve_collection_model(approval)
-        for approval in collection_approvals.exclude(content_type__model="oligo")
-    ]
-
-    # Oligos
-    if request.user.is_pi:
-        oligo_approvals = collection_approvals.filter(content_type__model="oligo")
-        if oligo_approvals.exists():
-            [approve_oligo(oligo_approval) for oligo_approval in oligo_approvals]
-            oligo_approvals.delete()
-            msg["success_message"] = True
-    else:
+    if outcomes.get(OLIGO_NOT_ALLOWED):
         messages.error(request, "You are not allowed to approve oligos")
 
-    # Orders
-    if request.user.is_pi:
-        order_approval_records = queryset.filter(content_type__app_label="ordering")
-        if order_approval_records:
-            order_ids = order_approval_records.values_list("object_id", flat=True)
-            Order.objects.filter(id__in=order_ids).update(created_approval_by_pi=True)
-            order_approval_records.delete()
-            msg["success_message"] = True
-    else:
+    if outcomes.get(ORDER_NOT_ALLOWED):
         messages.error(request, "You are not allowed to approve orders")
 
-    if msg["success_message"]:
+    if outcomes.get(APPROVED):
         messages.success(request, "The records have been approved")
 
-    if msg["warning_message"]:
+    if outcomes.get(NOT_PROJECT_LEADER):
         messages.warning(
             request,
             "Some/all of the records you have selected were not approved "
@@ -139,6 +64,7 @@ def notify_user_edits_required(modeladmin, request, queryset):
     else:
         user_ids = set(queryset.values_list("activity_user", flat=True))
         now = timezone.now()
+        mails = []
         for user_id in user_ids:
             user = User.objects.get(id=user_id)
             objs = queryset.filter(activity_user__id=user_id)
@@ -185,14 +111,16 @@ def notify_user_edits_required(modeladmin, request, queryset):
                 },
             )
 
-            send_mail(
-                "Some records that you have created or changed need your attention",
-                message_txt,
-                SERVER_EMAIL_ADDRESS,
-                [user.email],
-                html_message=message_html,
-                fail_silently=False,
+            mails.append(
+                (
+                    "Some records that you have created or changed need your attention",
+                    message_txt,
+                    SERVER_EMAIL_ADDRESS,
+                    [user.email],
+                    message_html,
+                )
             )
+        queue_mails(mails)
         messages.success(request, "Users have been notified of required edits")
         queryset.update(message_date_time=now, edited=False)
         return HttpResponseRedirect(".")
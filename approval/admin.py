@@ -1,4 +1,6 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.contenttypes.models import ContentType
 from django.urls import reverse
 from django.utils.safestring import mark_safe
 from django.utils.text import capfirst
@@ -6,6 +8,7 @@ from django.utils.text import capfirst
 from ordering.models import Order
 
 from .actions import approve_all_new_orders, approve_records, notify_user_edits_required
+from .facets import get_approval_facets
 from .search import (
     ActivityTypeFilter,
     ActivityUserFilter,
@@ -15,6 +18,15 @@ from .search import (
 )
 
 
+class ApprovalChangeList(ChangeList):
+    def get_results(self, request):
+        super().get_results(request)
+
+        # Load the records of the approvals shown with one query per record
+        # type, for record_link and history_link
+        self.result_list = self.result_list.prefetch_related("content_object")
+
+
 class ApprovalAdmin(admin.ModelAdmin):
     list_display = (
         "magnificent_id",
@@ -71,32 +83,43 @@ class ApprovalAdmin(admin.ModelAdmin):
                 request._set_post(post)
         return super().changelist_view(request, extra_context=extra_context)
 
+    def get_changelist(self, request, **kwargs):
+        return ApprovalChangeList
+
+    def is_approver_only(self, request):
+        """Whether the user is an approval manager but not a PI, who only
+        sees the approvals of collection records they can approve"""
+
+        return (
+            not (
+                request.user.is_pi
+                or request.user.is_superuser
+                or request.user.groups.filter(name="Lab manager").exists()
+            )
+            and request.user.groups.filter(name="Approval manager").exists()
+        )
+
     def get_queryset(self, request):
         qs = super().get_queryset(request)
 
         # If user is an approval manager but not a PI
         # show only collection items, not orders
-
-        if (
-            request.user.is_pi
-            or request.user.is_superuser
-            or request.user.groups.filter(name="Lab manager").exists()
-        ):
-            return qs
-        elif request.user.groups.filter(name="Approval manager").exists():
-            qs = qs.filter(content_type__app_label="collection").exclude(
-                content_type__model="oligo"
-            )
-            approval_record_ids = []
-            for approval_record in qs:
-                obj = approval_record.content_object
-                if request.user.id in obj.formz_projects.all().values_list(
-                    "project_leader__id", flat=True
-                ):
-                    approval_record_ids.append(approval_record.id)
-            return qs.filter(id__in=approval_record_ids)
-        else:
-            return qs
+        if self.is_approver_only(request):
+            # Only approvals of records of which the user is a project
+            # leader, from the approvers index
+            return qs.filter(
+                content_type__app_label="collection", approvers__user=request.user
+            ).exclude(content_type__model="oligo")
+        return qs
+
+    def get_approval_facets(self, request):
+        """Return the facets of the approvals the user sees, for the list
+        filters"""
+
+        return get_approval_facets(
+            self.get_queryset(request),
+            f"approver_{request.user.id}" if self.is_approver_only(request) else "all",
+        )
 
     @admin.display(description="Record")
     def record_link(self, instance):
@@ -134,7 +157,11 @@ class ApprovalAdmin(admin.ModelAdmin):
     def titled_content_type(self, instance):
         """Custom link to a record's history field for changelist_view"""
 
-        return capfirst(instance.content_type.model_class()._meta.verbose_name)
+        return capfirst(
+            ContentType.objects.get_for_id(instance.content_type_id)
+            .model_class()
+            ._meta.verbose_name
+        )
 
     @admin.display(description="Activity type", ordering="activity_type")
     def coloured_activity_type(self, instance):
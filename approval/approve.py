@@ -0,0 +1,100 @@
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Approval, ApprovalApprover
+
+# Outcomes of the approval of a record
+APPROVED = "approved"
+NOT_PROJECT_LEADER = "not project leader"
+OLIGO_NOT_ALLOWED = "oligo not allowed"
+ORDER_NOT_ALLOWED = "order not allowed"
+
+
+def get_outcome(user, app_label, model_name, is_approver):
+    """Return whether user can approve a record of a model or why not"""
+
+    if app_label == "ordering":
+        return APPROVED if user.is_pi else ORDER_NOT_ALLOWED
+    if model_name == "oligo":
+        return APPROVED if user.is_pi else OLIGO_NOT_ALLOWED
+    return APPROVED if is_approver else NOT_PROJECT_LEADER
+
+
+def get_approved_values(app_label, model_name, activity_type, user, now):
+    """Return the values of the approval fields of an approved record"""
+
+    if app_label == "ordering":
+        return {"created_approval_by_pi": True}
+
+    # A newly created record is approved as it is now, including changes
+    # made after its creation
+    values = {"last_changed_approval_by_pi": True, "approval_by_pi_date_time": now}
+    if activity_type == "created":
+        values["created_approval_by_pi"] = True
+    if model_name != "oligo":
+        values["approval_user"] = user
+    return values
+
+
+def bulk_approve(approvals, user):
+    """Approve the records of approvals that user can approve and delete
+    their approvals, in one transaction. The approvals are read with one
+    query, in which whether user is a project leader of a record comes
+    from the approvers index. Records are updated with one UPDATE per
+    model and activity type.
+
+    Returns the ids of the approvals by outcome"""
+
+    now = timezone.now()
+    rows = (
+        approvals.filter(content_type__app_label__in=["collection", "ordering"])
+        .annotate(
+            is_approver=Exists(
+                ApprovalApprover.objects.filter(approval=OuterRef("pk"), user=user)
+            )
+        )
+        .values_list(
+            "id",
+            "content_type_id",
+            "content_type__app_label",
+            "content_type__model",
+            "activity_type",
+            "object_id",
+            "is_approver",
+        )
+    )
+
+    outcomes = {}
+    approved_object_ids = {}
+    for (
+        approval_id,
+        content_type_id,
+        app_label,
+        model_name,
+        activity_type,
+        object_id,
+        is_approver,
+    ) in rows:
+        outcome = get_outcome(user, app_label, model_name, is_approver)
+        outcomes.setdefault(outcome, []).append(approval_id)
+        if outcome == APPROVED:
+            approved_object_ids.setdefault(
+                (content_type_id, app_label, model_name, activity_type), []
+            ).append(object_id)
+
+    with transaction.atomic():
+        for (
+            content_type_id,
+            app_label,
+            model_name,
+            activity_type,
+        ), object_ids in approved_object_ids.items():
+            model = ContentType.objects.get_for_id(content_type_id).model_class()
+            model.objects.filter(id__in=object_ids).update(
+                **get_approved_values(app_label, model_name, activity_type, user, now)
+            )
+        Approval.objects.filter(id__in=outcomes.get(APPROVED, [])).delete()
+
+    return outcomes
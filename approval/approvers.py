@@ -0,0 +1,165 @@
+from functools import cache
+
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from formz.models import Project
+
+from .facets import clear_approval_facets
+from .models import Approval, ApprovalApprover
+
+
+@cache
+def get_formz_project_models():
+    """Return the models whose records are approved by the project leaders
+    of their FormZ projects"""
+
+    return [
+        model
+        for model in apps.get_models()
+        if {"approval", "formz_projects"} <= {f.name for f in model._meta.get_fields()}
+    ]
+
+
+def get_m2m_field_names(field):
+    """Return the names of the foreign keys of the through model of a
+    many-to-many field, to its model and to the related model"""
+
+    return field.m2m_field_name(), field.m2m_reverse_field_name()
+
+
+def get_project_leader_ids(model, object_ids):
+    """Return the ids of the project leaders of the FormZ projects of
+    objects of model, by object id, read with one query"""
+
+    field = model._meta.get_field("formz_projects")
+    object_field_name, project_field_name = get_m2m_field_names(field)
+
+    project_leader_ids = {}
+    for object_id, user_id in field.remote_field.through.objects.filter(
+        **{
+            f"{object_field_name}_id__in": object_ids,
+            f"{project_field_name}__project_leader__isnull": False,
+        }
+    ).values_list(f"{object_field_name}_id", f"{project_field_name}__project_leader"):
+        project_leader_ids.setdefault(object_id, set()).add(user_id)
+
+    return project_leader_ids
+
+
+def refresh_approvers(approvals):
+    """Rewrite the approvers of approvals, reading the project leaders with
+    one query per model"""
+
+    approvals = list(approvals)
+    formz_project_models = get_formz_project_models()
+
+    approvals_by_content_type = {}
+    for approval in approvals:
+        approvals_by_content_type.setdefault(approval.content_type_id, []).append(
+            approval
+        )
+
+    approvers = []
+    for content_type_id, content_type_approvals in approvals_by_content_type.items():
+        model = ContentType.objects.get_for_id(content_type_id).model_class()
+        if model not in formz_project_models:
+            continue
+        project_leader_ids = get_project_leader_ids(
+            model, [approval.object_id for approval in content_type_approvals]
+        )
+        approvers.extend(
+            ApprovalApprover(approval=approval, user_id=user_id)
+            for approval in content_type_approvals
+            for user_id in project_leader_ids.get(approval.object_id, [])
+        )
+
+    with transaction.atomic():
+        ApprovalApprover.objects.filter(
+            approval_id__in=[approval.id for approval in approvals]
+        ).delete()
+        ApprovalApprover.objects.bulk_create(approvers)
+
+    # The approvals that approval managers see may have changed
+    clear_approval_facets()
+
+
+def refresh_object_approvers(model, object_ids):
+    """Rewrite the approvers of the approvals of objects of model"""
+
+    refresh_approvers(
+        Approval.objects.filter(
+            content_type=ContentType.objects.get_for_model(model),
+            object_id__in=object_ids,
+        )
+    )
+
+
+def refresh_project_approvers(project_ids):
+    """Rewrite the approvers of the approvals of the records of FormZ
+    projects"""
+
+    for model in get_formz_project_models():
+        field = model._meta.get_field("formz_projects")
+        object_field_name, project_field_name = get_m2m_field_names(field)
+        refresh_object_approvers(
+            model,
+            field.remote_field.through.objects.filter(
+                **{f"{project_field_name}_id__in": project_ids}
+            ).values(f"{object_field_name}_id"),
+        )
+
+
+def approval_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        refresh_approvers([instance])
+
+
+def formz_projects_changed(sender, instance, action, reverse, model, pk_set, **kwargs):
+    """Rewrite the approvers of records whose FormZ projects changed"""
+
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_object_approvers(instance.__class__, [instance.pk])
+        return
+
+    # The records of a project changed, pk_set are the ids of the records
+    object_field_name, project_field_name = get_m2m_field_names(
+        model._meta.get_field("formz_projects")
+    )
+    if action == "pre_clear":
+        instance._approver_object_ids = list(
+            sender.objects.filter(
+                **{f"{project_field_name}_id": instance.pk}
+            ).values_list(f"{object_field_name}_id", flat=True)
+        )
+    elif action in ("post_add", "post_remove"):
+        refresh_object_approvers(model, pk_set)
+    elif action == "post_clear":
+        refresh_object_approvers(model, instance.__dict__.pop("_approver_object_ids"))
+
+
+def project_leader_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    """Rewrite the approvers of the records of projects whose project
+    leaders changed"""
+
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_project_approvers([instance.pk])
+        return
+
+    # The projects of a user changed, pk_set are the ids of the projects
+    project_field_name, user_field_name = get_m2m_field_names(
+        Project._meta.get_field("project_leader")
+    )
+    if action == "pre_clear":
+        instance._approver_project_ids = list(
+            sender.objects.filter(**{f"{user_field_name}_id": instance.pk}).values_list(
+                f"{project_field_name}_id", flat=True
+            )
+        )
+    elif action in ("post_add", "post_remove"):
+        refresh_project_approvers(pk_set)
+    elif action == "post_clear":
+        refresh_project_approvers(instance.__dict__.pop("_approver_project_ids"))
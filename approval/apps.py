@@ -1,5 +1,34 @@
 from django.apps import AppConfig
+from django.db.models.signals import m2m_changed, post_delete, post_save
 
 
 class RecordApprovalConfig(AppConfig):
     name = "approval"
+
+    def ready(self):
+        from formz.models import Project
+
+        from .approvers import (
+            approval_saved,
+            formz_projects_changed,
+            get_formz_project_models,
+            project_leader_changed,
+        )
+        from .facets import invalidate_approval_facets
+        from .models import Approval
+
+        # Keep the approvers of approvals in step with the FormZ projects
+        # of their records and the project leaders of those projects
+        post_save.connect(approval_saved, sender=Approval)
+        for model in get_formz_project_models():
+            m2m_changed.connect(
+                formz_projects_changed, sender=model.formz_projects.through
+            )
+        m2m_changed.connect(
+            project_leader_changed, sender=Project.project_leader.through
+        )
+
+        # Recompute the filter options of the approval changelist when
+        # approvals are created or deleted
+        post_save.connect(invalidate_approval_facets, sender=Approval)
+        post_delete.connect(invalidate_approval_facets, sender=Approval)
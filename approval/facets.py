@@ -0,0 +1,86 @@
+from uuid import uuid4
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.db.models import Count
+from django.utils.text import capfirst
+
+User = get_user_model()
+APPROVAL_FACETS_CACHE_TIMEOUT = getattr(settings, "APPROVAL_FACETS_CACHE_TIMEOUT", 300)
+APPROVAL_FACETS_CACHE_KEY = "approval_facets"
+# Changed to invalidate the facets of all scopes at once
+APPROVAL_FACETS_VERSION_CACHE_KEY = "approval_facets_version"
+
+
+def compute_approval_facets(approvals):
+    """Return the record types and the activity users of approvals, as
+    lists of id, label and number of approvals, counted with one grouped
+    query"""
+
+    content_type_counts = {}
+    activity_user_counts = {}
+    for content_type_id, activity_user_id, count in (
+        approvals.order_by()
+        .values_list("content_type_id", "activity_user_id")
+        .annotate(count=Count("id"))
+    ):
+        content_type_counts[content_type_id] = (
+            content_type_counts.get(content_type_id, 0) + count
+        )
+        activity_user_counts[activity_user_id] = (
+            activity_user_counts.get(activity_user_id, 0) + count
+        )
+
+    content_types = sorted(
+        (
+            (ContentType.objects.get_for_id(content_type_id), count)
+            for content_type_id, count in content_type_counts.items()
+        ),
+        key=lambda facet: facet[0].model,
+    )
+    users = User.objects.filter(id__in=activity_user_counts).order_by("last_name")
+
+    return {
+        "content_types": [
+            (
+                content_type.id,
+                capfirst(content_type.model_class()._meta.verbose_name),
+                count,
+            )
+            for content_type, count in content_types
+        ],
+        "activity_users": [
+            (user.id, str(user), activity_user_counts[user.id]) for user in users
+        ],
+    }
+
+
+def get_approval_facets(approvals, scope):
+    """Return the facets of approvals from the cache if they have not
+    changed since they were last computed. scope names the approvals,
+    e.g. all or those an approval manager can see, and keys the cache"""
+
+    version = cache.get(APPROVAL_FACETS_VERSION_CACHE_KEY)
+    if version is None:
+        version = uuid4().hex
+        cache.set(APPROVAL_FACETS_VERSION_CACHE_KEY, version, None)
+
+    cache_key = f"{APPROVAL_FACETS_CACHE_KEY}_{version}_{scope}"
+    facets = cache.get(cache_key)
+    if facets is None:
+        facets = compute_approval_facets(approvals)
+        cache.set(cache_key, facets, APPROVAL_FACETS_CACHE_TIMEOUT)
+    return facets
+
+
+def clear_approval_facets():
+    """Invalidate the facets of all scopes"""
+
+    cache.delete(APPROVAL_FACETS_VERSION_CACHE_KEY)
+
+
+def invalidate_approval_facets(sender, **kwargs):
+    if kwargs.get("created", True) and not kwargs.get("raw", False):
+        clear_approval_facets()
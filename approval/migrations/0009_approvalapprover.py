@@ -0,0 +1,55 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("approval", "0008_rename_recordtobeapproved_approval_and_more"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ApprovalApprover",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "approval",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="approvers",
+                        to="approval.approval",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "approval approver",
+                "verbose_name_plural": "approval approvers",
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="approvalapprover",
+            constraint=models.UniqueConstraint(
+                fields=("user", "approval"), name="unique_approval_approver"
+            ),
+        ),
+    ]
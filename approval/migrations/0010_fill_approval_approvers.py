@@ -0,0 +1,56 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db import migrations
+
+
+def fill_approval_approvers(apps, schema_editor):
+    # Existing approvals get their approvers, the project leaders of the
+    # FormZ projects of their records, read with one query per model
+    Approval = apps.get_model("approval", "Approval")
+    ApprovalApprover = apps.get_model("approval", "ApprovalApprover")
+    ContentType = apps.get_model("contenttypes", "ContentType")
+
+    approvers = []
+    for content_type in ContentType.objects.filter(
+        id__in=Approval.objects.values("content_type_id")
+    ):
+        try:
+            model = apps.get_model(content_type.app_label, content_type.model)
+            field = model._meta.get_field("formz_projects")
+        except (LookupError, FieldDoesNotExist):
+            continue
+
+        approvals = Approval.objects.filter(content_type=content_type)
+        object_field_name = field.m2m_field_name()
+        project_field_name = field.m2m_reverse_field_name()
+        project_leader_ids = {}
+        for object_id, user_id in field.remote_field.through.objects.filter(
+            **{
+                f"{object_field_name}_id__in": approvals.values("object_id"),
+                f"{project_field_name}__project_leader__isnull": False,
+            }
+        ).values_list(
+            f"{object_field_name}_id", f"{project_field_name}__project_leader"
+        ):
+            project_leader_ids.setdefault(object_id, set()).add(user_id)
+
+        approvers.extend(
+            ApprovalApprover(approval_id=approval_id, user_id=user_id)
+            for approval_id, object_id in approvals.values_list("id", "object_id")
+            for user_id in project_leader_ids.get(object_id, ())
+        )
+
+    ApprovalApprover.objects.bulk_create(approvers, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("approval", "0009_approvalapprover"),
+        ("collection", "0254_map_missing_features"),
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("formz", "0089_rename_projectusers_projectuser"),
+        ("ordering", "0062_reset_id_sequences"),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_approval_approvers, migrations.RunPython.noop),
+    ]
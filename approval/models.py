@@ -25,3 +25,23 @@ class Approval(models.Model):
     class Meta:
         verbose_name = "approval"
         verbose_name_plural = "approvals"
+
+
+class ApprovalApprover(models.Model):
+    """A project leader of one of the FormZ projects of the record of an
+    approval, who can approve it. Kept up to date by the signal handlers
+    in approval.approvers"""
+
+    approval = models.ForeignKey(
+        Approval, on_delete=models.CASCADE, related_name="approvers"
+    )
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        verbose_name = "approval approver"
+        verbose_name_plural = "approval approvers"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "approval"], name="unique_approval_approver"
+            )
+        ]
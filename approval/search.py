@@ -1,12 +1,8 @@
 from django.contrib import admin
-from django.contrib.auth import get_user_model
-from django.contrib.contenttypes.models import ContentType
 from django.utils.text import capfirst
 
 from .models import Approval
 
-User = get_user_model()
-
 
 class ContentTypeFilter(admin.SimpleListFilter):
     title = "record type"
@@ -17,23 +13,12 @@ class ContentTypeFilter(admin.SimpleListFilter):
     def lookups(self, request, model_admin):
         """Show only models for which records to be approved exist"""
 
-        list_of_models = []
-        for content_type_id in (
-            Approval.objects.all()
-            .values_list("content_type__id", "content_type__model")
-            .distinct()
-            .order_by("content_type__model")
-            .values_list("content_type__id", flat=True)
-        ):
-            content_type_obj = ContentType.objects.get(id=content_type_id)
-            list_of_models.append(
-                (
-                    str(content_type_id),
-                    capfirst(content_type_obj.model_class()._meta.verbose_name),
-                )
-            )
-
-        return tuple(list_of_models)
+        return tuple(
+            (str(content_type_id), f"{label} ({count})")
+            for content_type_id, label, count in model_admin.get_approval_facets(
+                request
+            )["content_types"]
+        )
 
     def queryset(self, request, queryset):
         """
@@ -83,16 +68,13 @@ class ActivityUserFilter(admin.SimpleListFilter):
     def lookups(self, request, model_admin):
         """Show only models for which records to be approved exist"""
 
-        user_ids = (
-            Approval.objects.all().values_list("activity_user", flat=True).distinct()
-        )
-        users = User.objects.filter(id__in=user_ids).order_by("last_name")
+        users = model_admin.get_approval_facets(request)["activity_users"]
 
         # Set template to dropdown menu rather than plan list if > 5 users
-        if users.count() > 5:
+        if len(users) > 5:
             self.template = "admin/dropdown_filter.html"
 
-        return tuple((u.id, u) for u in users)
+        return tuple((user_id, f"{label} ({count})") for user_id, label, count in users)
 
     def queryset(self, request, queryset):
         """
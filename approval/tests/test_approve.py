@@ -0,0 +1,246 @@
+import datetime
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TestCase
+
+from collection.models import Oligo, Plasmid
+from formz.models import Project
+from ordering.models import Order
+
+from ..approve import (
+    APPROVED,
+    NOT_PROJECT_LEADER,
+    OLIGO_NOT_ALLOWED,
+    ORDER_NOT_ALLOWED,
+    bulk_approve,
+)
+from ..models import Approval
+
+User = get_user_model()
+NOW = datetime.datetime(2024, 1, 31, 12, tzinfo=datetime.UTC)
+
+
+def approve_one_by_one(approvals, user):
+    """The per-approval loop of the approve_records action that
+    bulk_approve replaced, without its messages"""
+
+    collection_approvals = approvals.filter(content_type__app_label="collection")
+    for approval in collection_approvals.exclude(content_type__model="oligo"):
+        obj = approval.content_object
+        if user.id not in obj.formz_projects.all().values_list(
+            "project_leader__id", flat=True
+        ):
+            continue
+        values = {"approval_by_pi_date_time": NOW, "approval_user": user}
+        if approval.activity_type == "created":
+            values["created_approval_by_pi"] = True
+            if not obj.last_changed_approval_by_pi:
+                values["last_changed_approval_by_pi"] = True
+        elif approval.activity_type == "changed":
+            values["last_changed_approval_by_pi"] = True
+        obj._meta.model.objects.filter(id=obj.id).update(**values)
+        approval.delete()
+
+    if not user.is_pi:
+        return
+
+    oligo_approvals = collection_approvals.filter(content_type__model="oligo")
+    for approval in oligo_approvals:
+        oligo = approval.content_object
+        values = {"approval_by_pi_date_time": NOW}
+        if approval.activity_type == "created":
+            values["created_approval_by_pi"] = True
+            if not oligo.last_changed_approval_by_pi:
+                values["last_changed_approval_by_pi"] = True
+        elif approval.activity_type == "changed":
+            values["last_changed_approval_by_pi"] = True
+        Oligo.objects.filter(id=oligo.id).update(**values)
+    oligo_approvals.delete()
+
+    order_approvals = approvals.filter(content_type__app_label="ordering")
+    Order.objects.filter(
+        id__in=order_approvals.values_list("object_id", flat=True)
+    ).update(created_approval_by_pi=True)
+    order_approvals.delete()
+
+
+class Rollback(Exception):
+    pass
+
+
+class BulkApproveTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.pi_leader = User.objects.create(username="pi_leader", is_pi=True)
+        cls.pi = User.objects.create(username="pi", is_pi=True)
+        cls.leader = User.objects.create(username="leader")
+        cls.user = User.objects.create(username="user")
+
+        project = Project.objects.create(
+            title="Project", short_title="Project", short_title_english="Project"
+        )
+        project.project_leader.add(cls.pi_leader, cls.leader)
+        other_project = Project.objects.create(
+            title="Other", short_title="Other", short_title_english="Other"
+        )
+        other_project.project_leader.add(cls.pi)
+
+        cls.created_plasmid = cls.create_plasmid("created", project)
+        cls.changed_plasmid = cls.create_plasmid("changed", project)
+        cls.other_plasmid = cls.create_plasmid("created", other_project)
+        cls.no_project_plasmid = cls.create_plasmid("changed")
+
+        cls.created_oligo = cls.create_oligo("created", "ACGTACGTACGTACGTACGT")
+        cls.changed_oligo = cls.create_oligo(
+            "changed", "TTTTACGTACGTACGTACGT", last_changed_approval_by_pi=False
+        )
+        # Changed and approved before its creation was approved
+        cls.approved_change_oligo = cls.create_oligo(
+            "created", "GGGGACGTACGTACGTACGT", last_changed_approval_by_pi=True
+        )
+
+        cls.order = Order.objects.create(
+            supplier="Supplier",
+            supplier_part_no="1",
+            part_description="Part",
+            quantity="1",
+            cost_unit=None,
+            created_by=cls.user,
+        )
+        cls.order.approval.create(activity_type="created", activity_user=cls.user)
+
+    @classmethod
+    def create_plasmid(cls, activity_type, *projects):
+        plasmid = Plasmid.objects.create(
+            name=f"p{activity_type}{Plasmid.objects.count()}",
+            selection="Amp",
+            created_by=cls.user,
+        )
+        plasmid.formz_projects.add(*projects)
+        plasmid.approval.create(activity_type=activity_type, activity_user=cls.user)
+        return plasmid
+
+    @classmethod
+    def create_oligo(cls, activity_type, sequence, **kwargs):
+        oligo = Oligo.objects.create(
+            name=f"o{sequence[:4]}", sequence=sequence, created_by=cls.user, **kwargs
+        )
+        oligo.approval.create(activity_type=activity_type, activity_user=cls.user)
+        return oligo
+
+    def get_state(self):
+        """The approval fields of all records and the remaining approvals"""
+
+        fields = [
+            "created_approval_by_pi",
+            "last_changed_approval_by_pi",
+            "approval_by_pi_date_time",
+        ]
+        return {
+            "plasmids": list(
+                Plasmid.objects.order_by("id").values_list(
+                    "id", *fields, "approval_user"
+                )
+            ),
+            "oligos": list(Oligo.objects.order_by("id").values_list("id", *fields)),
+            "orders": list(
+                Order.objects.order_by("id").values_list("id", "created_approval_by_pi")
+            ),
+            "approvals": set(Approval.objects.values_list("id", flat=True)),
+        }
+
+    def state_after(self, approve, user):
+        """Return the state after approving all approvals as user, then
+        roll back"""
+
+        try:
+            with (
+                transaction.atomic(),
+                mock.patch("django.utils.timezone.now", return_value=NOW),
+            ):
+                approve(Approval.objects.all(), user)
+                state = self.get_state()
+                raise Rollback
+        except Rollback:
+            return state
+
+    def get_approval_ids(self, *objs):
+        return sorted(approval.id for obj in objs for approval in obj.approval.all())
+
+    def assertSameState(self, user):
+        old_state = self.state_after(approve_one_by_one, user)
+        self.assertEqual(self.state_after(bulk_approve, user), old_state)
+        return old_state
+
+    def test_pi_project_leader(self):
+        state = self.assertSameState(self.pi_leader)
+
+        self.assertEqual(
+            state["approvals"],
+            set(self.get_approval_ids(self.other_plasmid, self.no_project_plasmid)),
+        )
+        self.assertIn(
+            (self.created_plasmid.id, True, True, NOW, self.pi_leader.id),
+            state["plasmids"],
+        )
+        self.assertIn(
+            (self.changed_plasmid.id, False, True, NOW, self.pi_leader.id),
+            state["plasmids"],
+        )
+        self.assertIn((self.approved_change_oligo.id, True, True, NOW), state["oligos"])
+        self.assertEqual(state["orders"], [(self.order.id, True)])
+
+    def test_pi(self):
+        state = self.assertSameState(self.pi)
+
+        self.assertEqual(
+            state["approvals"],
+            set(
+                self.get_approval_ids(
+                    self.created_plasmid, self.changed_plasmid, self.no_project_plasmid
+                )
+            ),
+        )
+
+    def test_project_leader(self):
+        state = self.assertSameState(self.leader)
+
+        self.assertEqual(
+            state["approvals"],
+            set(
+                self.get_approval_ids(
+                    self.other_plasmid,
+                    self.no_project_plasmid,
+                    self.created_oligo,
+                    self.changed_oligo,
+                    self.approved_change_oligo,
+                    self.order,
+                )
+            ),
+        )
+
+    def test_user(self):
+        state = self.assertSameState(self.user)
+
+        self.assertEqual(state["approvals"], self.get_state()["approvals"])
+
+    def test_outcomes(self):
+        outcomes = bulk_approve(Approval.objects.all(), self.leader)
+
+        self.assertEqual(
+            {outcome: sorted(ids) for outcome, ids in outcomes.items()},
+            {
+                APPROVED: self.get_approval_ids(
+                    self.created_plasmid, self.changed_plasmid
+                ),
+                NOT_PROJECT_LEADER: self.get_approval_ids(
+                    self.other_plasmid, self.no_project_plasmid
+                ),
+                OLIGO_NOT_ALLOWED: self.get_approval_ids(
+                    self.created_oligo, self.changed_oligo, self.approved_change_oligo
+                ),
+                ORDER_NOT_ALLOWED: self.get_approval_ids(self.order),
+            },
+        )
@@ -1,5 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
 
 
 class CollectionManagementConfig(AppConfig):
     name = "collection"
+
+    def ready(self):
+        from .oligo.models import Oligo
+        from .oligo.primer_library import oligo_changed
+
+        # Keep the primer library used to find oligos in maps up to date
+        post_save.connect(oligo_changed, sender=Oligo)
+        post_delete.connect(oligo_changed, sender=Oligo)
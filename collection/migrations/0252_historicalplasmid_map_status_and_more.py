@@ -0,0 +1,53 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0251_alter_cellline_sequence_features_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalplasmid',
+            name='map_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='', max_length=10, verbose_name='map status'),
+        ),
+        migrations.AddField(
+            model_name='historicalplasmid',
+            name='map_status_message',
+            field=models.TextField(blank=True, verbose_name='map status message'),
+        ),
+        migrations.AddField(
+            model_name='historicalwormstrainallele',
+            name='map_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='', max_length=10, verbose_name='map status'),
+        ),
+        migrations.AddField(
+            model_name='historicalwormstrainallele',
+            name='map_status_message',
+            field=models.TextField(blank=True, verbose_name='map status message'),
+        ),
+        migrations.AddField(
+            model_name='plasmid',
+            name='map_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='', max_length=10, verbose_name='map status'),
+        ),
+        migrations.AddField(
+            model_name='plasmid',
+            name='map_status_message',
+            field=models.TextField(blank=True, verbose_name='map status message'),
+        ),
+        migrations.AddField(
+            model_name='wormstrainallele',
+            name='map_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('failed', 'Failed')], default='', max_length=10, verbose_name='map status'),
+        ),
+        migrations.AddField(
+            model_name='wormstrainallele',
+            name='map_status_message',
+            field=models.TextField(blank=True, verbose_name='map status message'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+from django.core.management.color import no_style
+from django.db import migrations
+
+
+def reset_id_sequences(apps, schema_editor):
+    # Ids used to be assigned as the largest id plus one, without the
+    # sequences, which are now used to allocate them
+    connection = schema_editor.connection
+    models = apps.get_app_config("collection").get_models()
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("collection", "0252_historicalplasmid_map_status_and_more"),
+    ]
+
+    operations = [
+        migrations.RunPython(reset_id_sequences, migrations.RunPython.noop),
+    ]
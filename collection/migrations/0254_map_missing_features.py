@@ -0,0 +1,34 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:14
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0253_reset_id_sequences'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='historicalplasmid',
+            name='map_missing_features',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None, verbose_name='missing map features'),
+        ),
+        migrations.AddField(
+            model_name='historicalwormstrainallele',
+            name='map_missing_features',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None, verbose_name='missing map features'),
+        ),
+        migrations.AddField(
+            model_name='plasmid',
+            name='map_missing_features',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None, verbose_name='missing map features'),
+        ),
+        migrations.AddField(
+            model_name='wormstrainallele',
+            name='map_missing_features',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=255), blank=True, default=list, size=None, verbose_name='missing map features'),
+        ),
+    ]
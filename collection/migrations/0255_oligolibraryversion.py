@@ -0,0 +1,28 @@
+# Generated by Django 4.2.17 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+def create_oligo_library_version(apps, schema_editor):
+    apps.get_model("collection", "OligoLibraryVersion").objects.create(id=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('collection', '0254_map_missing_features'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OligoLibraryVersion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name': 'oligo library version',
+            },
+        ),
+        migrations.RunPython(create_oligo_library_version, migrations.RunPython.noop),
+    ]
@@ -7,7 +7,7 @@ from .cellline.models import (
 )
 from .ecolistrain.models import EColiStrain, EColiStrainDoc, HistoricalEColiStrain
 from .inhibitor.models import HistoricalInhibitor, Inhibitor, InhibitorDoc
-from .oligo.models import HistoricalOligo, Oligo, OligoDoc
+from .oligo.models import HistoricalOligo, Oligo, OligoDoc, OligoLibraryVersion
 from .plasmid.models import HistoricalPlasmid, Plasmid, PlasmidDoc
 from .sacerevisiaestrain.models import (
     HistoricalSaCerevisiaeStrain,
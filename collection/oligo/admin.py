@@ -5,10 +5,11 @@ from common.admin import (
     AddDocFileInlineMixin,
     DocFileInlineMixin,
 )
+from common.id_allocation import allocate_id
 
 from ..shared.admin import (
     CollectionUserProtectionAdmin,
-    rename_info_sheet_save_obj_update_history,
+    name_info_sheet_before_save,
 )
 from .actions import export_oligo
 from .forms import OligoAdminForm
@@ -83,32 +84,19 @@ class OligoAdmin(
     ]
 
     def save_model(self, request, obj, form, change):
-        rename_doc = False
-        new_obj = False
-
         if obj.pk is None:
-            obj.id = (
-                self.model.objects.order_by("-id").first().id + 1
-                if self.model.objects.exists()
-                else 1
-            )
+            obj.id = allocate_id(self.model)
             obj.created_by = request.user
             if obj.info_sheet:
-                rename_doc = True
-                new_obj = True
-            obj.save()
+                name_info_sheet_before_save(obj)
 
             # If the request's user is the principal investigator, approve
             # the record right away. If not, create an approval record
             if request.user.is_pi:
-                original_last_changed_date_time = obj.last_changed_date_time
                 obj.created_approval_by_pi = True
                 obj.approval_by_pi_date_time = timezone.now()
-                obj.save_without_historical_record()
-                self.model.objects.filter(id=obj.pk).update(
-                    last_changed_date_time=original_last_changed_date_time
-                )
-            else:
+            obj.save()
+            if not request.user.is_pi:
                 obj.approval.create(activity_type="created", activity_user=request.user)
 
         else:
@@ -157,14 +145,8 @@ class OligoAdmin(
 
             saved_obj = self.model.objects.get(pk=obj.pk)
             if obj.info_sheet and obj.info_sheet != saved_obj.info_sheet:
-                rename_doc = True
-                obj.save_without_historical_record()
-            else:
-                obj.save()
-
-        # Rename info_sheet
-        if rename_doc:
-            rename_info_sheet_save_obj_update_history(obj, new_obj)
+                name_info_sheet_before_save(obj)
+            obj.save()
 
     @admin.display(description="Sequence")
     def get_oligo_short_sequence(self, instance):
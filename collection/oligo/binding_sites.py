@@ -0,0 +1,237 @@
+import json
+import threading
+
+from django.conf import settings
+
+from ..shared.genbank import format_feature, format_location
+from .primer_library import PRIMER_NAME_PREFIX, get_primer_library_path
+
+# An oligo binds a sequence if the last BINDING_SEED_LENGTH nucleotides of its
+# 3' end match exactly and, including those, at least BINDING_MIN_MATCHES of
+# its nucleotides anneal with no more than BINDING_MAX_MISMATCHES mismatches.
+# Unmatched 5' nucleotides, e.g. restriction site tails, are allowed
+BINDING_SEED_LENGTH = getattr(settings, "BINDING_SEED_LENGTH", 12)
+BINDING_MIN_MATCHES = getattr(settings, "BINDING_MIN_MATCHES", 15)
+BINDING_MAX_MISMATCHES = getattr(settings, "BINDING_MAX_MISMATCHES", 2)
+
+# Scores used to decide where the annealed part of an oligo ends
+MATCH_SCORE = 1
+MISMATCH_SCORE = -3
+X_DROP = 6
+
+COMPLEMENT = str.maketrans("ACGTacgtNn", "TGCAtgcaNn")
+
+_index = None
+_index_path = None
+_index_lock = threading.Lock()
+
+
+def reverse_complement(sequence):
+    return sequence.translate(COMPLEMENT)[::-1]
+
+
+class BindingSite:
+    def __init__(self, oligo_id, oligo_sequence, start, end, strand, mismatches):
+        self.oligo_id = oligo_id
+        self.oligo_sequence = oligo_sequence
+        # 0-based, end-exclusive coordinates on the forward strand. For
+        # circular sequences, end can be larger than the sequence length
+        self.start = start
+        self.end = end
+        self.strand = strand
+        self.mismatches = mismatches
+
+    @property
+    def name(self):
+        return f"{PRIMER_NAME_PREFIX}{self.oligo_id}"
+
+    @property
+    def annealed_length(self):
+        return self.end - self.start
+
+    @property
+    def exact(self):
+        return self.mismatches == 0 and self.annealed_length == len(self.oligo_sequence)
+
+
+class OligoSeedIndex:
+    """Index of oligos by the k-mer at their 3' end"""
+
+    def __init__(self, oligos, seed_length=BINDING_SEED_LENGTH):
+        self.seed_length = seed_length
+        self.seeds = {}
+        self.max_oligo_length = 0
+
+        for oligo_id, sequence in oligos:
+            sequence = sequence.upper()
+            if len(sequence) < seed_length:
+                continue
+            self.seeds.setdefault(sequence[-seed_length:], []).append(
+                (oligo_id, sequence)
+            )
+            self.max_oligo_length = max(self.max_oligo_length, len(sequence))
+
+    def __len__(self):
+        return sum(len(oligos) for oligos in self.seeds.values())
+
+    def extend(self, template, seed_start, oligo_sequence):
+        """Extend a seed hit towards the 5' end of an oligo. Returns the
+        start of the annealed part on the template and its mismatches"""
+
+        seed_length = self.seed_length
+        offset = seed_start - (len(oligo_sequence) - seed_length)
+
+        score = best_score = seed_length * MATCH_SCORE
+        best_start = seed_start
+        mismatches = best_mismatches = 0
+
+        for i in range(len(oligo_sequence) - seed_length - 1, -1, -1):
+            template_position = offset + i
+            if template_position < 0:
+                break
+            if template[template_position] == oligo_sequence[i]:
+                score += MATCH_SCORE
+            else:
+                mismatches += 1
+                if mismatches > BINDING_MAX_MISMATCHES:
+                    break
+                score += MISMATCH_SCORE
+            if score > best_score:
+                best_score = score
+                best_start = template_position
+                best_mismatches = mismatches
+            elif best_score - score > X_DROP:
+                break
+
+        return best_start, best_mismatches
+
+    def search_strand(self, template):
+        """Find binding sites on one strand of a template. Returns
+        (oligo ID, oligo sequence, start, end, mismatches)"""
+
+        seed_length = self.seed_length
+        seeds = self.seeds
+        hits = []
+
+        for seed_start in range(len(template) - seed_length + 1):
+            oligos = seeds.get(template[seed_start : seed_start + seed_length])
+            if not oligos:
+                continue
+            end = seed_start + seed_length
+            for oligo_id, oligo_sequence in oligos:
+                start, mismatches = self.extend(template, seed_start, oligo_sequence)
+                if end - start - mismatches >= BINDING_MIN_MATCHES:
+                    hits.append((oligo_id, oligo_sequence, start, end, mismatches))
+
+        return hits
+
+    def find_binding_sites(self, sequence, circular=False):
+        """Find the binding sites of all oligos on both strands of a
+        sequence"""
+
+        sequence = sequence.upper()
+        length = len(sequence)
+        if not length:
+            return []
+
+        # For circular sequences, also find oligos that bind across the origin
+        wrap_length = min(max(self.max_oligo_length - 1, 0), length) if circular else 0
+
+        binding_sites = []
+        for strand, strand_sequence in (
+            (1, sequence),
+            (-1, reverse_complement(sequence)),
+        ):
+            template = (
+                strand_sequence[length - wrap_length :]
+                + strand_sequence
+                + strand_sequence[:wrap_length]
+            )
+            for oligo_id, oligo_sequence, start, end, mismatches in self.search_strand(
+                template
+            ):
+                # Only keep sites whose 3' end is in the sequence itself, those
+                # ending in the wrapped parts are duplicates
+                start, end = start - wrap_length, end - wrap_length
+                if not 0 < end <= length:
+                    continue
+
+                # Convert coordinates on the reverse strand to the forward strand
+                if strand == -1:
+                    start, end = length - end, length - start
+                elif start < 0:
+                    start, end = start + length, end + length
+
+                binding_sites.append(
+                    BindingSite(
+                        oligo_id, oligo_sequence, start, end, strand, mismatches
+                    )
+                )
+
+        return sorted(binding_sites, key=lambda b: (b.start, b.strand, b.oligo_id))
+
+
+def get_oligo_index():
+    """Return the seed index for the current version of the primer library.
+    The index is built once per version and process"""
+
+    global _index, _index_path
+
+    library_path = get_primer_library_path()
+
+    with _index_lock:
+        if _index is None or _index_path != library_path:
+            with open(library_path) as fhandle:
+                primers = json.load(fhandle)
+            _index = OligoSeedIndex(
+                (int(p["Name"][len(PRIMER_NAME_PREFIX) :]), p["Sequence"])
+                for p in primers
+            )
+            _index_path = library_path
+
+    return _index
+
+
+def binding_sites_as_genbank_features(binding_sites, sequence_length):
+    """Format binding sites as GenBank primer_bind features"""
+
+    lines = []
+    for binding_site in binding_sites:
+        lines.extend(
+            format_feature(
+                "primer_bind",
+                format_location(
+                    binding_site.start,
+                    binding_site.end,
+                    binding_site.strand,
+                    sequence_length,
+                ),
+                {
+                    "label": binding_site.name,
+                    "note": f"sequence: {binding_site.oligo_sequence}; "
+                    f"mismatches: {binding_site.mismatches}",
+                },
+            )
+        )
+    return lines
+
+
+def binding_sites_as_json(binding_sites, sequence_length):
+    """Format binding sites as primers for OVE, whose coordinates
+    are 0-based and inclusive"""
+
+    return [
+        {
+            "name": binding_site.name,
+            "oligo_id": binding_site.oligo_id,
+            "start": binding_site.start,
+            "end": (binding_site.end - 1) % sequence_length,
+            "strand": binding_site.strand,
+            "forward": binding_site.strand == 1,
+            "type": "primer_bind",
+            "bases": binding_site.oligo_sequence,
+            "mismatches": binding_site.mismatches,
+            "exact": binding_site.exact,
+        }
+        for binding_site in binding_sites
+    ]
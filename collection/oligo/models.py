@@ -108,3 +108,14 @@ class Oligo(
         self.length = len(self.sequence)
 
         super().save(force_insert, force_update, using, update_fields)
+
+
+class OligoLibraryVersion(models.Model):
+    """The number of changes made to oligos, kept in a single row. The
+    primer library records the version it was built from, so that it is
+    known to be out of date without reading all oligos"""
+
+    class Meta:
+        verbose_name = "oligo library version"
+
+    version = models.PositiveBigIntegerField(default=0)
@@ -0,0 +1,258 @@
+import fcntl
+import json
+import os
+import re
+import time
+from contextlib import contextmanager
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Collate
+
+from .models import Oligo, OligoLibraryVersion
+
+BASE_DIR = settings.BASE_DIR
+LAB_ABBREVIATION_FOR_FILES = getattr(settings, "LAB_ABBREVIATION_FOR_FILES", "")
+PRIMER_LIBRARY_DIR = getattr(
+    settings, "PRIMER_LIBRARY_DIR", os.path.join(BASE_DIR, "uploads/primer_library")
+)
+# Old versions are kept for a while, because they may still be in use
+# by a SnapGene server
+PRIMER_LIBRARY_KEEP_OLD_SECONDS = getattr(
+    settings, "PRIMER_LIBRARY_KEEP_OLD_SECONDS", 600
+)
+PRIMER_MIN_LENGTH = 15
+
+PRIMER_NAME_PREFIX = f"! o{LAB_ABBREVIATION_FOR_FILES}"
+LIBRARY_FILE_NAME_REGEX = re.compile(r"^primer_library_(\d+)_(\d+)\.json$")
+PRIMER_SEQUENCE_REGEX = re.compile(r"[ATCG]+", re.IGNORECASE)
+
+
+def is_primer(sequence):
+    """Whether an oligo can be used as a primer in the library"""
+
+    return (
+        len(sequence) >= PRIMER_MIN_LENGTH
+        and PRIMER_SEQUENCE_REGEX.fullmatch(sequence) is not None
+    )
+
+
+def primer_entry(oligo_id, sequence):
+    """Library entry for an oligo, as expected by importPrimersFromList"""
+
+    return {
+        "Name": f"{PRIMER_NAME_PREFIX}{oligo_id}",
+        "Sequence": sequence,
+        "Notes": "",
+    }
+
+
+def get_primer_queryset():
+    return (
+        Oligo.objects.annotate(sequence_deterministic=Collate("sequence", "und-x-icu"))
+        .filter(
+            sequence_deterministic__iregex=r"^[ATCG]+$",
+            length__gte=PRIMER_MIN_LENGTH,
+        )
+        .order_by("id")
+        .values_list("id", "sequence")
+    )
+
+
+def get_oligo_version():
+    """Return the number of changes made to oligos, read from a single row"""
+
+    return (
+        OligoLibraryVersion.objects.filter(id=1)
+        .values_list("version", flat=True)
+        .first()
+        or 0
+    )
+
+
+def increment_oligo_version():
+    """Count a change to oligos, as part of the current transaction, and
+    return the new version"""
+
+    OligoLibraryVersion.objects.filter(id=1).update(version=F("version") + 1)
+    return get_oligo_version()
+
+
+@contextmanager
+def library_lock():
+    """Serialize changes to the library across processes"""
+
+    os.makedirs(PRIMER_LIBRARY_DIR, exist_ok=True)
+    with open(os.path.join(PRIMER_LIBRARY_DIR, "primer_library.lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def get_versions():
+    """Return (version, oligo version, path) for all library files,
+    the latest first. The oligo version is the one the file is known to
+    be up to date with"""
+
+    if not os.path.isdir(PRIMER_LIBRARY_DIR):
+        return []
+
+    versions = []
+    for file_name in os.listdir(PRIMER_LIBRARY_DIR):
+        match = LIBRARY_FILE_NAME_REGEX.match(file_name)
+        if match:
+            versions.append(
+                (
+                    int(match.group(1)),
+                    int(match.group(2)),
+                    os.path.join(PRIMER_LIBRARY_DIR, file_name),
+                )
+            )
+
+    return sorted(versions, reverse=True)
+
+
+def write_version(entries, oligo_version, previous_version):
+    """Write a new version of the library and delete old ones.
+    Returns the path of the new version"""
+
+    version = previous_version + 1
+    file_path = os.path.join(
+        PRIMER_LIBRARY_DIR, f"primer_library_{version}_{oligo_version}.json"
+    )
+
+    temp_path = os.path.join(PRIMER_LIBRARY_DIR, f"{uuid4()}.tmp")
+    with open(temp_path, "w") as fhandle:
+        json.dump(entries, fhandle)
+    os.replace(temp_path, file_path)
+
+    # Delete old versions that are unlikely to be in use any more
+    for _, _, old_file_path in get_versions()[1:]:
+        try:
+            if time.time() - os.path.getmtime(old_file_path) > (
+                PRIMER_LIBRARY_KEEP_OLD_SECONDS
+            ):
+                os.unlink(old_file_path)
+        except OSError:
+            pass
+
+    return file_path
+
+
+def build_primer_library():
+    """Write a new version of the library with all oligos.
+    Must be called while holding library_lock"""
+
+    # Read before the oligos, so that the library is never newer than the
+    # oligos it contains
+    oligo_version = get_oligo_version()
+    entries = get_primer_entries()
+    versions = get_versions()
+    previous_version = versions[0][0] if versions else 0
+
+    return write_version(entries, oligo_version, previous_version)
+
+
+def get_primer_entries():
+    return [primer_entry(*oligo) for oligo in get_primer_queryset()]
+
+
+def read_primer_library(file_path):
+    with open(file_path) as fhandle:
+        return json.load(fhandle)
+
+
+def get_primer_library_path():
+    """Return the path of the current version of the library, as a JSON file
+    to be used by importPrimersFromList. The library is only built if it
+    does not exist or is out of date"""
+
+    oligo_version = get_oligo_version()
+
+    versions = get_versions()
+    if versions and versions[0][1] == oligo_version:
+        return versions[0][2]
+
+    with library_lock():
+        # Another process may have built the library in the meantime
+        versions = get_versions()
+        if versions and versions[0][1] == oligo_version:
+            return versions[0][2]
+
+        return build_primer_library()
+
+
+def update_primer_library(oligo_ids, oligo_version):
+    """Add, change or remove oligos in the library, after the change that
+    set the oligo version was committed"""
+
+    with library_lock():
+        versions = get_versions()
+        if not versions:
+            build_primer_library()
+            return
+
+        version, previous_oligo_version, file_path = versions[0]
+        entries = read_primer_library(file_path)
+
+        names = {f"{PRIMER_NAME_PREFIX}{oligo_id}" for oligo_id in oligo_ids}
+        entries = [e for e in entries if e["Name"] not in names]
+        entries.extend(
+            primer_entry(oligo_id, sequence)
+            for oligo_id, sequence in Oligo.objects.filter(
+                id__in=oligo_ids
+            ).values_list("id", "sequence")
+            if is_primer(sequence)
+        )
+        entries.sort(key=lambda e: int(e["Name"][len(PRIMER_NAME_PREFIX) :]))
+
+        # Changes committed in between may not have been applied yet, in
+        # which case the library keeps its version and is rebuilt when next
+        # used
+        if previous_oligo_version == oligo_version - 1:
+            previous_oligo_version = oligo_version
+        write_version(entries, previous_oligo_version, version)
+
+
+class PendingOligos:
+    """The oligos changed in a transaction, applied to the library once
+    it is committed"""
+
+    def __init__(self):
+        self.oligo_ids = set()
+        self.oligo_version = increment_oligo_version()
+
+    def __call__(self):
+        update_primer_library(self.oligo_ids, self.oligo_version)
+
+
+def get_pending_oligos():
+    """Return the oligos changed in the current transaction, if any.
+    Django discards the on_commit callbacks of transactions and savepoints
+    that are rolled back, and with them the oligos they changed"""
+
+    for _, callback, *_ in transaction.get_connection().run_on_commit:
+        if isinstance(callback, PendingOligos):
+            return callback
+    return None
+
+
+def oligo_changed(sender, instance, **kwargs):
+    """Update the library once a change to an oligo is committed. An oligo
+    is usually saved several times per request, the changes are applied
+    together"""
+
+    if kwargs.get("raw", False):
+        return
+
+    pending_oligos = get_pending_oligos()
+    if pending_oligos is None:
+        pending_oligos = PendingOligos()
+        pending_oligos.oligo_ids.add(instance.id)
+        transaction.on_commit(pending_oligos)
+    else:
+        pending_oligos.oligo_ids.add(instance.id)
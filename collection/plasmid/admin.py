@@ -1,34 +1,28 @@
-import os
-
 from django.conf import settings
-from django.contrib import admin, messages
+from django.contrib import admin
 from django.utils import timezone
-from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 
 from common.admin import (
     AddDocFileInlineMixin,
     DocFileInlineMixin,
 )
+from common.id_allocation import allocate_id
 from formz.actions import formz_as_html
-from formz.models import SequenceFeature
 
 from ..shared.admin import (
+    AdminMapStatus,
     AdminOligosInMap,
     CollectionUserProtectionAdmin,
     CustomGuardedModelAdmin,
     SortAutocompleteResultsId,
-    convert_map_gbk_to_dna,
-    create_map_preview,
-    get_map_features,
+    name_map_files_before_save,
 )
 from .actions import export_plasmid
 from .forms import PlasmidAdminForm
 from .models import PlasmidDoc
 from .search import PlasmidQLSchema
 
-MEDIA_ROOT = settings.MEDIA_ROOT
-LAB_ABBREVIATION_FOR_FILES = getattr(settings, "LAB_ABBREVIATION_FOR_FILES", "")
 DEFAULT_ECOLI_STRAIN_IDS = getattr(settings, "DEFAULT_ECOLI_STRAIN_IDS", [])
 
 
@@ -49,6 +43,7 @@ class PlasmidAdmin(
     CustomGuardedModelAdmin,
     CollectionUserProtectionAdmin,
     AdminOligosInMap,
+    AdminMapStatus,
 ):
     list_display = (
         "id",
@@ -134,22 +129,14 @@ class PlasmidAdmin(
     ]
 
     def save_model(self, request, obj, form, change):
-        rename_and_preview = False
         self.rename_and_preview = False
-        new_obj = False
         self.new_obj = False
         self.clear_sequence_features = False
-        convert_map_to_dna = False
+        self.convert_map_to_dna = False
 
         if obj.pk is None:
-            obj.id = (
-                self.model.objects.order_by("-id").first().id + 1
-                if self.model.objects.exists()
-                else 1
-            )
+            obj.id = allocate_id(self.model)
             obj.created_by = request.user
-            obj.save()
-            new_obj = True
             self.new_obj = True
 
             # If a plasmid is 'Saved as new', clear all form Z elements
@@ -157,14 +144,16 @@ class PlasmidAdmin(
                 self.clear_sequence_features = True
 
             # Check if a map is present and if so trigger functions to create a plasmid
-            # map preview and delete the resulting duplicate history record
+            # map preview. The map files are named before the plasmid is first saved
             if obj.map:
-                rename_and_preview = True
                 self.rename_and_preview = True
             elif obj.map_gbk:
-                rename_and_preview = True
                 self.rename_and_preview = True
-                convert_map_to_dna = True
+                self.convert_map_to_dna = True
+
+            if self.rename_and_preview:
+                name_map_files_before_save(obj, self.convert_map_to_dna)
+            obj.save()
 
             # If the request's user is the principal investigator, approve the record
             # right away. If not, create an approval record
@@ -241,95 +230,27 @@ class PlasmidAdmin(
                 if (obj.map and obj.map_gbk) or (
                     not saved_obj.map and not saved_obj.map_gbk
                 ):
-                    rename_and_preview = True
                     self.rename_and_preview = True
-                    obj.save_without_historical_record()
 
                     if obj.map_gbk != saved_obj.map_gbk:
-                        convert_map_to_dna = True
+                        self.convert_map_to_dna = True
+
+                    name_map_files_before_save(obj, self.convert_map_to_dna)
+                    obj.save()
 
                 else:
                     obj.map.name = ""
                     obj.map_png.name = ""
                     obj.map_gbk.name = ""
+                    obj.map_status = ""
+                    obj.map_status_message = ""
+                    obj.map_missing_features = []
                     self.clear_sequence_features = True
                     obj.save()
 
             else:
                 obj.save()
 
-        # Rename map
-        if rename_and_preview:
-            now = timezone.now().strftime("%Y%m%d_%H%M%S_%f")
-            new_file_name = (
-                f"{obj._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}{obj.id}_{now}"
-            )
-
-            new_dna_file_name = os.path.join(
-                obj._model_upload_to + "dna/", new_file_name + ".dna"
-            )
-            new_gbk_file_name = os.path.join(
-                obj._model_upload_to + "gbk/", new_file_name + ".gbk"
-            )
-            new_png_file_name = os.path.join(
-                obj._model_upload_to + "png/", new_file_name + ".png"
-            )
-
-            new_dna_file_path = os.path.join(MEDIA_ROOT, new_dna_file_name)
-            new_gbk_file_path = os.path.join(MEDIA_ROOT, new_gbk_file_name)
-
-            if convert_map_to_dna:
-                old_gbk_file_path = obj.map_gbk.path
-                os.rename(old_gbk_file_path, new_gbk_file_path)
-                try:
-                    convert_map_gbk_to_dna(new_gbk_file_path, new_dna_file_path)
-                except Exception:
-                    messages.error(
-                        request,
-                        "There was an error with converting the map to .gbk.",
-                    )
-            else:
-                old_dna_file_path = obj.map.path
-                os.rename(old_dna_file_path, new_dna_file_path)
-
-            obj.map.name = new_dna_file_name
-            obj.map_png.name = new_png_file_name
-            obj.map_gbk.name = new_gbk_file_name
-            obj.save()
-
-            # For new records, delete first history record, which contains the unformatted
-            # map name, and change the newer history record's history_type from changed (~)
-            # to created (+). This gets rid of a duplicate history record created when
-            # automatically generating a map name
-            if new_obj:
-                obj.history.last().delete()
-                history_obj = obj.history.first()
-                history_obj.history_type = "+"
-                history_obj.save()
-
-            # For map, detect common features and save as png
-            try:
-                detect_common_features_map_dna = request.POST.get(
-                    "detect_common_features_map", False
-                )
-                detect_common_features_map_gbk = request.POST.get(
-                    "detect_common_features_map_gbk", False
-                )
-                detect_common_features = (
-                    True
-                    if (
-                        detect_common_features_map_dna or detect_common_features_map_gbk
-                    )
-                    else False
-                )
-                create_map_preview(obj, detect_common_features)
-            except Exception:
-                messages.error(
-                    request,
-                    "There was an error with detection of common features and/or saving of "
-                    "the map preview",
-                )
-
     def save_related(self, request, form, formsets, change):
         self.redirect_to_obj_page = False
 
@@ -343,56 +264,25 @@ class PlasmidAdmin(
         if self.clear_sequence_features:
             obj.sequence_features.clear()
 
+        # Convert the map, create its preview and add those features for which
+        # a corresponding sequence feature is present in the database in the
+        # background. Redirect to the object's page to show the map status
         if self.rename_and_preview or "_redetect_sequence_features" in request.POST:
-            unknown_feat_name_list = []
-            try:
-                feature_names = get_map_features(obj)
-            except Exception:
-                messages.error(request, "There was an error getting your map features")
-                feature_names = []
-
-            if not self.new_obj:
-                obj.sequence_features.clear()
-
-            if feature_names:
-                sequence_features = SequenceFeature.objects.filter(
-                    alias__label__in=feature_names
-                ).distinct()
-                aliases = list(sequence_features.values_list("alias__label", flat=True))
-                obj.sequence_features.add(*list(sequence_features))
-                unknown_feat_name_list = [
-                    feat for feat in feature_names if feat not in aliases
-                ]
-
-                if unknown_feat_name_list:
-                    self.redirect_to_obj_page = True
-                    unknown_feat_name_list = str(unknown_feat_name_list)[1:-1].replace(
-                        "'", ""
-                    )
-                    messages.warning(
-                        request,
-                        format_html(
-                            "The following map features were not added to "
-                            "<span style='background-color:rgba(0,0,0,0.1);'>Sequence Features</span>,"
-                            " because they cannot be found in the database: "
-                            "<span class='missing-formz-features' style='background-color:rgba(255,0,0,0.2)'>{}</span>. "
-                            "You may want to add them manually yourself below.",
-                            unknown_feat_name_list,
-                        ),
-                    )
+            self.queue_map_processing(
+                request,
+                obj,
+                convert_map_to_dna=self.convert_map_to_dna,
+                create_preview=self.rename_and_preview,
+                detect_common_features=bool(
+                    request.POST.get("detect_common_features_map", False)
+                    or request.POST.get("detect_common_features_map_gbk", False)
+                ),
+                match_sequence_features=True,
+                clear_sequence_features=not self.new_obj,
+            )
+            self.redirect_to_obj_page = True
 
-        # For new records without map preview, delete first history record,
-        # which contains the unformatted map name, and change the newer history
-        # record's history_type from changed (~) to created (+). This gets rid of
-        # a duplicate history record created when automatically generating a map name
-        if self.new_obj and not self.rename_and_preview:
-            obj.save()
-            obj.history.last().delete()
-            history_obj = obj.history.first()
-            history_obj.history_type = "+"
-            history_obj.save()
-        else:
-            obj.save_without_historical_record()
+        obj.save_without_historical_record()
 
         super().save_history_fields(form, obj)
 
@@ -20,6 +20,7 @@ from ..shared.models import (
     CommonCollectionModelPropertiesMixin,
     FormZFieldsMixin,
     MapFileChecPropertieskMixin,
+    MapStatusFieldsMixin,
     OwnershipFieldsMixin,
 )
 
@@ -50,6 +51,7 @@ class Plasmid(
     FormZFieldsMixin,
     HistoryFieldMixin,
     MapFileChecPropertieskMixin,
+    MapStatusFieldsMixin,
     ApprovalFieldsMixin,
     OwnershipFieldsMixin,
     models.Model,
@@ -70,6 +72,7 @@ class Plasmid(
     _history_view_ignore_fields = (
         ApprovalFieldsMixin._history_view_ignore_fields
         + OwnershipFieldsMixin._history_view_ignore_fields
+        + MapStatusFieldsMixin._history_view_ignore_fields
         + ["map_png", "map_gbk"]
     )
     _unified_map_field = True
@@ -164,14 +164,7 @@ class SaCerevisiaeStrainAdmin(
         ],
     ]
 
-    def save_related(self, request, form, formsets, change):
-        obj, history_obj = super().save_related(
-            request,
-            form,
-            formsets,
-            change,
-        )
-
+    def get_history_array_field_values(self, obj):
         plasmid_id_list = (
             obj.integrated_plasmids.all()
             | obj.cassette_plasmids.all()
@@ -179,18 +172,17 @@ class SaCerevisiaeStrainAdmin(
                 sacerevisiaestrainepisomalplasmid__present_in_stocked_strain=True
             )
         )
-        if plasmid_id_list:
-            obj.history_all_plasmids_in_stocked_strain = list(
+        # An empty list clears the plasmids of the previous save
+        return {
+            "history_all_plasmids_in_stocked_strain": list(
                 plasmid_id_list.order_by("id")
                 .distinct("id")
                 .values_list("id", flat=True)
             )
-            obj.save_without_historical_record()
+        }
 
-            history_obj.history_all_plasmids_in_stocked_strain = (
-                obj.history_all_plasmids_in_stocked_strain
-            )
-            history_obj.save()
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
 
         # Clear non-relevant fields for in-stock episomal plasmids
         for (
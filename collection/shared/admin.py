@@ -1,11 +1,10 @@
-import json
+import logging
 import os
 import urllib.parse
 from collections import OrderedDict
 from urllib.parse import quote as urlquote
 from uuid import uuid4
 
-import zmq
 from background_task import background
 from django import forms
 from django.apps import apps
@@ -16,9 +15,13 @@ from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
 from django.core.mail import mail_admins
 from django.db.models import CharField
-from django.db.models.functions import Collate
 from django.forms import TextInput
-from django.http import HttpResponse, HttpResponseNotFound, HttpResponseRedirect
+from django.http import (
+    HttpResponse,
+    HttpResponseNotFound,
+    HttpResponseRedirect,
+    JsonResponse,
+)
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import path, re_path, reverse
 from django.utils import timezone
@@ -34,12 +37,20 @@ from guardian.shortcuts import (
 )
 
 from collection.models import Oligo
+from collection.oligo.binding_sites import (
+    binding_sites_as_genbank_features,
+    binding_sites_as_json,
+    get_oligo_index,
+)
+from collection.oligo.primer_library import get_primer_library_path
 from common.admin import (
     AdminChangeFormWithNavigation,
     SimpleHistoryWithSummaryAdmin,
     ToggleDocInlineMixin,
     save_history_fields,
 )
+from common.history import defer_change_log
+from common.id_allocation import allocate_id
 from common.model_clone import CustomClonableModelAdmin
 from formz.models import (
     Project as FormZProject,
@@ -47,199 +58,322 @@ from formz.models import (
 from formz.models import (
     SequenceFeature,
 )
-from snapgene.pyclasses.client import Client
-from snapgene.pyclasses.config import Config
+
+from . import map_cache
+from .genbank import add_features, parse_genbank
+from .map_features import MAP_READ_ERRORS, read_map_feature_names
+from .snapgene_server import (
+    SnapGeneServerError,
+    SnapGeneServerUnavailable,
+    request_snapgene_server,
+)
 
 User = get_user_model()
+logger = logging.getLogger("logfile")
 BASE_DIR = settings.BASE_DIR
-MEDIA_ROOT = settings.MEDIA_ROOT
 LAB_ABBREVIATION_FOR_FILES = getattr(settings, "LAB_ABBREVIATION_FOR_FILES", "")
 SNAPGENE_COMMON_FEATURES_PATH = os.path.join(
     BASE_DIR, "snapgene/standardCommonFeatures.ftrs"
 )
+# While SnapGene server is down, maps are processed again every
+# SNAPGENE_UNAVAILABLE_RETRY_DELAY seconds, at most
+# SNAPGENE_UNAVAILABLE_MAX_RETRIES times
+SNAPGENE_UNAVAILABLE_RETRY_DELAY = getattr(
+    settings, "SNAPGENE_UNAVAILABLE_RETRY_DELAY", 60
+)
+SNAPGENE_UNAVAILABLE_MAX_RETRIES = getattr(
+    settings, "SNAPGENE_UNAVAILABLE_MAX_RETRIES", 60
+)
 
 ################################################
 #         DNA map processing functions         #
 ################################################
 
 
-def connect_snapgene_server():
-    """Create SnapGene client"""
-
-    config = Config()
-    server_ports = config.get_server_ports()
-    client = None
+def mail_snapgene_error(map_path, err):
+    """Let the admins know about a SnapGene server error. Outages are not
+    mailed, maps are processed again when a server is back"""
 
-    for port in server_ports.values():
-        try:
-            client = Client(port, zmq.Context())
-        except Exception:
-            continue
-        else:
-            break
+    if isinstance(err, SnapGeneServerUnavailable):
+        return
 
-    if not client:
-        raise Exception("Could not connect to SnapGene Server")
-
-    return client
-
-
-def mail_snapgene_error(map_path, messages):
     mail_admins(
         "Snapgene server error",
         "There was an error with creating the preview"
         f"for {map_path} with snapgene server.\n\n"
-        f"Errors: {messages}.",
+        f"Error: {err}.",
         fail_silently=True,
     )
 
 
-def create_map_preview(
-    obj, detect_common_features, attempt_number=3, messages=[], **kwargs
-):
+def create_map_preview(obj, detect_common_features, **kwargs):
     """For a .dna map, use SnapGene server to 1) detect common features,
-    2) create a .png preview of the .dna file, and 3) create a .gbk map"""
+    2) create a .png preview of the .dna file, and 3) create a .gbk map.
+    Results for maps with the same content are taken from the map cache"""
 
-    if attempt_number > 0:
-        try:
-            client = connect_snapgene_server()
-
-            # Detect common features
-            if detect_common_features:
+    try:
+        title = kwargs.get("prefix", obj.map_preview_title)
+
+        # Detect common features
+        if detect_common_features:
+            cache_key = map_cache.get_key(
+                obj.map.path,
+                "detectFeatures",
+                feature_db=map_cache.feature_db_version(SNAPGENE_COMMON_FEATURES_PATH),
+            )
+            if not map_cache.get_file(cache_key, obj.map.path):
                 argument = {
                     "request": "detectFeatures",
                     "inputFile": obj.map.path,
                     "outputFile": obj.map.path,
                     "featureDatabase": SNAPGENE_COMMON_FEATURES_PATH,
                 }
-                r = client.requestResponse(argument, 10000)
-                r_code = r.get("code", 1)
-                if r_code > 0:
-                    error_message = "detectFeatures - error " + r_code
-                    if error_message not in messages:
-                        messages.append(error_message)
-                    client.close()
-                    raise Exception
-
-            # Create a .png preview of the .dna map
+                request_snapgene_server(argument, 10000)
+                map_cache.set_file(cache_key, obj.map.path)
+
+        # Create a .png preview of the .dna map
+        cache_key = map_cache.get_key(obj.map.path, "generatePNGMap", title=title)
+        if not map_cache.get_file(cache_key, obj.map_png.path):
             argument = {
                 "request": "generatePNGMap",
                 "inputFile": obj.map.path,
                 "outputPng": obj.map_png.path,
-                "title": (
-                    kwargs["prefix"]
-                    if "prefix" in kwargs
-                    else f"{obj._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}"
-                    f"{obj.id} - {obj.name}"
-                ),
+                "title": title,
                 "showEnzymes": True,
                 "showFeatures": True,
                 "showPrimers": True,
                 "showORFs": False,
             }
-            r = client.requestResponse(argument, 10000)
-            r_code = r.get("code", 1)
-            if r_code > 0:
-                error_message = "generatePNGMap - error " + r_code
-                if error_message not in messages:
-                    messages.append(error_message)
-                client.close()
-                raise Exception
-
-            # Create a .gbk map
+            request_snapgene_server(argument, 10000)
+            map_cache.set_file(cache_key, obj.map_png.path)
+
+        # Create a .gbk map
+        cache_key = map_cache.get_key(obj.map.path, "exportDNAFile")
+        if not map_cache.get_file(cache_key, obj.map_gbk.path):
             argument = {
                 "request": "exportDNAFile",
                 "inputFile": obj.map.path,
                 "outputFile": obj.map_gbk.path,
                 "exportFilter": "biosequence.gb",
             }
-            r = client.requestResponse(argument, 10000)
-            r_code = r.get("code", 1)
-            if r_code > 0:
-                error_message = "exportDNAFile - error " + r_code
-                if error_message not in messages:
-                    messages.append(error_message)
-                client.close()
-                raise Exception
-
-            client.close()
-
-        except Exception:
-            create_map_preview(
-                obj, detect_common_features, attempt_number - 1, messages, **kwargs
-            )
+            request_snapgene_server(argument, 10000)
+            map_cache.set_file(cache_key, obj.map_gbk.path)
 
-    else:
-        mail_snapgene_error(obj.map.path, messages)
-        raise Exception
+    except SnapGeneServerError as err:
+        mail_snapgene_error(obj.map.path, err)
+        raise
 
 
-def get_map_features(obj, attempt_number=3, messages=[]):
-    """For a .dna  map, use SnapGene server to get its
-    features, as json"""
+def get_map_features(obj):
+    """Get the feature names of a .dna map. The map is parsed directly,
+    only if that fails SnapGene server is used. Features of maps with
+    the same content are taken from the map cache"""
 
-    if attempt_number > 0:
-        try:
-            client = connect_snapgene_server()
+    try:
+        return read_map_feature_names(obj.map.path)
+    except MAP_READ_ERRORS as err:
+        logger.warning(
+            "Could not read the features of %s, using SnapGene server: %s",
+            obj.map.path,
+            err,
+        )
+    except Exception:
+        logger.exception(
+            "Error reading the features of %s, using SnapGene server", obj.map.path
+        )
+
+    try:
+        cache_key = map_cache.get_key(obj.map.path, "reportFeatures")
+        feature_names = map_cache.get_json(cache_key)
 
+        if feature_names is None:
             # Get features
             argument = {"request": "reportFeatures", "inputFile": obj.map.path}
-            r = client.requestResponse(argument, 10000)
-            r_code = r.get("code", 1)
-            if r_code > 0:
-                error_message = "reportFeatures - error " + r_code
-                if error_message not in messages:
-                    messages.append(error_message)
-                client.close()
-                raise Exception
-
-            client.close()
+            r = request_snapgene_server(argument, 10000)
 
             plasmid_features = r.get("features", [])
             feature_names = [feat["name"].strip() for feat in plasmid_features]
-            return feature_names
+            map_cache.set_json(cache_key, feature_names)
 
-        except Exception:
-            get_map_features(obj.map.path, attempt_number - 1, messages)
+        return feature_names
 
-    else:
-        mail_snapgene_error(obj.map.path, messages)
-        raise Exception
+    except SnapGeneServerError as err:
+        mail_snapgene_error(obj.map.path, err)
+        raise
 
 
-def convert_map_gbk_to_dna(gbk_map_path, dna_map_path, attempt_number=3, messages=[]):
+def convert_map_gbk_to_dna(gbk_map_path, dna_map_path):
     """For a gbk  map (.gbk), use SnapGene server
     to convert it to .dna"""
 
-    if attempt_number > 0:
-        try:
-            client = connect_snapgene_server()
+    try:
+        # Convert .dna to .gbk
+        argument = {
+            "request": "importDNAFile",
+            "inputFile": gbk_map_path,
+            "outputFile": dna_map_path,
+        }
+        request_snapgene_server(argument, 10000)
+
+    except SnapGeneServerError as err:
+        mail_snapgene_error(gbk_map_path, err)
+        raise
+
+
+def add_map_sequence_features(obj, clear_sequence_features=False):
+    """Add the features of an object's map to its sequence_features,
+    if a corresponding sequence feature is present in the database.
+    Returns the names of the map features that could not be found"""
+
+    feature_names = get_map_features(obj)
+
+    if clear_sequence_features:
+        obj.sequence_features.clear()
+
+    if not feature_names:
+        return []
+
+    sequence_features = SequenceFeature.objects.filter(
+        alias__label__in=feature_names
+    ).distinct()
+    aliases = list(sequence_features.values_list("alias__label", flat=True))
+    obj.sequence_features.add(*list(sequence_features))
+
+    return [feat for feat in feature_names if feat not in aliases]
+
+
+@background(schedule=0)
+def process_map(
+    app_label,
+    model_name,
+    obj_id,
+    convert_map_to_dna=False,
+    create_preview=False,
+    detect_common_features=False,
+    match_sequence_features=False,
+    clear_sequence_features=False,
+    history_id=None,
+    unavailable_retry_number=0,
+):
+    """Process the map of an object in the background: convert a .gbk map
+    to .dna, create the map preview and .gbk map, and add the map features
+    to sequence_features. The progress is kept in map_status. If SnapGene
+    server is down, the map stays pending and is processed again later.
+    history_id is the historical record of the save that queued the
+    processing, whose history array fields are updated"""
+
+    model = apps.get_model(app_label, model_name)
+    model.objects.filter(id=obj_id).update(
+        map_status="processing", map_status_message="", map_missing_features=[]
+    )
+    obj = model.objects.filter(id=obj_id).first()
+    if obj is None:
+        # The object was deleted before its map was processed
+        return
+
+    status_message = ""
+    error_message = ""
+    unknown_feat_names = []
+    try:
+        if convert_map_to_dna:
+            error_message = "There was an error with converting the map to .dna"
+            convert_map_gbk_to_dna(obj.map_gbk.path, obj.map.path)
+
+        if create_preview:
+            error_message = (
+                "There was an error with detection of common features "
+                "and/or saving of the map preview"
+            )
+            create_map_preview(obj, detect_common_features)
+
+        if match_sequence_features:
+            error_message = "There was an error getting your map features"
+            unknown_feat_names = add_map_sequence_features(obj, clear_sequence_features)
+
+            # The object may have been saved again in the meantime, update
+            # the historical record of the save that queued the processing
+            save_history_fields(
+                obj,
+                obj.history.filter(history_id=history_id).first()
+                if history_id
+                else None,
+            )
 
-            # Convert .dna to .gbk
-            argument = {
-                "request": "importDNAFile",
-                "inputFile": gbk_map_path,
-                "outputFile": dna_map_path,
-            }
-            r = client.requestResponse(argument, 10000)
-            r_code = r.get("code", 1)
-            if r_code > 0:
-                error_message = "importDNAFile - error " + r_code
-                if error_message not in messages:
-                    messages.append(error_message)
-                client.close()
-                raise Exception
-
-            client.close()
-
-        except Exception:
-            convert_map_gbk_to_dna(
-                gbk_map_path, dna_map_path, attempt_number - 1, messages
+            if unknown_feat_names:
+                # The names are shown after the message by the change form
+                status_message = (
+                    "The following map features were not added to Sequence "
+                    "Features, because they cannot be found in the database. "
+                    "You may want to add them manually yourself below:"
+                )
+
+    except SnapGeneServerUnavailable:
+        if unavailable_retry_number < SNAPGENE_UNAVAILABLE_MAX_RETRIES:
+            model.objects.filter(id=obj_id).update(
+                map_status="pending",
+                map_status_message="SnapGene server is currently unavailable, "
+                "the map will be processed as soon as it is back.",
+            )
+            process_map(
+                app_label,
+                model_name,
+                obj_id,
+                convert_map_to_dna=convert_map_to_dna,
+                create_preview=create_preview,
+                detect_common_features=detect_common_features,
+                match_sequence_features=match_sequence_features,
+                clear_sequence_features=clear_sequence_features,
+                history_id=history_id,
+                unavailable_retry_number=unavailable_retry_number + 1,
+                schedule=SNAPGENE_UNAVAILABLE_RETRY_DELAY,
             )
+        else:
+            model.objects.filter(id=obj_id).update(
+                map_status="failed",
+                map_status_message=f"{error_message}: SnapGene server is unavailable",
+            )
+        return
+
+    except SnapGeneServerError as err:
+        model.objects.filter(id=obj_id).update(
+            map_status="failed", map_status_message=f"{error_message} ({err})"
+        )
+        return
+
+    except Exception as err:
+        model.objects.filter(id=obj_id).update(
+            map_status="failed", map_status_message=error_message or str(err)
+        )
+        return
+
+    # The missing features are kept apart from the message, so that the
+    # change form can highlight them
+    model.objects.filter(id=obj_id).update(
+        map_status="done",
+        map_status_message=status_message,
+        map_missing_features=unknown_feat_names,
+    )
 
-    else:
-        mail_snapgene_error(gbk_map_path, messages)
-        raise Exception
+
+def queue_map_processing(obj, **kwargs):
+    """Set the map status of an object to pending and schedule
+    process_map for it, for its latest historical record"""
+
+    obj.map_status = "pending"
+    obj.map_status_message = ""
+    obj.map_missing_features = []
+    obj._meta.model.objects.filter(id=obj.id).update(
+        map_status=obj.map_status,
+        map_status_message=obj.map_status_message,
+        map_missing_features=obj.map_missing_features,
+    )
+    process_map(
+        obj._meta.app_label,
+        obj._meta.model_name,
+        obj.id,
+        history_id=obj.history.values_list("history_id", flat=True).latest(),
+        **kwargs,
+    )
 
 
 ################################################
@@ -304,38 +438,57 @@ def delete_obj_perm_after_24h(perm, user_id, obj_id, app_label, model_name):
     remove_perm(perm, user, obj)
 
 
-def rename_info_sheet_save_obj_update_history(obj, new_obj):
-    doc_dir_path = os.path.join(MEDIA_ROOT, obj._model_upload_to)
-    old_file_name_abs_path = os.path.join(MEDIA_ROOT, obj.info_sheet.name)
-    _, ext = os.path.splitext(os.path.basename(old_file_name_abs_path))
+def get_file_name_stem(obj):
+    """Return the standard name of the files of an object, without
+    extension"""
+
     now = timezone.now().strftime("%Y%m%d_%H%M%S_%f")
-    new_file_name = os.path.join(
-        obj._model_upload_to,
-        f"{obj._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}"
-        f"{obj.id}_{now}{ext.lower()}",
-    )
-    new_file_name_abs_path = os.path.join(MEDIA_ROOT, new_file_name)
+    return f"{obj._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}{obj.id}_{now}"
+
+
+def name_file_before_save(obj, field_name, file_name):
+    """Give a file of an object its final name before the object is saved,
+    so that it is saved, and its historical record written, once. A new
+    upload is stored under file_name in the upload_to directory of the
+    field when the object is saved. An existing file, e.g. of a record
+    saved as new, is copied there"""
+
+    field_file = getattr(obj, field_name)
+    if field_file._committed:
+        with field_file.storage.open(field_file.name) as content:
+            field_file.save(file_name, content, save=False)
+    else:
+        field_file.name = file_name
+
+
+def name_info_sheet_before_save(obj):
+    _, ext = os.path.splitext(obj.info_sheet.name)
+    name_file_before_save(obj, "info_sheet", f"{get_file_name_stem(obj)}{ext.lower()}")
 
-    # Create destination folder if it doesn't exist
-    if not os.path.exists(doc_dir_path):
-        os.makedirs(doc_dir_path)
 
-    # Rename file
-    os.rename(old_file_name_abs_path, new_file_name_abs_path)
+def name_map_files_before_save(obj, convert_map_to_dna):
+    """Give the map files of an object their final names before it is
+    saved. Only the uploaded map is stored, the other files are created
+    by process_map"""
 
-    obj.info_sheet.name = new_file_name
-    obj.save()
+    file_name_stem = get_file_name_stem(obj)
+    file_names = {
+        "map": f"{file_name_stem}.dna",
+        "map_png": f"{file_name_stem}.png",
+        "map_gbk": f"{file_name_stem}.gbk",
+    }
+
+    # The .gbk map is converted to .dna by process_map
+    map_field_name = "map_gbk" if convert_map_to_dna else "map"
+    name_file_before_save(obj, map_field_name, file_names[map_field_name])
 
-    # For new records, delete first history record, which contains the
-    # unformatted info_sheet name, and change the newer history record's
-    # history_type from changed (~) to created (+). This gets rid of a
-    # duplicate history record created when automatically generating an
-    # info_sheet name
-    if new_obj:
-        obj.history.last().delete()
-        history_obj = obj.history.first()
-        history_obj.history_type = "+"
-        history_obj.save()
+    for field_name, file_name in file_names.items():
+        if field_name != map_field_name:
+            setattr(
+                obj,
+                field_name,
+                obj._meta.get_field(field_name).generate_filename(obj, file_name),
+            )
 
 
 class CollectionBaseAdmin(
@@ -362,10 +515,23 @@ class CollectionBaseAdmin(
     show_formz = False
     can_change = False
 
+    def save_form(self, request, form, change):
+        # The change log is written once the history array fields are
+        # saved, by save_history_fields
+        obj = super().save_form(request, form, change)
+        defer_change_log(obj)
+        return obj
+
+    def get_history_array_field_values(self, obj):
+        """Return the values of history array fields, other than those
+        mirroring M2M relations, to save along with them"""
+
+        return {}
+
     def save_history_fields(self, form, obj=None):
         obj = obj if obj else self.model.objects.get(pk=form.instance.id)
         history_obj = obj.history.latest()
-        save_history_fields(obj, history_obj)
+        save_history_fields(obj, history_obj, self.get_history_array_field_values(obj))
         return obj, history_obj
 
     def save_related(self, request, form, formsets, change):
@@ -382,17 +548,9 @@ class CollectionBaseAdmin(
 
 class CollectionSimpleAdmin(CollectionBaseAdmin):
     def save_model(self, request, obj, form, change):
-        rename_doc = False
-        new_obj = False
-
         # New objects
         if obj.pk is None:
-            # Don't rely on autoincrement value in DB table
-            obj.id = (
-                self.model.objects.order_by("-id").first().id + 1
-                if self.model.objects.exists()
-                else 1
-            )
+            obj.id = allocate_id(self.model)
 
             try:
                 obj.created_by
@@ -400,9 +558,7 @@ class CollectionSimpleAdmin(CollectionBaseAdmin):
                 obj.created_by = request.user
 
             if obj.info_sheet:
-                rename_doc = True
-                new_obj = True
-            obj.save()
+                name_info_sheet_before_save(obj)
 
         # Existing objects
         else:
@@ -410,14 +566,9 @@ class CollectionSimpleAdmin(CollectionBaseAdmin):
 
             # Check if info_sheet has been changed
             if obj.info_sheet and obj.info_sheet != saved_obj.info_sheet:
-                rename_doc = True
-                obj.save_without_historical_record()
-            else:
-                obj.save()
+                name_info_sheet_before_save(obj)
 
-        # Rename info_sheet
-        if rename_doc:
-            rename_info_sheet_save_obj_update_history(obj, new_obj)
+        obj.save()
 
     def change_view(self, request, object_id, form_url="", extra_context=None):
         self.fieldsets = self.change_view_fieldsets.copy()
@@ -444,12 +595,7 @@ class CollectionUserProtectionAdmin(Approval, CollectionBaseAdmin):
 
     def save_model(self, request, obj, form, change):
         if obj.pk is None:
-            # Don't rely on autoincrement value in DB table
-            obj.id = (
-                self.model.objects.order_by("-id").first().id + 1
-                if self.model.objects.exists()
-                else 1
-            )
+            obj.id = allocate_id(self.model)
 
             try:
                 obj.created_by
@@ -728,6 +874,44 @@ class CustomGuardedModelAdmin(GuardedModelAdmin):
         return HttpResponseRedirect("../..")
 
 
+class AdminMapStatus(admin.ModelAdmin):
+    def get_urls(self):
+        """Add map status url"""
+
+        urls = super().get_urls()
+
+        urls = [
+            path(
+                "<path:object_id>/map_status/",
+                view=self.admin_site.admin_view(self.map_status),
+            )
+        ] + urls
+
+        return urls
+
+    def map_status(self, request, *args, **kwargs):
+        """Return the status of the background processing of
+        an object's map"""
+
+        obj = get_object_or_404(self.model, id=kwargs["object_id"])
+
+        return JsonResponse(
+            {
+                "status": obj.map_status,
+                "status_display": obj.get_map_status_display(),
+                "message": obj.map_status_message,
+                "missing_features": obj.map_missing_features,
+            }
+        )
+
+    def queue_map_processing(self, request, obj, **kwargs):
+        queue_map_processing(obj, **kwargs)
+        messages.info(
+            request,
+            "The map is being processed. Its status is shown at the top of this page.",
+        )
+
+
 class AdminOligosInMap(admin.ModelAdmin):
     def get_urls(self):
         """Add navigation url"""
@@ -740,141 +924,150 @@ class AdminOligosInMap(admin.ModelAdmin):
 
         return urls
 
-    def find_oligos_in_map(
-        self, request, attempt_number=3, messages=[], *args, **kwargs
-    ):
-        """Given a path to a snapgene plasmid map, use snapegene server
-        to detect common features and create map preview as png
-        and gbk"""
+    def find_oligos_in_map(self, request, *args, **kwargs):
+        """Find all oligos in the map of an object and return the map
+        with the oligos as primer features. .gbk maps are searched
+        directly, otherwise SnapGene server is used"""
 
         file_format = request.GET.get("file_format", "gbk")
+        obj = get_object_or_404(self.model, id=kwargs["object_id"])
 
-        if attempt_number > 0:
+        if not Oligo.objects.exists():
+            return HttpResponseNotFound()
+
+        # Find oligos in the .gbk map without SnapGene server, if possible
+        if file_format in ["gbk", "json"] and obj.map_gbk:
             try:
-                # Connect to SnapGene server
-                config = Config()
-                server_ports = config.get_server_ports()
-                for port in server_ports.values():
-                    try:
-                        client = Client(port, zmq.Context())
-                    except Exception:
-                        continue
-                    else:
-                        break
-
-                # Create paths for temp files
-                temp_dir_path = os.path.join(BASE_DIR, "uploads/temp")
-                oligos_json_path = os.path.join(temp_dir_path, str(uuid4()))
-                dna_temp_path = os.path.join(temp_dir_path, str(uuid4()))
-                gbk_temp_path = os.path.join(temp_dir_path, f"{str(uuid4())}.gb")
-
-                # Write oligos to file
-                if not Oligo.objects.exists():
-                    return HttpResponseNotFound
-                oligos = (
-                    Oligo.objects.annotate(
-                        sequence_deterministic=Collate("sequence", "und-x-icu")
-                    )
-                    .filter(sequence_deterministic__iregex=r"^[ATCG]+$", length__gte=15)
-                    .values_list("id", "sequence")
+                return self.find_oligos_in_map_gbk(obj, file_format)
+            except MAP_READ_ERRORS as err:
+                logger.warning(
+                    "Could not find oligos in %s, using SnapGene server: %s",
+                    obj.map_gbk.path,
+                    err,
                 )
-                oligos = list(
-                    {
-                        "Name": f"! o{LAB_ABBREVIATION_FOR_FILES}{i[0]}",
-                        "Sequence": i[1],
-                        "Notes": "",
-                    }
-                    for i in oligos
+            except Exception:
+                logger.exception(
+                    "Error finding oligos in %s, using SnapGene server",
+                    obj.map_gbk.path,
                 )
-                with open(oligos_json_path, "w") as fhandle:
-                    json.dump(oligos, fhandle)
 
-                # Find oligos in object map and convert result to gbk
-                obj = self.model.objects.get(id=kwargs["object_id"])
-                argument = {
-                    "request": "importPrimersFromList",
-                    "inputFile": obj.map.path,
-                    "inputPrimersFile": oligos_json_path,
-                    "outputFile": dna_temp_path,
-                }
-                r = client.requestResponse(argument, 60000)
-                r_code = r.get("code", 1)
-                if r_code > 0:
-                    error_message = "importPrimersFromList - error " + r_code
-                    if error_message not in messages:
-                        messages.append(error_message)
-                    client.close()
-                    raise Exception
-
-                # If user wants to download file, then do so
-                if file_format == "dna":
-                    client.close()
-                    # Get processed .dna map and delete temp files
-                    with open(dna_temp_path, "rb") as fhandle:
-                        file_data = fhandle.read()
-
-                    # os.unlink(oligos_json_path)
-                    os.unlink(dna_temp_path)
-
-                    # Send response
-                    response = HttpResponse(
-                        file_data, content_type="application/octet-stream"
-                    )
-                    file_name = (
-                        f"{obj._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}{obj.id}"
-                        + f" - {obj.name} (imported oligos).dna"
-                    )
-                    response["Content-Disposition"] = (
-                        f"attachment; filename*=utf-8''{urllib.parse.quote(file_name)}"
-                    )
-                    return response
+        # Create paths for temp files
+        temp_dir_path = os.path.join(BASE_DIR, "uploads/temp")
+        dna_temp_path = os.path.join(temp_dir_path, str(uuid4()))
+        gbk_temp_path = os.path.join(temp_dir_path, f"{str(uuid4())}.gb")
 
+        try:
+            return self.find_oligos_in_map_snapgene(
+                obj, file_format, dna_temp_path, gbk_temp_path
+            )
+        finally:
+            for temp_path in [dna_temp_path, gbk_temp_path]:
+                if os.path.exists(temp_path):
+                    os.unlink(temp_path)
+
+    def find_oligos_in_map_snapgene(
+        self, obj, file_format, dna_temp_path, gbk_temp_path
+    ):
+        """Find all oligos in the map of an object with SnapGene server,
+        writing the results to the given temp files"""
+
+        try:
+            # Find oligos in object map and convert result to gbk,
+            # using the current version of the primer library
+            argument = {
+                "request": "importPrimersFromList",
+                "inputFile": obj.map.path,
+                "inputPrimersFile": get_primer_library_path(),
+                "outputFile": dna_temp_path,
+            }
+            request_snapgene_server(argument, 60000)
+
+            if file_format != "dna":
                 argument = {
                     "request": "exportDNAFile",
                     "inputFile": dna_temp_path,
                     "outputFile": gbk_temp_path,
                     "exportFilter": "biosequence.gb",
                 }
-                r = client.requestResponse(argument, 10000)
-                r_code = r.get("code", 1)
-                if r_code > 0:
-                    error_message = "exportDNAFile - error " + r_code
-                    if error_message not in messages:
-                        messages.append(error_message)
-                    client.close()
-                    raise Exception
-
-                client.close()
-
-                # Get processed .gbk map and delete temp files
-                with open(gbk_temp_path) as fhandle:
-                    file_data = fhandle.read()
-
-                os.unlink(oligos_json_path)
-                os.unlink(dna_temp_path)
-                os.unlink(gbk_temp_path)
-
-                # Send response
-                response = HttpResponse(file_data, content_type="text/plain")
-                response["Content-Disposition"] = (
-                    'attachment; filename="map_with_imported_oligos.gbk"'
-                )
-                return response
+                request_snapgene_server(argument, 10000)
 
-            except Exception as err:
-                messages.append(str(err))
-                self.find_oligos_in_map(
-                    request, attempt_number - 1, messages, *args, **kwargs
-                )
-        else:
+        except SnapGeneServerUnavailable:
+            return HttpResponse(
+                "SnapGene server is currently unavailable, please try again later",
+                content_type="text/plain",
+                status=503,
+            )
+
+        except SnapGeneServerError as err:
             mail_admins(
                 f"Error finding oligos in {obj._meta.verbose_name}",
                 "There was an error with finding oligos in "
-                f"{obj._meta.verbose_name} {kwargs['object_id']} "
-                f"with snapgene server.\n\nErrors: {messages}.",
+                f"{obj._meta.verbose_name} {obj.id} "
+                f"with snapgene server.\n\nError: {err}.",
                 fail_silently=True,
             )
-            raise Exception
+            raise
+
+        # If user wants to download file, then do so
+        if file_format == "dna":
+            # Get processed .dna map
+            with open(dna_temp_path, "rb") as fhandle:
+                file_data = fhandle.read()
+
+            # Send response
+            response = HttpResponse(file_data, content_type="application/octet-stream")
+            file_name = (
+                f"{obj._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}{obj.id}"
+                + f" - {obj.name} (imported oligos).dna"
+            )
+            response["Content-Disposition"] = (
+                f"attachment; filename*=utf-8''{urllib.parse.quote(file_name)}"
+            )
+            return response
+
+        # Get processed .gbk map
+        with open(gbk_temp_path) as fhandle:
+            file_data = fhandle.read()
+
+        # Send response
+        response = HttpResponse(file_data, content_type="text/plain")
+        response["Content-Disposition"] = (
+            'attachment; filename="map_with_imported_oligos.gbk"'
+        )
+        return response
+
+    def find_oligos_in_map_gbk(self, obj, file_format):
+        """Find the binding sites of all oligos in a .gbk map. Return the
+        map with the binding sites as primer_bind features or, for OVE, the
+        binding sites as JSON"""
+
+        with open(obj.map_gbk.path, encoding="utf-8", errors="replace") as fhandle:
+            gbk_data = fhandle.read()
+        record = parse_genbank(gbk_data)
+        binding_sites = get_oligo_index().find_binding_sites(
+            record.sequence, record.circular
+        )
+
+        if file_format == "json":
+            return JsonResponse(
+                {
+                    "name": record.name,
+                    "sequence": record.sequence,
+                    "circular": record.circular,
+                    "primers": binding_sites_as_json(binding_sites, len(record)),
+                }
+            )
+
+        response = HttpResponse(
+            add_features(
+                gbk_data, binding_sites_as_genbank_features(binding_sites, len(record))
+            ),
+            content_type="text/plain",
+        )
+        response["Content-Disposition"] = (
+            'attachment; filename="map_with_imported_oligos.gbk"'
+        )
+        return response
 
 
 class FormUniqueNameCheck:
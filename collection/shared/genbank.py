@@ -0,0 +1,256 @@
+import re
+
+FEATURES_HEADER = "FEATURES             Location/Qualifiers"
+FEATURE_KEY_INDENT = " " * 5
+QUALIFIER_INDENT = " " * 21
+
+
+# Qualifiers used as the name of a feature, in order of preference.
+# SnapGene exports the name of a feature as its label
+FEATURE_NAME_QUALIFIERS = ["label", "gene", "product", "standard_name", "note"]
+
+
+class MapFeature:
+    """Feature of a map. Segments are 1-based and inclusive,
+    strand is 1, -1 or 0 if unknown"""
+
+    def __init__(self, name, feature_type, segments, strand):
+        self.name = name
+        self.type = feature_type
+        self.segments = segments
+        self.strand = strand
+
+    @property
+    def start(self):
+        return self.segments[0][0] if self.segments else None
+
+    @property
+    def end(self):
+        return self.segments[-1][1] if self.segments else None
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "type": self.type,
+            "start": self.start,
+            "end": self.end,
+            "strand": self.strand,
+            "segments": self.segments,
+        }
+
+
+class MapRecord:
+    """Minimal representation of a map: name, sequence, topology
+    and features"""
+
+    def __init__(self, name, sequence, circular, features=None):
+        self.name = name
+        self.sequence = sequence
+        self.circular = circular
+        self.features = features or []
+
+    def __len__(self):
+        return len(self.sequence)
+
+
+def parse_location(location):
+    """Return the segments and strand of a GenBank location"""
+
+    strand = -1 if location.startswith("complement(") else 1
+    segments = []
+    location = re.sub(r"[<>]", "", location)
+    for part in re.sub(r"[()]|complement|join|order", " ", location).split(","):
+        part = part.strip()
+        # Skip references to other sequences
+        if not part or ":" in part:
+            continue
+        positions = [int(p) for p in re.split(r"\.\.|\^|\.", part) if p.isdigit()]
+        if positions:
+            segments.append((positions[0], positions[-1]))
+
+    return segments, strand
+
+
+def parse_features(feature_lines):
+    """Parse the lines of a GenBank feature table"""
+
+    features = []
+    feature = None
+    qualifier = None
+
+    def finish_feature():
+        if feature is None:
+            return
+        feature_type, location, qualifiers = feature
+        name = next(
+            (qualifiers[q] for q in FEATURE_NAME_QUALIFIERS if qualifiers.get(q)),
+            feature_type,
+        )
+        segments, strand = parse_location(location)
+        features.append(MapFeature(name.strip(), feature_type, segments, strand))
+
+    for line in feature_lines:
+        if not line.strip():
+            continue
+
+        # New feature
+        if line[:5] == FEATURE_KEY_INDENT and line[5] != " ":
+            finish_feature()
+            feature = (line[5:21].strip(), line[21:].strip(), {})
+            qualifier = None
+            continue
+
+        if feature is None:
+            continue
+
+        content = line[21:].rstrip()
+        qualifiers = feature[2]
+
+        # New qualifier
+        if content.startswith("/"):
+            key, _, value = content[1:].partition("=")
+            qualifier = key
+            qualifiers[key] = value
+        # Continuation of a qualifier's value
+        elif qualifier is not None:
+            qualifiers[qualifier] = f"{qualifiers[qualifier]} {content.strip()}"
+        # Continuation of the location
+        else:
+            feature = (feature[0], feature[1] + content.strip(), qualifiers)
+
+    finish_feature()
+
+    for feature in features:
+        if len(feature.name) > 1 and feature.name[0] == feature.name[-1] == '"':
+            feature.name = feature.name[1:-1].strip()
+
+    return features
+
+
+def parse_genbank(text):
+    """Parse the first record of a GenBank file"""
+
+    name = ""
+    circular = False
+    sequence_lines = []
+    feature_lines = []
+    section = None
+
+    for line in text.splitlines():
+        if line.startswith("//"):
+            break
+
+        # Sections start with a keyword in the first column
+        if line[:1] not in ("", " "):
+            section = line.split()[0]
+            if section == "LOCUS":
+                tokens = line.split()
+                name = tokens[1] if len(tokens) > 1 else ""
+                circular = "circular" in (t.lower() for t in tokens[2:])
+            continue
+
+        if section == "ORIGIN":
+            sequence_lines.append(re.sub(r"[^A-Za-z]", "", line))
+        elif section == "FEATURES":
+            feature_lines.append(line)
+
+    if section != "ORIGIN":
+        raise ValueError("Not a valid GenBank file, no sequence found")
+
+    return MapRecord(
+        name,
+        "".join(sequence_lines).upper(),
+        circular,
+        parse_features(feature_lines),
+    )
+
+
+def read_genbank(file_path):
+    """Read the first record of a GenBank file"""
+
+    with open(file_path, encoding="utf-8", errors="replace") as fhandle:
+        return parse_genbank(fhandle.read())
+
+
+def format_location(start, end, strand, sequence_length):
+    """Format a 0-based, end-exclusive location as a GenBank location.
+    Locations that span the origin of circular sequences are joined"""
+
+    if end > sequence_length:
+        location = f"join({start + 1}..{sequence_length},1..{end - sequence_length})"
+    else:
+        location = f"{start + 1}..{end}"
+
+    return f"complement({location})" if strand == -1 else location
+
+
+def format_feature(feature_type, location, qualifiers):
+    """Format a feature as lines of a GenBank feature table"""
+
+    lines = [f"{FEATURE_KEY_INDENT}{feature_type:<16}{location}"]
+    for key, value in qualifiers.items():
+        if isinstance(value, str):
+            value = '"{}"'.format(value.replace('"', "'"))
+        lines.append(f"{QUALIFIER_INDENT}/{key}={value}")
+    return lines
+
+
+def add_features(text, feature_lines):
+    """Add feature lines to the feature table of a GenBank file"""
+
+    lines = text.splitlines()
+    origin_index = next(
+        (
+            i
+            for i, line in enumerate(lines)
+            if line.startswith("ORIGIN") or line.startswith("BASE COUNT")
+        ),
+        None,
+    )
+    if origin_index is None:
+        raise ValueError("Not a valid GenBank file, no sequence found")
+
+    if not any(line.startswith("FEATURES") for line in lines[:origin_index]):
+        feature_lines = [FEATURES_HEADER] + feature_lines
+
+    return "\n".join(lines[:origin_index] + feature_lines + lines[origin_index:]) + "\n"
+
+
+def format_segments(segments, strand):
+    """Format 1-based, inclusive segments as a GenBank location"""
+
+    location = ",".join(
+        f"{start}..{end}" if start != end else str(start) for start, end in segments
+    )
+    if len(segments) > 1:
+        location = f"join({location})"
+    return f"complement({location})" if strand == -1 else location
+
+
+def format_genbank(record):
+    """Format a map as a GenBank file"""
+
+    name = (record.name or "Exported").replace(" ", "_")[:16]
+    topology = "circular" if record.circular else "linear"
+    lines = [
+        f"LOCUS       {name:<16} {len(record):>11} bp    DNA     {topology}",
+        FEATURES_HEADER,
+    ]
+    for feature in record.features:
+        if feature.segments:
+            lines.extend(
+                format_feature(
+                    feature.type or "misc_feature",
+                    format_segments(feature.segments, feature.strand),
+                    {"label": feature.name},
+                )
+            )
+
+    lines.append("ORIGIN")
+    sequence = record.sequence.lower()
+    for start in range(0, len(sequence), 60):
+        blocks = [sequence[i : i + 10] for i in range(start, start + 60, 10)]
+        lines.append(f"{start + 1:>9} {' '.join(b for b in blocks if b)}")
+    lines.append("//")
+
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import shutil
+import time
+from uuid import uuid4
+
+from django.conf import settings
+
+BASE_DIR = settings.BASE_DIR
+MAP_CACHE_DIR = getattr(
+    settings, "MAP_CACHE_DIR", os.path.join(BASE_DIR, "uploads/map_cache")
+)
+MAP_CACHE_MAX_SIZE_MB = getattr(settings, "MAP_CACHE_MAX_SIZE_MB", 500)
+MAP_CACHE_EVICTION_INTERVAL = 60  # seconds
+
+_feature_db_versions = {}
+_last_eviction = 0
+
+
+def cache_enabled():
+    return MAP_CACHE_MAX_SIZE_MB > 0
+
+
+def file_sha256(file_path):
+    """Return the SHA-256 hex digest of a file"""
+
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as fhandle:
+        for chunk in iter(lambda: fhandle.read(65536), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def feature_db_version(feature_db_path):
+    """Return the version of a SnapGene feature database, i.e. the hash
+    of its content. Only re-hashed when the file changes"""
+
+    stat = os.stat(feature_db_path)
+    cached = _feature_db_versions.get(feature_db_path)
+    if cached and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+
+    version = file_sha256(feature_db_path)
+    _feature_db_versions[feature_db_path] = ((stat.st_mtime_ns, stat.st_size), version)
+    return version
+
+
+def get_key(map_path, request, **params):
+    """Return the cache key for the result of a SnapGene request on a map,
+    i.e. the hash of the map's content, the request and its parameters"""
+
+    key_data = json.dumps(
+        [file_sha256(map_path), request, params], sort_keys=True, default=str
+    )
+    return hashlib.sha256(key_data.encode()).hexdigest()
+
+
+def get_entry_path(key):
+    return os.path.join(MAP_CACHE_DIR, key[:2], key)
+
+
+def write_atomic(entry_path, write):
+    """Write an entry to a temporary file and move it into place,
+    so that readers never see a partial entry"""
+
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    temp_path = f"{entry_path}.{uuid4()}.tmp"
+    try:
+        write(temp_path)
+        os.replace(temp_path, entry_path)
+    finally:
+        if os.path.exists(temp_path):
+            os.unlink(temp_path)
+
+
+def touch(entry_path):
+    """Mark an entry as recently used"""
+
+    try:
+        os.utime(entry_path)
+    except OSError:
+        pass
+
+
+def get_file(key, dest_path):
+    """Copy a cached file to dest_path. Returns False if there is no
+    such entry"""
+
+    if not cache_enabled():
+        return False
+
+    entry_path = get_entry_path(key)
+    if not os.path.isfile(entry_path):
+        return False
+
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    write_atomic(dest_path, lambda temp_path: shutil.copyfile(entry_path, temp_path))
+    touch(entry_path)
+    return True
+
+
+def set_file(key, src_path):
+    """Store a copy of a file in the cache"""
+
+    if not cache_enabled():
+        return
+
+    write_atomic(
+        get_entry_path(key), lambda temp_path: shutil.copyfile(src_path, temp_path)
+    )
+    evict()
+
+
+def get_json(key):
+    """Return a cached JSON value, or None if there is no such entry"""
+
+    if not cache_enabled():
+        return None
+
+    entry_path = get_entry_path(key)
+    try:
+        with open(entry_path) as fhandle:
+            value = json.load(fhandle)
+    except (OSError, ValueError):
+        return None
+
+    touch(entry_path)
+    return value
+
+
+def set_json(key, value):
+    """Store a JSON-serializable value in the cache"""
+
+    if not cache_enabled():
+        return
+
+    def write(temp_path):
+        with open(temp_path, "w") as fhandle:
+            json.dump(value, fhandle)
+
+    write_atomic(get_entry_path(key), write)
+    evict()
+
+
+def evict(force=False):
+    """Delete the least recently used entries until the cache is smaller
+    than MAP_CACHE_MAX_SIZE_MB. Unless forced, the cache is checked at most
+    once every MAP_CACHE_EVICTION_INTERVAL seconds"""
+
+    global _last_eviction
+
+    now = time.monotonic()
+    if not force and now - _last_eviction < MAP_CACHE_EVICTION_INTERVAL:
+        return
+    _last_eviction = now
+
+    entries = []
+    total_size = 0
+    if not os.path.isdir(MAP_CACHE_DIR):
+        return
+    for bucket in os.scandir(MAP_CACHE_DIR):
+        if not bucket.is_dir():
+            continue
+        for entry in os.scandir(bucket.path):
+            if entry.name.endswith(".tmp"):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total_size += stat.st_size
+
+    max_size = MAP_CACHE_MAX_SIZE_MB * 1024 * 1024
+    for _, size, entry_path in sorted(entries):
+        if total_size <= max_size:
+            break
+        try:
+            os.unlink(entry_path)
+        except OSError:
+            continue
+        total_size -= size
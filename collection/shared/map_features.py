@@ -0,0 +1,68 @@
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+
+from .genbank import read_genbank
+from .snapgene_dna import read_dna
+
+MAP_FEATURES_CHUNK_SIZE = 16
+
+# Errors raised for maps that cannot be read, e.g. because they are
+# missing or not valid
+MAP_READ_ERRORS = (OSError, ValueError, ET.ParseError)
+
+
+def read_map(file_path):
+    """Read a SnapGene .dna or GenBank map. The format is detected from
+    the content of the file, SnapGene files start with a tab"""
+
+    with open(file_path, "rb") as fhandle:
+        first_byte = fhandle.read(1)
+
+    if first_byte == b"\t":
+        return read_dna(file_path)
+    return read_genbank(file_path)
+
+
+def read_map_features(file_path):
+    """Return the features of a map, with their names, types
+    and coordinates"""
+
+    return read_map(file_path).features
+
+
+def read_map_feature_names(file_path):
+    """Return the names of the features of a map, as reported
+    by SnapGene server's reportFeatures, which does not include
+    the source feature of GenBank files"""
+
+    return [
+        feature.name
+        for feature in read_map_features(file_path)
+        if feature.type != "source"
+    ]
+
+
+def try_read_map_feature_names(file_path):
+    """Return the feature names of a map, or None if it cannot be read"""
+
+    try:
+        return read_map_feature_names(file_path)
+    except Exception:
+        return None
+
+
+def read_map_feature_names_bulk(file_paths, max_workers=None):
+    """Read the feature names of many maps in parallel. Returns a dict
+    of file paths to feature names, or None for maps that cannot be read"""
+
+    file_paths = list(file_paths)
+    if not file_paths:
+        return {}
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        feature_names = executor.map(
+            try_read_map_feature_names,
+            file_paths,
+            chunksize=MAP_FEATURES_CHUNK_SIZE,
+        )
+        return dict(zip(file_paths, feature_names))
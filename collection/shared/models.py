@@ -68,6 +68,39 @@ class OwnershipFieldsMixin(models.Model):
     )
 
 
+class MapStatusFieldsMixin(models.Model):
+    """Status of the background processing of a record's map"""
+
+    class Meta:
+        abstract = True
+
+    _history_view_ignore_fields = [
+        "map_status",
+        "map_status_message",
+        "map_missing_features",
+    ]
+
+    map_status = models.CharField(
+        "map status",
+        max_length=10,
+        choices=(
+            ("pending", "Pending"),
+            ("processing", "Processing"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ),
+        blank=True,
+        default="",
+    )
+    map_status_message = models.TextField("map status message", blank=True)
+    map_missing_features = ArrayField(
+        models.CharField(max_length=255),
+        verbose_name="missing map features",
+        blank=True,
+        default=list,
+    )
+
+
 class HistoryDocFieldMixin(models.Model):
     """Common history doc field"""
 
@@ -299,6 +332,15 @@ class MapFileChecPropertieskMixin:
         if errors:
             raise ValidationError(errors)
 
+    @property
+    def map_preview_title(self):
+        """Title shown on the .png preview of the map"""
+
+        return (
+            f"{self._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}"
+            f"{self.id} - {self.name}"
+        )
+
     @property
     def png_map_as_base64(self):
         """Returns html image element for map"""
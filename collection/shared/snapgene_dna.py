@@ -0,0 +1,121 @@
+import xml.etree.ElementTree as ET
+
+from .genbank import MapFeature, MapRecord
+
+# A SnapGene .dna file is a sequence of packets, each made of a one-byte
+# type, the length of its data as a four-byte big-endian integer, and the
+# data itself
+COOKIE_PACKET = 0x09
+DNA_PACKET = 0x00
+FEATURES_PACKET = 0x0A
+
+# directionality attribute of features
+STRANDS = {"1": 1, "2": -1}
+DIRECTIONALITIES = {1: "1", -1: "2"}
+
+
+def iter_packets(data):
+    """Return (type, data) for all packets in a .dna file"""
+
+    position = 0
+    while position + 5 <= len(data):
+        packet_type = data[position]
+        length = int.from_bytes(data[position + 1 : position + 5], "big")
+        packet_data = data[position + 5 : position + 5 + length]
+        if len(packet_data) != length:
+            raise ValueError("Not a valid SnapGene file, packet is truncated")
+        yield packet_type, packet_data
+        position += 5 + length
+
+
+def parse_features(xml_data):
+    """Parse the features packet, which is an XML document"""
+
+    features = []
+    for feature in ET.fromstring(xml_data).iter("Feature"):
+        segments = []
+        for segment in feature.iter("Segment"):
+            if segment.get("type") == "gap" or not segment.get("range"):
+                continue
+            start, _, end = segment.get("range").partition("-")
+            segments.append((int(start), int(end or start)))
+        features.append(
+            MapFeature(
+                (feature.get("name") or feature.get("type") or "").strip(),
+                feature.get("type", ""),
+                segments,
+                STRANDS.get(feature.get("directionality"), 0),
+            )
+        )
+    return features
+
+
+def parse_dna(data):
+    """Parse the contents of a SnapGene .dna file"""
+
+    packets = iter_packets(data)
+    first_packet = next(packets, None)
+    if (
+        first_packet is None
+        or first_packet[0] != COOKIE_PACKET
+        or first_packet[1][:8] != b"SnapGene"
+    ):
+        raise ValueError("Not a valid SnapGene file")
+
+    sequence = ""
+    circular = False
+    features = []
+    for packet_type, packet_data in packets:
+        if packet_type == DNA_PACKET and packet_data:
+            circular = bool(packet_data[0] & 0x01)
+            sequence = packet_data[1:].decode("ascii", errors="replace").upper()
+        elif packet_type == FEATURES_PACKET:
+            features = parse_features(packet_data)
+
+    return MapRecord("", sequence, circular, features)
+
+
+def read_dna(file_path):
+    """Read a SnapGene .dna file"""
+
+    with open(file_path, "rb") as fhandle:
+        return parse_dna(fhandle.read())
+
+
+def format_packet(packet_type, packet_data):
+    return bytes([packet_type]) + len(packet_data).to_bytes(4, "big") + packet_data
+
+
+def format_features(features):
+    """Format features as the XML document of a features packet"""
+
+    features_element = ET.Element("Features", nextValidID=str(len(features)))
+    for i, feature in enumerate(features):
+        feature_element = ET.SubElement(
+            features_element,
+            "Feature",
+            recentID=str(i),
+            name=feature.name,
+            type=feature.type or "misc_feature",
+        )
+        if feature.strand in DIRECTIONALITIES:
+            feature_element.set("directionality", DIRECTIONALITIES[feature.strand])
+        for start, end in feature.segments:
+            ET.SubElement(feature_element, "Segment", range=f"{start}-{end}")
+    return ET.tostring(features_element, encoding="utf-8", xml_declaration=True)
+
+
+def format_dna(record):
+    """Format a map as the contents of a minimal SnapGene .dna file,
+    with a sequence and features"""
+
+    # Cookie, followed by the sequence type (1, DNA), export version
+    # and import version
+    cookie = b"SnapGene" + (1).to_bytes(2, "big") + (16).to_bytes(2, "big") * 2
+    dna = bytes([0x01 if record.circular else 0x00]) + record.sequence.encode("ascii")
+
+    return (
+        format_packet(COOKIE_PACKET, cookie)
+        + format_packet(DNA_PACKET, dna)
+        + format_packet(FEATURES_PACKET, format_features(record.features))
+    )
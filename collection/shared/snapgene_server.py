@@ -0,0 +1,210 @@
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+import zmq
+from django.conf import settings
+
+from snapgene.pyclasses.client_pool import ClientPool
+from snapgene.pyclasses.config import Config
+
+SNAPGENE_SERVER_CONFIG = getattr(settings, "SNAPGENE_SERVER_CONFIG", None)
+SNAPGENE_CLIENT_POOL_SIZE = getattr(settings, "SNAPGENE_CLIENT_POOL_SIZE", 2)
+SNAPGENE_CLIENT_CHECKOUT_TIMEOUT = getattr(
+    settings, "SNAPGENE_CLIENT_CHECKOUT_TIMEOUT", 5
+)
+# Clients idle for more than SNAPGENE_CLIENT_PROBE_AFTER seconds are probed
+# before use and replaced if their server does not answer within
+# SNAPGENE_CLIENT_PROBE_TIMEOUT ms
+SNAPGENE_CLIENT_PROBE_AFTER = getattr(settings, "SNAPGENE_CLIENT_PROBE_AFTER", 60)
+SNAPGENE_CLIENT_PROBE_TIMEOUT = getattr(settings, "SNAPGENE_CLIENT_PROBE_TIMEOUT", 1000)
+# A server is skipped for SNAPGENE_BREAKER_RESET_TIMEOUT seconds after
+# SNAPGENE_BREAKER_FAILURE_THRESHOLD consecutive failed requests
+SNAPGENE_BREAKER_FAILURE_THRESHOLD = getattr(
+    settings, "SNAPGENE_BREAKER_FAILURE_THRESHOLD", 3
+)
+SNAPGENE_BREAKER_RESET_TIMEOUT = getattr(settings, "SNAPGENE_BREAKER_RESET_TIMEOUT", 30)
+# Failed requests are retried on the next server, waiting a random time of
+# up to SNAPGENE_RETRY_BACKOFF * 2 ** attempt seconds, but no longer than
+# SNAPGENE_CALL_DEADLINE seconds in total
+SNAPGENE_RETRY_ATTEMPTS = getattr(settings, "SNAPGENE_RETRY_ATTEMPTS", 3)
+SNAPGENE_RETRY_BACKOFF = getattr(settings, "SNAPGENE_RETRY_BACKOFF", 0.5)
+SNAPGENE_RETRY_BACKOFF_MAX = getattr(settings, "SNAPGENE_RETRY_BACKOFF_MAX", 5)
+SNAPGENE_CALL_DEADLINE = getattr(settings, "SNAPGENE_CALL_DEADLINE", 30)
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+class SnapGeneServerError(Exception):
+    """Error of a SnapGene server request. reason is "error" if the server
+    answered with an error code, "timeout" if it did not answer in time and
+    "unavailable" if no server could be reached"""
+
+    def __init__(
+        self, message, request=None, code=None, server_index=None, reason="error"
+    ):
+        super().__init__(message)
+        self.request = request
+        self.code = code
+        self.server_index = server_index
+        self.reason = reason
+
+    @property
+    def retryable(self):
+        return self.reason != "error"
+
+
+class SnapGeneServerUnavailable(SnapGeneServerError):
+    """No SnapGene server can be reached, because all are down or busy"""
+
+    def __init__(self, message, request=None):
+        super().__init__(message, request=request, reason="unavailable")
+
+
+def new_snapgene_pool(server_ports):
+    return ClientPool(
+        server_ports,
+        zmq.Context(),
+        size=SNAPGENE_CLIENT_POOL_SIZE,
+        checkout_timeout=SNAPGENE_CLIENT_CHECKOUT_TIMEOUT,
+        probe_after=SNAPGENE_CLIENT_PROBE_AFTER,
+        probe_timeout=SNAPGENE_CLIENT_PROBE_TIMEOUT,
+        failure_threshold=SNAPGENE_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=SNAPGENE_BREAKER_RESET_TIMEOUT,
+    )
+
+
+def get_snapgene_pool():
+    """Return the SnapGene client pool of the current process.
+
+    The pool, its zmq context and the server configuration are created
+    once per worker process. A new pool is created after a fork, because
+    zmq contexts cannot be shared between processes"""
+
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = new_snapgene_pool(Config(SNAPGENE_SERVER_CONFIG).get_server_ports())
+            _pool_pid = os.getpid()
+
+    return _pool
+
+
+def reset_snapgene_pool(server_ports=None):
+    """Close the current pool, if any. If server_ports is given, replace it
+    with a pool for those ports instead of the configured ones"""
+
+    global _pool, _pool_pid
+
+    with _pool_lock:
+        if _pool is not None and _pool_pid == os.getpid():
+            _pool.close()
+        _pool = None
+        _pool_pid = None
+
+        if server_ports is not None:
+            _pool = new_snapgene_pool(server_ports)
+            _pool_pid = os.getpid()
+
+
+@contextmanager
+def snapgene_client(server_index=None):
+    """Check out a SnapGene client from the pool and return it
+    to the pool when done"""
+
+    pool = get_snapgene_pool()
+    client = pool.checkout(server_index)
+    try:
+        yield client
+    finally:
+        pool.checkin(client)
+
+
+def get_backoff(attempt_number):
+    """Exponential backoff with full jitter"""
+
+    return random.uniform(
+        0, min(SNAPGENE_RETRY_BACKOFF_MAX, SNAPGENE_RETRY_BACKOFF * 2**attempt_number)
+    )
+
+
+def request_snapgene_server(argument, timeout=10000, deadline=None):
+    """Send a request to SnapGene server and return its response.
+
+    Requests that time out are retried on the next server whose circuit
+    breaker is closed, until SNAPGENE_RETRY_ATTEMPTS attempts were made or
+    the deadline (time.monotonic() value, by default SNAPGENE_CALL_DEADLINE
+    seconds from now) has passed. timeout is the maximum time in ms for
+    one attempt. If all servers are down, SnapGeneServerUnavailable is
+    raised immediately. Error codes returned by the server are not retried"""
+
+    request = argument.get("request")
+    deadline = deadline or time.monotonic() + SNAPGENE_CALL_DEADLINE
+    pool = get_snapgene_pool()
+    error = None
+
+    for attempt_number in range(SNAPGENE_RETRY_ATTEMPTS):
+        if attempt_number > 0:
+            backoff = get_backoff(attempt_number - 1)
+            if time.monotonic() + backoff >= deadline:
+                break
+            time.sleep(backoff)
+
+        server_index = next(
+            (i for i in pool.get_available_servers() if pool.breakers[i].allow()),
+            None,
+        )
+        if server_index is None:
+            raise SnapGeneServerUnavailable(
+                f"{request} - no SnapGene server is available", request=request
+            )
+        breaker = pool.breakers[server_index]
+
+        remaining = deadline - time.monotonic()
+        try:
+            client = pool.checkout(
+                server_index, timeout=min(SNAPGENE_CLIENT_CHECKOUT_TIMEOUT, remaining)
+            )
+        except Exception as err:
+            # All clients of the server are busy, which is not its failure
+            breaker.release()
+            error = SnapGeneServerUnavailable(f"{request} - {err}", request=request)
+            continue
+
+        try:
+            response = client.requestResponse(
+                argument, max(int(min(timeout / 1000, remaining) * 1000), 1)
+            )
+        except Exception as err:
+            breaker.record_failure()
+            error = SnapGeneServerError(
+                f"{request} - {err} on server {server_index}",
+                request=request,
+                server_index=server_index,
+                reason="timeout",
+            )
+            continue
+        finally:
+            pool.checkin(client)
+
+        breaker.record_success()
+
+        code = response.get("code", 1)
+        if code > 0:
+            raise SnapGeneServerError(
+                f"{request} - error {code}",
+                request=request,
+                code=code,
+                server_index=server_index,
+            )
+
+        return response
+
+    raise error or SnapGeneServerError(
+        f"{request} - deadline exceeded", request=request, reason="timeout"
+    )
@@ -0,0 +1,165 @@
+import os
+import re
+
+from django.test import SimpleTestCase
+
+from collection.oligo.binding_sites import (
+    OligoSeedIndex,
+    binding_sites_as_genbank_features,
+    binding_sites_as_json,
+)
+from collection.shared.genbank import (
+    MapRecord,
+    add_features,
+    format_genbank,
+    parse_genbank,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+# The oligos of the primer library used for the fixture map, by ID. 3 has
+# a 5' tail that does not bind, 4 a mismatch, 5 binds across the origin,
+# 6 does not bind and 7 is too short to be used as a primer
+OLIGOS = [
+    (1, "ATACACGTCAGCACGAAACT"),
+    (2, "CAGTCCGATGGGGTGGACACAG"),
+    (3, "GTCTTGTCGGGTAATTTTGACAGG"),
+    (4, "GCGCCGTCCTGAAGTGCGTG"),
+    (5, "CTGCCAAAGCTAAAGACAAT"),
+    (6, "CTCCAGCGCGGTCAGTTCCATC"),
+    (7, "CTTAAGGGTT"),
+]
+
+
+def get_oligo_id(feature_name):
+    return int(re.search(r"\d+$", feature_name).group())
+
+
+def get_primer_features(record):
+    """Return the primer_bind features of a map as (oligo ID, segments,
+    strand)"""
+
+    return sorted(
+        (get_oligo_id(feature.name), feature.segments, feature.strand)
+        for feature in record.features
+        if feature.type == "primer_bind"
+    )
+
+
+class OligoSeedIndexTest(SimpleTestCase):
+    """The binding sites found in a map are compared with the primer_bind
+    features that importPrimersFromList adds to it, as exported to the
+    fixture map primer_binding_map.gbk"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        with open(os.path.join(FIXTURES_DIR, "primer_binding_map.gbk")) as fhandle:
+            cls.expected_record = parse_genbank(fhandle.read())
+        cls.record = MapRecord(
+            cls.expected_record.name,
+            cls.expected_record.sequence,
+            cls.expected_record.circular,
+            [
+                feature
+                for feature in cls.expected_record.features
+                if feature.type != "primer_bind"
+            ],
+        )
+        cls.index = OligoSeedIndex(OLIGOS)
+
+    def test_short_oligos_are_not_indexed(self):
+        self.assertEqual(len(self.index), 6)
+
+    def test_binding_sites_match_primer_features(self):
+        binding_sites = self.index.find_binding_sites(
+            self.record.sequence, self.record.circular
+        )
+        gbk_data = add_features(
+            format_genbank(self.record),
+            binding_sites_as_genbank_features(binding_sites, len(self.record)),
+        )
+
+        self.assertEqual(
+            get_primer_features(parse_genbank(gbk_data)),
+            get_primer_features(self.expected_record),
+        )
+
+    def test_annealed_part_and_mismatches(self):
+        binding_sites = {
+            binding_site.oligo_id: binding_site
+            for binding_site in self.index.find_binding_sites(
+                self.record.sequence, self.record.circular
+            )
+        }
+
+        self.assertTrue(binding_sites[1].exact)
+        # The 5' tail is not part of the binding site
+        self.assertEqual(binding_sites[3].annealed_length, 18)
+        self.assertEqual(binding_sites[3].mismatches, 0)
+        self.assertFalse(binding_sites[3].exact)
+        self.assertEqual(binding_sites[4].annealed_length, 20)
+        self.assertEqual(binding_sites[4].mismatches, 1)
+
+    def test_lower_case_sequence(self):
+        self.assertEqual(
+            [
+                (b.oligo_id, b.start, b.end, b.strand)
+                for b in self.index.find_binding_sites(
+                    self.record.sequence.lower(), True
+                )
+            ],
+            [
+                (b.oligo_id, b.start, b.end, b.strand)
+                for b in self.index.find_binding_sites(self.record.sequence, True)
+            ],
+        )
+
+    def test_linear_map_has_no_binding_sites_across_origin(self):
+        oligo_ids = {
+            binding_site.oligo_id
+            for binding_site in self.index.find_binding_sites(
+                self.record.sequence, circular=False
+            )
+        }
+
+        self.assertEqual(oligo_ids, {1, 2, 3, 4})
+
+    def test_rotated_circular_map(self):
+        """Rotating a circular map moves the binding sites with it, also
+        those that then span the origin"""
+
+        sequence = self.record.sequence
+        length = len(sequence)
+        binding_sites = [
+            (b.oligo_id, b.start, b.end - b.start, b.strand)
+            for b in self.index.find_binding_sites(sequence, True)
+        ]
+
+        for shift in (1, 25, 110, 239):
+            rotated_sequence = sequence[shift:] + sequence[:shift]
+            self.assertEqual(
+                sorted(
+                    (b.oligo_id, b.start, b.end - b.start, b.strand)
+                    for b in self.index.find_binding_sites(rotated_sequence, True)
+                ),
+                sorted(
+                    (oligo_id, (start - shift) % length, annealed_length, strand)
+                    for oligo_id, start, annealed_length, strand in binding_sites
+                ),
+                f"shift {shift}",
+            )
+
+    def test_binding_sites_as_json(self):
+        binding_sites = self.index.find_binding_sites(self.record.sequence, True)
+        primers = {
+            primer["oligo_id"]: primer
+            for primer in binding_sites_as_json(binding_sites, len(self.record))
+        }
+
+        # Coordinates are 0-based and inclusive, the end of a binding site
+        # across the origin is at the start of the sequence
+        self.assertEqual((primers[1]["start"], primers[1]["end"]), (20, 39))
+        self.assertEqual((primers[5]["start"], primers[5]["end"]), (232, 11))
+        self.assertFalse(primers[2]["forward"])
+        self.assertEqual(primers[4]["mismatches"], 1)
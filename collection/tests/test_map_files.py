@@ -0,0 +1,186 @@
+import os
+import tempfile
+
+from django.test import SimpleTestCase
+
+from collection.shared.genbank import (
+    MapFeature,
+    MapRecord,
+    add_features,
+    format_feature,
+    format_genbank,
+    parse_genbank,
+)
+from collection.shared.map_features import read_map, read_map_feature_names
+from collection.shared.snapgene_dna import format_dna, format_packet, parse_dna
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+SEQUENCE = (
+    "TTTCCTCATGCAATTCAAAACCATGTCCGTAATGTAGGCGAAATAGTAAACCATTTTACGGAGGATACCAA"
+    "ATTCCTCCTTATTCAGGACCTAACCTGAGGTAAACCAGGTCTCTCCGCCCCCTTATAAAAGCTGTTGCACCT"
+    "AGCCAAG"
+)
+
+
+def read_fixture(file_name):
+    with open(os.path.join(FIXTURES_DIR, file_name)) as fhandle:
+        return fhandle.read()
+
+
+def as_tuples(features):
+    return [
+        (feature.name, feature.type, feature.segments, feature.strand)
+        for feature in features
+    ]
+
+
+class GenBankTest(SimpleTestCase):
+    """snapgene_export.gbk is a map as exported by SnapGene server's
+    exportDNAFile"""
+
+    def setUp(self):
+        self.record = parse_genbank(read_fixture("snapgene_export.gbk"))
+
+    def test_parse(self):
+        self.assertEqual(self.record.name, "pTest")
+        self.assertTrue(self.record.circular)
+        self.assertEqual(self.record.sequence, SEQUENCE)
+        self.assertEqual(
+            as_tuples(self.record.features),
+            [
+                ("source", "source", [(1, 150)], 1),
+                ("lac promoter", "promoter", [(5, 34)], 1),
+                ("bla", "CDS", [(40, 60), (70, 90)], -1),
+                ("partial feature", "misc_feature", [(95, 110)], 1),
+                ("ori", "rep_origin", [(140, 150), (1, 4)], 1),
+                ("primer_bind", "primer_bind", [(120, 120)], 1),
+            ],
+        )
+
+    def test_round_trip(self):
+        record = parse_genbank(format_genbank(self.record))
+
+        self.assertEqual(record.name, self.record.name)
+        self.assertEqual(record.sequence, self.record.sequence)
+        self.assertEqual(record.circular, self.record.circular)
+        self.assertEqual(as_tuples(record.features), as_tuples(self.record.features))
+
+    def test_round_trip_linear(self):
+        record = MapRecord("linear map", "ACGT" * 20, False, [])
+
+        parsed_record = parse_genbank(format_genbank(record))
+
+        self.assertEqual(parsed_record.name, "linear_map")
+        self.assertFalse(parsed_record.circular)
+        self.assertEqual(parsed_record.sequence, record.sequence)
+
+    def test_add_features(self):
+        feature_lines = format_feature(
+            "primer_bind", "complement(11..30)", {"label": "o1"}
+        )
+
+        record = parse_genbank(
+            add_features(read_fixture("snapgene_export.gbk"), feature_lines)
+        )
+
+        self.assertEqual(
+            as_tuples(record.features[-1:]),
+            [("o1", "primer_bind", [(11, 30)], -1)],
+        )
+        self.assertEqual(record.sequence, SEQUENCE)
+
+    def test_add_features_without_feature_table(self):
+        gbk_data = "LOCUS       empty 8 bp DNA linear\nORIGIN\n        1 acgtacgt\n//\n"
+
+        record = parse_genbank(
+            add_features(gbk_data, format_feature("misc_feature", "1..4", {}))
+        )
+
+        self.assertEqual(
+            as_tuples(record.features), [("misc_feature", "misc_feature", [(1, 4)], 1)]
+        )
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_genbank("LOCUS       no_sequence 0 bp DNA linear\n//\n")
+        with self.assertRaises(ValueError):
+            add_features("not a GenBank file", [])
+
+
+class SnapGeneDnaTest(SimpleTestCase):
+    def setUp(self):
+        self.record = parse_genbank(read_fixture("snapgene_export.gbk"))
+
+    def test_round_trip(self):
+        record = parse_dna(format_dna(self.record))
+
+        self.assertEqual(record.sequence, self.record.sequence)
+        self.assertTrue(record.circular)
+        self.assertEqual(as_tuples(record.features), as_tuples(self.record.features))
+
+    def test_round_trip_through_genbank(self):
+        """A .dna map converted to GenBank and back, as importDNAFile and
+        exportDNAFile do, keeps its sequence and features"""
+
+        record = parse_dna(
+            format_dna(
+                parse_genbank(format_genbank(parse_dna(format_dna(self.record))))
+            )
+        )
+
+        self.assertEqual(record.sequence, self.record.sequence)
+        self.assertEqual(as_tuples(record.features), as_tuples(self.record.features))
+
+    def test_feature_without_name(self):
+        record = MapRecord("", "ACGT" * 10, False, [MapFeature("", "CDS", [(1, 9)], 0)])
+
+        (feature,) = parse_dna(format_dna(record)).features
+
+        # As in SnapGene, a feature without a name is called by its type
+        self.assertEqual(as_tuples([feature]), [("CDS", "CDS", [(1, 9)], 0)])
+        self.assertFalse(parse_dna(format_dna(record)).circular)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            parse_dna(b"")
+        with self.assertRaises(ValueError):
+            parse_dna(format_packet(0x09, b"NotSnapGene"))
+        with self.assertRaises(ValueError):
+            parse_dna(format_dna(self.record)[:-10])
+
+
+class ReadMapTest(SimpleTestCase):
+    def setUp(self):
+        self.record = parse_genbank(read_fixture("snapgene_export.gbk"))
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def write_file(self, file_name, data):
+        file_path = os.path.join(self.temp_dir.name, file_name)
+        with open(file_path, "wb") as fhandle:
+            fhandle.write(data)
+        return file_path
+
+    def test_format_is_detected_from_content(self):
+        for file_name, data in (
+            ("map.dna", format_dna(self.record)),
+            ("map.gbk", format_genbank(self.record).encode()),
+            # Uploaded files are not always named after their format
+            ("map", format_dna(self.record)),
+        ):
+            record = read_map(self.write_file(file_name, data))
+            self.assertEqual(record.sequence, SEQUENCE, file_name)
+            self.assertEqual(
+                as_tuples(record.features), as_tuples(self.record.features), file_name
+            )
+
+    def test_feature_names(self):
+        """As reportFeatures, the source feature is not reported"""
+
+        file_path = self.write_file("map.dna", format_dna(self.record))
+
+        self.assertEqual(
+            read_map_feature_names(file_path),
+            ["lac promoter", "bla", "partial feature", "ori", "primer_bind"],
+        )
@@ -1,15 +1,13 @@
-import os
-
 from django.conf import settings
-from django.contrib import admin, messages
+from django.contrib import admin
 from django.contrib.auth import get_user_model
-from django.utils import timezone
 from django.utils.html import format_html
 
 from common.admin import (
     AddDocFileInlineMixin,
     DocFileInlineMixin,
 )
+from common.id_allocation import allocate_id
 from formz.actions import formz_as_html
 
 from ..plasmid.admin import PlasmidAdmin
@@ -17,8 +15,7 @@ from ..shared.admin import (
     CollectionUserProtectionAdmin,
     CustomGuardedModelAdmin,
     SortAutocompleteResultsId,
-    convert_map_gbk_to_dna,
-    create_map_preview,
+    name_map_files_before_save,
 )
 from .actions import export_wormstrain, export_wormstrainallele
 from .forms import WormStrainAdminForm, WormStrainAlleleAdminForm
@@ -30,8 +27,6 @@ from .models import (
 from .search import WormStrainAlleleQLSchema, WormStrainQLSchema
 
 User = get_user_model()
-MEDIA_ROOT = settings.MEDIA_ROOT
-LAB_ABBREVIATION_FOR_FILES = getattr(settings, "LAB_ABBREVIATION_FOR_FILES", "")
 WORM_ALLELE_LAB_ID_DEFAULT = getattr(settings, "WORM_ALLELE_LAB_ID_DEFAULT", "")
 WORM_STRAIN_REGEX = getattr(settings, "WORM_STRAIN_REGEX", r"")
 WORM_STRAIN_LAB_ID_DEFAULT = getattr(settings, "WORM_STRAIN_LAB_ID_DEFAULT", "")
@@ -203,26 +198,16 @@ class WormStrainAdmin(
             return True
         return False
 
-    def save_related(self, request, form, formsets, change):
-        obj, history_obj = super().save_related(request, form, formsets, change)
-
-        obj.history_genotyping_oligos = (
-            sorted(
-                list(
-                    set(
-                        obj.wormstraingenotypingassay_set.all().values_list(
-                            "oligos", flat=True
-                        )
+    def get_history_array_field_values(self, obj):
+        return {
+            "history_genotyping_oligos": sorted(
+                set(
+                    obj.wormstraingenotypingassay_set.exclude(oligos=None).values_list(
+                        "oligos", flat=True
                     )
                 )
             )
-            if obj.wormstraingenotypingassay_set.exists()
-            else []
-        )
-        obj.save_without_historical_record()
-
-        history_obj.history_genotyping_oligos = obj.history_genotyping_oligos
-        history_obj.save()
+        }
 
     def get_inline_instances(self, request, obj=None):
         inline_instances = super().get_inline_instances(request, obj)
@@ -402,22 +387,14 @@ class WormStrainAlleleAdmin(PlasmidAdmin):
         return False
 
     def save_model(self, request, obj, form, change):
-        rename_and_preview = False
         self.rename_and_preview = False
-        new_obj = False
         self.new_obj = False
         self.clear_sequence_features = False
-        convert_map_to_dna = False
+        self.convert_map_to_dna = False
 
         if obj.pk is None:
-            obj.id = (
-                self.model.objects.order_by("-id").first().id + 1
-                if self.model.objects.exists()
-                else 1
-            )
+            obj.id = allocate_id(self.model)
             obj.created_by = request.user
-            obj.save()
-            new_obj = True
             self.new_obj = True
 
             # If an object is 'Saved as new', clear all form Z elements
@@ -425,14 +402,16 @@ class WormStrainAlleleAdmin(PlasmidAdmin):
                 self.clear_sequence_features = True
 
             # Check if a map is present and if so trigger functions to create a
-            # map preview and delete the resulting duplicate history record
+            # map preview. The map files are named before the object is first saved
             if obj.map:
-                rename_and_preview = True
                 self.rename_and_preview = True
             elif obj.map_gbk:
-                rename_and_preview = True
                 self.rename_and_preview = True
-                convert_map_to_dna = True
+                self.convert_map_to_dna = True
+
+            if self.rename_and_preview:
+                name_map_files_before_save(obj, self.convert_map_to_dna)
+            obj.save()
 
         else:
             # Check if the request's user can change the object, if not raise PermissionDenied
@@ -443,93 +422,27 @@ class WormStrainAlleleAdmin(PlasmidAdmin):
                 if (obj.map and obj.map_gbk) or (
                     not saved_obj.map and not saved_obj.map_gbk
                 ):
-                    rename_and_preview = True
                     self.rename_and_preview = True
-                    obj.save_without_historical_record()
 
                     if obj.map_gbk != saved_obj.map_gbk:
-                        convert_map_to_dna = True
+                        self.convert_map_to_dna = True
+
+                    name_map_files_before_save(obj, self.convert_map_to_dna)
+                    obj.save()
 
                 else:
                     obj.map.name = ""
                     obj.map_png.name = ""
                     obj.map_gbk.name = ""
+                    obj.map_status = ""
+                    obj.map_status_message = ""
+                    obj.map_missing_features = []
                     self.clear_sequence_features = True
                     obj.save()
 
             else:
                 obj.save()
 
-        # Rename map
-        if rename_and_preview:
-            timestamp = timezone.now().strftime("%Y%m%d_%H%M%S_%f")
-            new_file_name = f"{self.model._model_abbreviation}{LAB_ABBREVIATION_FOR_FILES}{obj.id}_{timestamp}"
-
-            new_dna_file_name = os.path.join(
-                self.model._model_upload_to, "dna/", new_file_name + ".dna"
-            )
-            new_gbk_file_name = os.path.join(
-                self.model._model_upload_to, "gbk/", new_file_name + ".gbk"
-            )
-            new_png_file_name = os.path.join(
-                self.model._model_upload_to, "png/", new_file_name + ".png"
-            )
-
-            new_dna_file_path = os.path.join(MEDIA_ROOT, new_dna_file_name)
-            new_gbk_file_path = os.path.join(MEDIA_ROOT, new_gbk_file_name)
-
-            if convert_map_to_dna:
-                old_gbk_file_path = obj.map_gbk.path
-                os.rename(old_gbk_file_path, new_gbk_file_path)
-                try:
-                    convert_map_gbk_to_dna(new_gbk_file_path, new_dna_file_path)
-                except Exception:
-                    messages.error(
-                        request, "There was an error with converting the map to .gbk."
-                    )
-            else:
-                old_dna_file_path = obj.map.path
-                os.rename(old_dna_file_path, new_dna_file_path)
-
-            obj.map.name = new_dna_file_name
-            obj.map_png.name = new_png_file_name
-            obj.map_gbk.name = new_gbk_file_name
-            obj.save()
-
-            # For new records, delete first history record, which contains the unformatted
-            # map name, and change the newer history record's history_type from changed (~)
-            # to created (+). This gets rid of a duplicate history record created when
-            # automatically generating a map name
-            if new_obj:
-                obj.history.last().delete()
-                history_obj = obj.history.first()
-                history_obj.history_type = "+"
-                history_obj.save()
-
-            # For map, detect common features and save as png
-            try:
-                detect_common_features_map_dna = request.POST.get(
-                    "detect_common_features_map", False
-                )
-                detect_common_features_map_gbk = request.POST.get(
-                    "detect_common_features_map_gbk", False
-                )
-                detect_common_features = (
-                    True
-                    if (
-                        detect_common_features_map_dna or detect_common_features_map_gbk
-                    )
-                    else False
-                )
-                create_map_preview(
-                    obj, detect_common_features, prefix=obj.lab_identifier
-                )
-            except Exception:
-                messages.error(
-                    request,
-                    "There was an error detecting common features and/or saving the map preview",
-                )
-
     def get_form(self, request, obj=None, **kwargs):
         form = super().get_form(request, obj, **kwargs)
         allele_type = ""
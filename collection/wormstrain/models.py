@@ -14,6 +14,7 @@ from ..shared.models import (
     FormZFieldsMixin,
     HistoryDocFieldMixin,
     MapFileChecPropertieskMixin,
+    MapStatusFieldsMixin,
     OwnershipFieldsMixin,
 )
 
@@ -38,6 +39,7 @@ class WormStrainAllele(
     HistoryDocFieldMixin,
     HistoryFieldMixin,
     MapFileChecPropertieskMixin,
+    MapStatusFieldsMixin,
     OwnershipFieldsMixin,
     models.Model,
 ):
@@ -54,10 +56,11 @@ class WormStrainAllele(
         "history_transgene_plasmids": Plasmid,
         "history_documents": WormStrainAlleleDoc,
     }
-    _history_view_ignore_fields = OwnershipFieldsMixin._history_view_ignore_fields + [
-        "map_png",
-        "map_gbk",
-    ]
+    _history_view_ignore_fields = (
+        OwnershipFieldsMixin._history_view_ignore_fields
+        + MapStatusFieldsMixin._history_view_ignore_fields
+        + ["map_png", "map_gbk"]
+    )
 
     lab_identifier = models.CharField(
         "prefix/Lab identifier",
@@ -170,6 +173,10 @@ class WormStrainAllele(
     def download_file_name(self):
         return self.__str__()
 
+    @property
+    def map_preview_title(self):
+        return self.lab_identifier
+
     @property
     def plasmids_in_model(self):
         return sorted(
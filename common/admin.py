@@ -1,18 +1,24 @@
-import itertools
-
 from django.contrib import admin
 from django.contrib.admin.utils import unquote
 from django.contrib.auth import get_user_model
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from django.http import Http404, JsonResponse
+from django.http import Http404, HttpResponseBadRequest, JsonResponse
 from django.shortcuts import render
 from django.urls import path, resolve
+from django.utils import timezone
 from django.utils.encoding import force_str
 from django.utils.safestring import mark_safe
 from django.utils.text import capfirst
 from django.utils.translation import gettext_lazy as _
 from simple_history.admin import SimpleHistoryAdmin
 
+from .history import (
+    get_history_page,
+    get_m2m_snapshot,
+    save_history_array_fields,
+)
+from .notifications import send_notifications
+
 User = get_user_model()
 
 
@@ -260,26 +266,67 @@ class OwnUserAdmin(BaseUserAdmin):
         return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 
+@admin.action(description="Queue selected notifications again")
+def requeue_notifications(modeladmin, request, queryset):
+    """Send failed notifications again, with a new number of attempts"""
+
+    queryset.filter(status="failed").update(
+        status="queued", attempts=0, next_attempt_date_time=timezone.now()
+    )
+    send_notifications()
+
+
+class NotificationAdmin(admin.ModelAdmin):
+    list_display = (
+        "id",
+        "subject",
+        "recipients",
+        "status",
+        "attempts",
+        "next_attempt_date_time",
+        "sent_date_time",
+    )
+    list_display_links = ("id",)
+    list_filter = ("status",)
+    search_fields = ("subject", "recipients")
+    ordering = ["-id"]
+    actions = [requeue_notifications]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 class SimpleHistoryWithSummaryAdmin(SimpleHistoryAdmin):
     object_history_template = "admin/object_history_with_change_summary.html"
     history_array_fields = {}
 
-    def history_view(self, request, object_id, extra_context=None):
-        """The 'history' admin view for this model."""
+    def get_urls(self):
+        """
+        Add url of the older changes of the history view
+        """
 
-        def pairwise(iterable):
-            """Create pairs of consecutive items from
-            iterable"""
+        urls = super().get_urls()
+        opts = self.model._meta
 
-            a, b = itertools.tee(iterable)
-            next(b, None)
-            return zip(a, b)
+        urls = [
+            path(
+                "<path:object_id>/history/changes/",
+                view=self.admin_site.admin_view(self.history_changes_view),
+                name=f"{opts.app_label}_{opts.model_name}_history_changes",
+            )
+        ] + urls
+
+        return urls
+
+    def get_history_object(self, request, object_id):
+        """Return the object, or its latest historical version if it
+        has been deleted, and its historical records"""
 
-        request.current_app = self.admin_site.name
         model = self.model
-        opts = model._meta
-        app_label = opts.app_label
-        pk_name = opts.pk.attname
+        pk_name = model._meta.pk.attname
         history = getattr(model, model._meta.simple_history_manager_attribute)
         object_id = unquote(object_id)
         action_list = history.filter(**{pk_name: object_id})
@@ -293,6 +340,17 @@ class SimpleHistoryWithSummaryAdmin(SimpleHistoryAdmin):
             except action_list.model.DoesNotExist:
                 raise Http404
 
+        return obj, action_list
+
+    def history_view(self, request, object_id, extra_context=None):
+        """The 'history' admin view for this model. Only the newest
+        changes are shown, older ones are loaded on request"""
+
+        request.current_app = self.admin_site.name
+        opts = self.model._meta
+        obj, action_list = self.get_history_object(request, object_id)
+        history_changes, next_cursor = get_history_page(obj)
+
         context = self.admin_site.each_context(request)
         context.update(
             {
@@ -300,8 +358,10 @@ class SimpleHistoryWithSummaryAdmin(SimpleHistoryAdmin):
                 "action_list": action_list,
                 "module_name": capfirst(force_str(opts.verbose_name_plural)),
                 "object": obj,
+                "history_changes": history_changes,
+                "next_cursor": next_cursor,
                 "root_path": getattr(self.admin_site, "root_path", None),
-                "app_label": app_label,
+                "app_label": opts.app_label,
                 "opts": opts,
                 "is_popup": "_popup" in request.GET,
             }
@@ -311,6 +371,61 @@ class SimpleHistoryWithSummaryAdmin(SimpleHistoryAdmin):
 
         return render(request, self.object_history_template, context, **extra_kwargs)
 
+    def history_changes_view(self, request, object_id):
+        """Return the page of changes before the cursor given in the
+        request, as table rows or, with format=json, as JSON. The cursor
+        of the next page is in the X-Next-Cursor header"""
+
+        obj, _ = self.get_history_object(request, object_id)
+        try:
+            history_changes, next_cursor = get_history_page(
+                obj, request.GET.get("cursor")
+            )
+        except ValueError as err:
+            return HttpResponseBadRequest(str(err))
+
+        if request.GET.get("format") == "json":
+            response = JsonResponse(
+                {
+                    "changes": [
+                        {
+                            "history_id": history_change.history_id,
+                            "timestamp": history_change.timestamp,
+                            "user": str(history_change.activity_user)
+                            if history_change.activity_user
+                            else None,
+                            "fields": [
+                                {
+                                    "field": field_change.field.name,
+                                    "verbose_name": field_change.field.verbose_name,
+                                    "old_value": field_change.old_value,
+                                    "new_value": field_change.new_value,
+                                    "old_value_html": str(
+                                        field_change.old_value_prettified
+                                    ),
+                                    "new_value_html": str(
+                                        field_change.new_value_prettified
+                                    ),
+                                }
+                                for field_change in history_change.field_changes
+                            ],
+                        }
+                        for history_change in history_changes
+                    ],
+                    "next_cursor": next_cursor,
+                }
+            )
+        else:
+            response = render(
+                request,
+                "admin/object_history_change_rows.html",
+                {"history_changes": history_changes},
+            )
+
+        if next_cursor:
+            response["X-Next-Cursor"] = next_cursor
+        return response
+
 
 class AdminChangeFormWithNavigation(admin.ModelAdmin):
     def get_urls(self):
@@ -493,48 +608,18 @@ class ToggleDocInlineMixin(admin.ModelAdmin):
     #                     yield inline.get_formset(request, obj), inline
 
 
-def save_history_fields(obj, history_obj):
-    history_array_fields = obj._history_array_fields.copy()
-    m2m_save_ignore_fields = getattr(obj, "_m2m_save_ignore_fields", [])
-    if m2m_save_ignore_fields:
-        history_array_fields = {
-            k: v
-            for k, v in history_array_fields.items()
-            if k not in m2m_save_ignore_fields
-        }
-
-    # Keep a record of the IDs of linked M2M fields in the main obj record
-    # Not pretty, but it works
-
-    for m2m_history_field_name, m2m_model in history_array_fields.items():
-        try:
-            m2m_set = getattr(obj, f"{m2m_history_field_name[8:]}")
-        except Exception:
-            try:
-                m2m_set = getattr(obj, f"{m2m_model._meta.model_name}_set")
-            except Exception:
-                continue
-        setattr(
-            obj,
-            m2m_history_field_name,
-            (
-                list(m2m_set.order_by("id").distinct("id").values_list("id", flat=True))
-                if m2m_set.exists()
-                else []
-            ),
-        )
-
-    obj.save_without_historical_record()
-
-    if history_obj:
-        for (
-            m2m_history_field_name,
-            m2m_model,
-        ) in obj._history_array_fields.items():
-            setattr(
-                history_obj,
-                m2m_history_field_name,
-                getattr(obj, m2m_history_field_name),
-            )
+def save_history_fields(obj, history_obj, values=None):
+    """Keep a record of the IDs of linked M2M objects in the array fields
+    of obj and of its latest historical record. values are other history
+    array fields to save along with them"""
 
-        history_obj.save()
+    m2m_save_ignore_fields = getattr(obj, "_m2m_save_ignore_fields", [])
+    snapshot = get_m2m_snapshot(
+        obj,
+        [
+            history_field_name
+            for history_field_name in obj._history_array_fields
+            if history_field_name not in m2m_save_ignore_fields
+        ],
+    )
+    save_history_array_fields(obj, history_obj, {**snapshot, **(values or {})})
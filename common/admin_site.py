@@ -103,7 +103,8 @@ from ordering.models import (
     SignalWord,
 )
 
-from .admin import OwnUserAdmin
+from .admin import NotificationAdmin, OwnUserAdmin
+from .models import Notification
 
 User = get_user_model()
 SITE_TITLE = getattr(settings, "SITE_TITLE", "Lab DB")
@@ -239,6 +240,7 @@ admin_site.register(Species, SpeciesAdmin)
 
 admin_site.register(Task, TaskAdmin)
 admin_site.register(CompletedTask, CompletedTaskAdmin)
+admin_site.register(Notification, NotificationAdmin)
 
 admin_site.register(Order, OrderAdmin)
 admin_site.register(CostUnit, CostUnitAdmin)
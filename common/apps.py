@@ -1,5 +1,27 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_delete, post_save
+from simple_history.signals import pre_create_historical_record
 
 
 class OwnAdminConfig(AppConfig):
     name = "common"
+
+    def ready(self):
+        from .history import (
+            get_history_models,
+            historical_record_created,
+            historical_record_deleted,
+            historical_record_saved,
+        )
+        from .history_diff import get_diff_plan
+
+        # Keep the change log in step with the historical records, diffed
+        # with a plan built once per model
+        for model in get_history_models().values():
+            get_diff_plan(model)
+            history_model = model.history.model
+            pre_create_historical_record.connect(
+                historical_record_created, sender=history_model
+            )
+            post_save.connect(historical_record_saved, sender=history_model)
+            post_delete.connect(historical_record_deleted, sender=history_model)
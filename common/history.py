@@ -0,0 +1,508 @@
+import os
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import transaction
+from django.db.models import CharField, Q, Value
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.utils.html import format_html
+
+from .history_diff import get_diff_plan
+
+MEDIA_URL = settings.MEDIA_URL
+HISTORY_PAGE_SIZE = getattr(settings, "HISTORY_PAGE_SIZE", 20)
+
+
+class FieldChange:
+    def __init__(self, field=None, new_value="", old_value="", resolver=None):
+        self.field = field
+        self.new_value = new_value
+        self.old_value = old_value
+        self.resolver = resolver
+
+    def _pretty_format_value(self, value):
+        field = self.field
+        value_out = value if value else "None"
+        field_type = field.get_internal_type()
+
+        if field_type == "FileField":
+            link_text = os.path.basename(value)
+
+            # # Prettify DNA map field name
+            if getattr(field, "prettify_map_path", False):
+                link_text = os.path.splitext(link_text)[0]
+            value_out = (
+                format_html(
+                    "<a href={}>{}</a>",
+                    f"{MEDIA_URL}{value}",
+                    link_text,
+                )
+                if value
+                else "None"
+            )
+
+        elif field_type == "ForeignKey":
+            field_model = field.remote_field.model
+            value_out = (
+                format_html(
+                    '<a target="_blank" href={}>{}</a>',
+                    reverse(
+                        f"admin:{field_model._meta.app_label}_{field_model._meta.model_name}_change",
+                        args=(value,),
+                    ),
+                    self.resolver.get(field_model, value),
+                )
+                if value
+                else "None"
+            )
+
+        elif field_type == "ArrayField":
+            array_field_model = self.resolver.array_field_model(field)
+            if array_field_model:
+                value_out = (
+                    ", ".join(
+                        str(self.resolver.get(array_field_model, v)) for v in value
+                    )
+                    if value
+                    else "None"
+                )
+            else:
+                value_out = ", ".join(value)
+
+        return value_out
+
+    @property
+    def new_value_prettified(self):
+        return self._pretty_format_value(self.new_value)
+
+    @property
+    def old_value_prettified(self):
+        return self._pretty_format_value(self.old_value)
+
+
+class HistoryChange:
+    def __init__(
+        self, timestamp=None, activity_user=None, field_changes=None, history_id=None
+    ):
+        self.timestamp = timestamp
+        self.activity_user = activity_user
+        self.field_changes = field_changes or []
+        self.history_id = history_id
+
+
+class ObjectResolver:
+    """Collects the ids of the objects referenced by field changes and
+    fetches them with one query per model"""
+
+    def __init__(self, array_fields):
+        self.array_fields = array_fields
+        self.ids = {}
+        self.objects = {}
+
+    def array_field_model(self, field):
+        return self.array_fields.get(field.name, None)
+
+    def add(self, model, *values):
+        self.ids.setdefault(model, set()).update(v for v in values if v)
+
+    def add_field_change(self, field, *values):
+        field_type = field.get_internal_type()
+        if field_type == "ForeignKey":
+            self.add(field.remote_field.model, *values)
+        elif field_type == "ArrayField":
+            array_field_model = self.array_field_model(field)
+            if array_field_model:
+                for value in values:
+                    self.add(array_field_model, *(value or []))
+
+    def resolve(self):
+        for model, ids in self.ids.items():
+            self.objects[model] = model.objects.in_bulk(ids)
+
+    def get(self, model, value):
+        # Show the id of objects that do not exist any more
+        return self.objects.get(model, {}).get(value, value)
+
+
+def get_history_models():
+    """Return the models whose history is shown with a change summary,
+    by lower case label"""
+
+    from .models import HistoryFieldMixin
+
+    return {
+        model._meta.label_lower: model
+        for model in apps.get_models()
+        if issubclass(model, HistoryFieldMixin)
+    }
+
+
+def deserialize_value(field, value):
+    """Return a value from the change log as a field value"""
+
+    if value is None:
+        return value
+    try:
+        return field.to_python(value)
+    except ValidationError:
+        return value
+
+
+def get_change_log_entries(plan, row, changes, content_type):
+    """Return the unsaved change log entries for the changes of a
+    historical record, given as a row of its diff plan"""
+
+    from .models import HistoryChangeLog
+
+    timestamp = plan.get(row, "last_changed_date_time") or plan.get(row, "history_date")
+
+    return [
+        HistoryChangeLog(
+            content_type=content_type,
+            object_id=plan.get(row, "id"),
+            history_id=plan.get(row, "history_id"),
+            field=field_name,
+            old_value=old_value,
+            new_value=new_value,
+            history_user_id=plan.get(row, "history_user_id"),
+            timestamp=timestamp,
+        )
+        for field_name, old_value, new_value in changes
+    ]
+
+
+def get_adjacent_history_records(history_obj, previous=True):
+    """Return the historical records of the same object before or after a
+    historical record, nearest first"""
+
+    history_date = history_obj.history_date
+    history_id = history_obj.history_id
+    if previous:
+        adjacent = Q(history_date__lt=history_date) | Q(
+            history_date=history_date, history_id__lt=history_id
+        )
+        ordering = ("-history_date", "-history_id")
+    else:
+        adjacent = Q(history_date__gt=history_date) | Q(
+            history_date=history_date, history_id__gt=history_id
+        )
+        ordering = ("history_date", "history_id")
+
+    return history_obj.__class__._default_manager.filter(
+        adjacent, id=history_obj.id
+    ).order_by(*ordering)
+
+
+def get_adjacent_history_obj(history_obj, previous=True):
+    """Return the previous or next historical record of the same object"""
+
+    return get_adjacent_history_records(history_obj, previous).first()
+
+
+def write_change_log(history_obj):
+    """(Re)write the change log entries of a historical record. Only the
+    diffed columns of the previous record are read"""
+
+    from .models import HistoryChangeLog
+
+    plan = get_diff_plan(history_obj.instance_type)
+    content_type = ContentType.objects.get_for_model(history_obj.instance_type)
+    HistoryChangeLog.objects.filter(
+        content_type=content_type, history_id=history_obj.history_id
+    ).delete()
+
+    previous_row = plan.get_rows(get_adjacent_history_records(history_obj)).first()
+    if previous_row is None:
+        return
+    row = plan.get_row(history_obj)
+    HistoryChangeLog.objects.bulk_create(
+        get_change_log_entries(plan, row, plan.diff(previous_row, row), content_type)
+    )
+
+
+def write_change_logs(model, history_objs):
+    """Write the change log entries of new historical records, each the
+    latest record of a different object of model. The previous records
+    are read with one query"""
+
+    from .models import HistoryChangeLog
+
+    if not history_objs:
+        return
+
+    plan = get_diff_plan(model)
+    content_type = ContentType.objects.get_for_model(model)
+    previous_rows = plan.get_rows(
+        model.history.filter(id__in=[history_obj.id for history_obj in history_objs])
+        .exclude(
+            history_id__in=[history_obj.history_id for history_obj in history_objs]
+        )
+        .order_by("id", "-history_date", "-history_id")
+        .distinct("id")
+    )
+    previous_rows = {plan.get(row, "id"): row for row in previous_rows}
+
+    entries = []
+    for history_obj in history_objs:
+        previous_row = previous_rows.get(history_obj.id)
+        if previous_row is None:
+            continue
+        row = plan.get_row(history_obj)
+        entries.extend(
+            get_change_log_entries(
+                plan, row, plan.diff(previous_row, row), content_type
+            )
+        )
+    HistoryChangeLog.objects.bulk_create(entries)
+
+
+def bulk_update_with_history(model, objs, fields, user):
+    """Save the given fields of objs with bulk_update, create their
+    historical records with one INSERT and write their change log, in
+    one transaction. Returns the number of objects updated.
+
+    Neither save() nor signals are run. Fields updated automatically on
+    save, such as last_changed_date_time, are set here"""
+
+    now = timezone.now()
+    fields = set(fields)
+    for field in model._meta.concrete_fields:
+        if getattr(field, "auto_now", False):
+            fields.add(field.name)
+            for obj in objs:
+                setattr(obj, field.attname, now)
+
+    with transaction.atomic():
+        model._base_manager.bulk_update(objs, fields)
+        history_objs = model.history.bulk_history_create(
+            objs, update=True, default_user=user, default_date=now
+        )
+        write_change_logs(model, history_objs)
+
+    return len(objs)
+
+
+def get_related_manager(obj, history_field_name, model):
+    """Return the manager of the relation mirrored in a history array
+    field, or None if obj has no such relation"""
+
+    for attname in (history_field_name[8:], f"{model._meta.model_name}_set"):
+        try:
+            return getattr(obj, attname)
+        except Exception:
+            continue
+    return None
+
+
+def get_m2m_snapshot(obj, history_field_names=None):
+    """Return the sorted ids of the objects linked to obj by the relations
+    mirrored in its history array fields, read with one UNION query"""
+
+    history_array_fields = obj._history_array_fields
+    if history_field_names is None:
+        history_field_names = history_array_fields.keys()
+
+    snapshot = {}
+    querysets = []
+    for history_field_name in history_field_names:
+        manager = get_related_manager(
+            obj, history_field_name, history_array_fields[history_field_name]
+        )
+        if manager is None:
+            continue
+        snapshot[history_field_name] = set()
+        querysets.append(
+            manager.order_by()
+            .annotate(
+                history_field_name=Value(history_field_name, output_field=CharField())
+            )
+            .values_list("id", "history_field_name")
+        )
+
+    if querysets:
+        for related_id, history_field_name in querysets[0].union(
+            *querysets[1:], all=True
+        ):
+            snapshot[history_field_name].add(related_id)
+
+    return {name: sorted(ids) for name, ids in snapshot.items()}
+
+
+def save_history_array_fields(obj, history_obj, values):
+    """Set history array fields of obj and of its historical record, if
+    given, with one UPDATE each. Other fields are left as they are, and
+    last_changed_date_time is not updated"""
+
+    for history_field_name, value in values.items():
+        setattr(obj, history_field_name, value)
+    obj.__class__._base_manager.filter(pk=obj.pk).update(**values)
+
+    if history_obj:
+        # The historical record mirrors all array fields of obj
+        history_values = {
+            history_field_name: getattr(obj, history_field_name)
+            for history_field_name in obj._history_array_fields
+        }
+        for history_field_name, value in history_values.items():
+            setattr(history_obj, history_field_name, value)
+        history_obj.__class__._base_manager.filter(
+            history_id=history_obj.history_id
+        ).update(**history_values)
+        write_change_log(history_obj)
+
+
+def defer_change_log(obj):
+    """Do not write the change log of the historical records of obj when
+    they are saved. The caller writes it once their history array fields
+    are final, e.g. with save_history_array_fields"""
+
+    obj._defer_change_log = True
+
+
+def historical_record_created(sender, instance, history_instance, **kwargs):
+    history_instance._defer_change_log = getattr(instance, "_defer_change_log", False)
+
+
+def historical_record_saved(sender, instance, raw=False, **kwargs):
+    if not raw and not getattr(instance, "_defer_change_log", False):
+        write_change_log(instance)
+
+
+def historical_record_deleted(sender, instance, **kwargs):
+    """Remove the change log entries of a deleted historical record and
+    diff the next record against its new predecessor"""
+
+    from .models import HistoryChangeLog
+
+    HistoryChangeLog.objects.filter(
+        content_type=ContentType.objects.get_for_model(instance.instance_type),
+        history_id=instance.history_id,
+    ).delete()
+    next_history_obj = get_adjacent_history_obj(instance, previous=False)
+    if next_history_obj:
+        write_change_log(next_history_obj)
+
+
+def format_history_cursor(timestamp, history_id):
+    """Return the position of a change in the history, to get the changes
+    before it"""
+
+    return f"{timestamp.isoformat()}_{history_id}"
+
+
+def parse_history_cursor(cursor):
+    """Return the timestamp and history id of a cursor. Raises ValueError
+    if the cursor is invalid"""
+
+    timestamp, _, history_id = cursor.rpartition("_")
+    timestamp = parse_datetime(timestamp)
+    if timestamp is None:
+        raise ValueError(f"Invalid history cursor {cursor}")
+    return timestamp, int(history_id)
+
+
+def get_change_log(obj):
+    """Return the change log entries of an object that are shown in
+    its history"""
+
+    from .models import HistoryChangeLog
+
+    return HistoryChangeLog.objects.filter(
+        content_type=ContentType.objects.get_for_model(obj.__class__),
+        object_id=obj.pk,
+    ).exclude(field__in=getattr(obj, "_history_view_ignore_fields", []))
+
+
+def get_history_changes(obj, entries=None):
+    """Return the changes of an object from the change log, newest first.
+    Referenced objects are fetched with one query per model, whatever
+    the length of the history"""
+
+    if entries is None:
+        entries = get_change_log(obj)
+    entries = entries.select_related("history_user").order_by(
+        "-timestamp", "-history_id", "field"
+    )
+
+    resolver = ObjectResolver(getattr(obj, "_history_array_fields", {}))
+
+    # Group the entries by historical record and collect the referenced
+    # objects
+    history_summary_data = []
+    history_changes = {}
+    for entry in entries:
+        try:
+            field = obj._meta.get_field(entry.field)
+        except FieldDoesNotExist:
+            continue
+
+        # Prettify DNA map field name
+        if obj._unified_map_field and field.name.startswith("map"):
+            field.verbose_name = field.verbose_name.replace(" (.dna)", "")
+            field.prettify_map_path = True
+
+        old_value = deserialize_value(field, entry.old_value)
+        new_value = deserialize_value(field, entry.new_value)
+        resolver.add_field_change(field, old_value, new_value)
+
+        history_change = history_changes.get(entry.history_id)
+        if history_change is None:
+            history_change = HistoryChange(
+                timestamp=entry.timestamp,
+                activity_user=entry.history_user,
+                history_id=entry.history_id,
+            )
+            history_changes[entry.history_id] = history_change
+            history_summary_data.append(history_change)
+        history_change.field_changes.append(
+            FieldChange(
+                field=field,
+                new_value=new_value,
+                old_value=old_value,
+                resolver=resolver,
+            )
+        )
+
+    resolver.resolve()
+
+    return history_summary_data
+
+
+def get_history_page(obj, cursor=None, page_size=HISTORY_PAGE_SIZE):
+    """Return a page of the changes of an object, newest first, starting
+    before cursor, and the cursor of the next page, or None if there
+    are no older changes. Raises ValueError if the cursor is invalid"""
+
+    entries = get_change_log(obj)
+    if cursor:
+        timestamp, history_id = parse_history_cursor(cursor)
+        entries = entries.filter(
+            Q(timestamp__lt=timestamp)
+            | Q(timestamp=timestamp, history_id__lt=history_id)
+        )
+
+    # The historical records on the page, plus one to know whether there
+    # is a next page
+    records = list(
+        entries.order_by("-timestamp", "-history_id")
+        .values_list("timestamp", "history_id")
+        .distinct()[: page_size + 1]
+    )
+
+    history_changes = get_history_changes(
+        obj,
+        entries.filter(
+            history_id__in=[history_id for _, history_id in records[:page_size]]
+        ),
+    )
+    next_cursor = (
+        format_history_cursor(*records[page_size - 1])
+        if len(records) > page_size
+        else None
+    )
+
+    return history_changes, next_cursor
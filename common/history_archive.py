@@ -0,0 +1,178 @@
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.utils import timezone
+
+HISTORY_ARCHIVE_DIR = getattr(
+    settings, "HISTORY_ARCHIVE_DIR", settings.BASE_DIR / "history_archive"
+)
+HISTORY_RETENTION_POLICIES = getattr(settings, "HISTORY_RETENTION_POLICIES", {})
+
+# The previous version of the latest historical record must stay in the
+# table, for the change log of the latest record to be rewritten
+MIN_KEEP_VERSIONS = 2
+
+
+class ArchiveJSONEncoder(DjangoJSONEncoder):
+    """Keep the microseconds of datetimes, which order historical records"""
+
+    def default(self, o):
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def get_retention_policy(model):
+    """Return the number of versions of each object to keep and the
+    date after which all versions are kept, or None if the history of
+    the model is not archived"""
+
+    policy = HISTORY_RETENTION_POLICIES.get(model._meta.label_lower)
+    if not policy:
+        return None
+
+    keep_versions = max(policy.get("keep_versions", 0), MIN_KEEP_VERSIONS)
+    keep_days = policy.get("keep_days", None)
+    keep_after = (
+        timezone.now() - timedelta(days=keep_days) if keep_days is not None else None
+    )
+
+    return keep_versions, keep_after
+
+
+def get_archive_dir(model):
+    return os.path.join(
+        HISTORY_ARCHIVE_DIR, model._meta.app_label, model._meta.model_name
+    )
+
+
+def get_archivable_query(model, keep_versions, keep_after=None):
+    """Return the SQL and parameters of a query for the ids of the
+    historical records of a model outside its retention policy: older
+    than the last keep_versions versions of an object and, if given,
+    than keep_after. Creation records are always kept"""
+
+    table = connection.ops.quote_name(model.history.model._meta.db_table)
+    params = [keep_versions]
+    keep_after_condition = ""
+    if keep_after is not None:
+        keep_after_condition = "AND history_date < %s"
+        params.append(keep_after)
+
+    sql = f"""
+        SELECT history_id FROM (
+            SELECT
+                history_id,
+                history_type,
+                history_date,
+                ROW_NUMBER() OVER (
+                    PARTITION BY id ORDER BY history_date DESC, history_id DESC
+                ) AS version
+            FROM {table}
+        ) AS history
+        WHERE version > %s AND history_type <> '+' {keep_after_condition}
+    """
+
+    return sql, params
+
+
+def find_archivable_history_records(model):
+    """Return the ids of the historical records of a model outside its
+    retention policy"""
+
+    policy = get_retention_policy(model)
+    if policy is None:
+        return []
+
+    sql, params = get_archivable_query(model, *policy)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def write_archive_rows(model, rows):
+    """Append historical records, as dicts, to the gzipped JSON Lines
+    archive file of the month of their history date. Each append adds a
+    gzip member to the file, which is read as one stream"""
+
+    archive_dir = get_archive_dir(model)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    rows_by_month = {}
+    for row in rows:
+        rows_by_month.setdefault(row["history_date"].strftime("%Y-%m"), []).append(row)
+
+    for month, month_rows in rows_by_month.items():
+        with gzip.open(
+            os.path.join(archive_dir, f"{month}.jsonl.gz"), "at", encoding="utf-8"
+        ) as fhandle:
+            for row in month_rows:
+                fhandle.write(json.dumps(row, cls=ArchiveJSONEncoder) + "\n")
+
+
+def archive_history(model, batch_size=1000):
+    """Move the historical records of a model outside its retention
+    policy to the archive and return their number.
+
+    The records are deleted without signals, so that the change log,
+    from which the history view is built, keeps their changes"""
+
+    history_model = model.history.model
+    table = connection.ops.quote_name(history_model._meta.db_table)
+    history_ids = find_archivable_history_records(model)
+
+    for i in range(0, len(history_ids), batch_size):
+        batch = history_ids[i : i + batch_size]
+        with transaction.atomic():
+            rows = list(
+                history_model.objects.filter(history_id__in=batch)
+                .order_by("history_date", "history_id")
+                .values()
+            )
+            write_archive_rows(model, rows)
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"DELETE FROM {table} WHERE history_id = ANY(%s)", [batch]
+                )
+
+    return len(history_ids)
+
+
+def read_history_archive(model, object_id=None):
+    """Return the archived historical records of a model, or of one of
+    its objects, as unsaved historical records, newest first"""
+
+    history_model = model.history.model
+    fields = {field.attname: field for field in history_model._meta.concrete_fields}
+    archive_dir = get_archive_dir(model)
+    if not os.path.isdir(archive_dir):
+        return []
+
+    # A record is archived again if its deletion failed, keep one copy
+    history_objs = {}
+    for file_name in sorted(os.listdir(archive_dir)):
+        if not file_name.endswith(".jsonl.gz"):
+            continue
+        with gzip.open(os.path.join(archive_dir, file_name), "rt") as fhandle:
+            for line in fhandle:
+                row = json.loads(line)
+                if object_id is not None and row["id"] != int(object_id):
+                    continue
+                history_objs[row["history_id"]] = history_model(
+                    **{
+                        attname: fields[attname].to_python(value)
+                        for attname, value in row.items()
+                        if attname in fields
+                    }
+                )
+
+    return sorted(
+        history_objs.values(),
+        key=lambda history_obj: (history_obj.history_date, history_obj.history_id),
+        reverse=True,
+    )
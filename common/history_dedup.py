@@ -0,0 +1,83 @@
+from django.db import connection
+
+# Columns of historical records that are not compared to find duplicates
+IGNORED_COLUMNS = {
+    "id",
+    "last_changed_date_time",
+    "history_id",
+    "history_date",
+    "history_change_reason",
+    "history_type",
+    "history_user_id",
+}
+
+
+def get_compared_columns(history_model):
+    return [
+        field.column
+        for field in history_model._meta.concrete_fields
+        if field.column not in IGNORED_COLUMNS
+    ]
+
+
+def get_duplicates_query(model, since=None):
+    """Return the SQL and parameters of a query for the ids of the
+    historical records of a model that only differ from the previous
+    record of the same object by last_changed_date_time. The previous
+    record is found with a window over the history of each object, and
+    all columns are compared in the database. If since is given, only
+    the history of objects changed since then is checked"""
+
+    history_model = model.history.model
+    qn = connection.ops.quote_name
+    table = qn(history_model._meta.db_table)
+
+    same_as_previous = " AND ".join(
+        f"{qn(column)} IS NOT DISTINCT FROM LAG({qn(column)}) OVER w"
+        for column in get_compared_columns(history_model)
+    )
+    where = ""
+    params = []
+    if since is not None:
+        where = f"WHERE id IN (SELECT id FROM {table} WHERE history_date >= %s)"
+        params.append(since)
+
+    sql = f"""
+        SELECT history_id FROM (
+            SELECT
+                history_id,
+                history_type,
+                LAG(history_id) OVER w IS NOT NULL AS has_previous,
+                {same_as_previous or "TRUE"} AS same_as_previous
+            FROM {table}
+            {where}
+            WINDOW w AS (PARTITION BY id ORDER BY history_date, history_id)
+        ) AS history
+        WHERE has_previous AND same_as_previous AND history_type = '~'
+    """
+
+    return sql, params
+
+
+def find_duplicate_history_records(model, since=None):
+    """Return the ids of the duplicate historical records of a model"""
+
+    sql, params = get_duplicates_query(model, since)
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_duplicate_history_records(model, since=None):
+    """Delete the duplicate historical records of a model in one statement
+    and return their number.
+
+    The change log does not need to be updated: a duplicate has no changes
+    and the next record has the same changes compared to the record before
+    the duplicate"""
+
+    sql, params = get_duplicates_query(model, since)
+    table = connection.ops.quote_name(model.history.model._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"DELETE FROM {table} WHERE history_id IN ({sql})", params)
+        return cursor.rowcount
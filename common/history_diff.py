@@ -0,0 +1,121 @@
+from functools import cache
+from itertools import groupby
+
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import FileField
+
+# Columns of historical records, other than the tracked fields, needed to
+# order them and to write the change log
+RECORD_COLUMNS = (
+    "id",
+    "history_id",
+    "history_date",
+    "history_user_id",
+    "last_changed_date_time",
+)
+
+
+def get_file_name(value):
+    """Return the name of a file field value, from an instance or from
+    values(), or None if there is no file"""
+
+    return getattr(value, "name", value) or None
+
+
+def get_value(value):
+    return value
+
+
+def changed(old_value, new_value):
+    return old_value != new_value
+
+
+def changed_as_set(old_value, new_value):
+    return set(old_value or ()) != set(new_value or ())
+
+
+class DiffPlan:
+    """The tracked fields of a model that are shown in its history, with
+    how to compare their values, built once per model.
+
+    Historical records are diffed as rows of values, in the order of
+    columns, rather than as instances"""
+
+    def __init__(self, model):
+        history_model = model.history.model
+        ignored_fields = set(getattr(model, "_history_view_ignore_fields", []))
+        history_columns = {field.attname for field in history_model._meta.fields}
+        fields = sorted(
+            (
+                field
+                for field in history_model.tracked_fields
+                if field.editable and field.name not in ignored_fields
+            ),
+            key=lambda field: field.name,
+        )
+
+        self.model = model
+        self.columns = [
+            column for column in RECORD_COLUMNS if column in history_columns
+        ] + [field.attname for field in fields]
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.comparisons = [
+            (field.name, self.index[field.attname], *self.get_comparison(field))
+            for field in fields
+        ]
+
+    @staticmethod
+    def get_comparison(field):
+        """Return the function that normalises the values of a field and
+        the one that tells whether two normalised values differ"""
+
+        if isinstance(field, FileField):
+            return get_file_name, changed
+        # Arrays mirror relations, whose order does not matter
+        if isinstance(field, ArrayField) and not isinstance(
+            field.base_field, ArrayField
+        ):
+            return get_value, changed_as_set
+        return get_value, changed
+
+    def get_rows(self, queryset):
+        """Return a queryset of historical records as rows"""
+
+        return queryset.values_list(*self.columns)
+
+    def get_row(self, history_obj):
+        """Return a historical record instance as a row"""
+
+        return tuple(getattr(history_obj, column) for column in self.columns)
+
+    def get(self, row, column):
+        return row[self.index[column]] if column in self.index else None
+
+    def diff(self, old_row, new_row):
+        """Return the changed fields between two rows, as tuples of field
+        name, old value and new value, ordered by field name"""
+
+        changes = []
+        for field_name, i, normalize, is_changed in self.comparisons:
+            old_value = normalize(old_row[i])
+            new_value = normalize(new_row[i])
+            if is_changed(old_value, new_value):
+                changes.append((field_name, old_value, new_value))
+        return changes
+
+    def diff_rows(self, rows):
+        """Diff each row against the previous row of the same object, in
+        one pass over rows ordered by object, then history. Yields each
+        row with its changes, except the first row of each object"""
+
+        id_index = self.index["id"]
+        for _, object_rows in groupby(rows, key=lambda row: row[id_index]):
+            previous_row = next(object_rows)
+            for row in object_rows:
+                yield row, self.diff(previous_row, row)
+                previous_row = row
+
+
+@cache
+def get_diff_plan(model):
+    return DiffPlan(model)
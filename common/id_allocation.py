@@ -0,0 +1,31 @@
+from django.core.management.color import no_style
+from django.db import connection
+
+
+def allocate_id(model):
+    """Return a new id for an object of model, taken from the sequence of
+    its primary key. Concurrent calls never get the same id, and the id is
+    known before the object is first saved"""
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s))",
+            [connection.ops.quote_name(model._meta.db_table), model._meta.pk.column],
+        )
+        return cursor.fetchone()[0]
+
+
+def get_id_sequence_reset_sql(models):
+    """Return the SQL statements that set the primary key sequences of
+    models to the largest id in their tables"""
+
+    return connection.ops.sequence_reset_sql(no_style(), models)
+
+
+def reset_id_sequences(models):
+    """Set the primary key sequences of models to the largest id in their
+    tables, for example after ids were assigned without the sequence"""
+
+    with connection.cursor() as cursor:
+        for sql in get_id_sequence_reset_sql(models):
+            cursor.execute(sql)
@@ -0,0 +1,57 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.history import get_history_models
+from common.history_archive import (
+    HISTORY_RETENTION_POLICIES,
+    archive_history,
+    find_archivable_history_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Moves historical records outside the retention policies in "
+        "HISTORY_RETENTION_POLICIES to gzipped JSON Lines files in "
+        "HISTORY_ARCHIVE_DIR, one per model and month"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            help="Only process this model, as app_label.model_name, "
+            "can be given more than once",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the records to archive, do not archive them",
+        )
+
+    def handle(self, *args, **options):
+        history_models = get_history_models()
+        model_names = options["model"] or sorted(
+            set(history_models) & set(HISTORY_RETENTION_POLICIES)
+        )
+        unknown_models = set(model_names) - set(history_models)
+        if unknown_models:
+            raise CommandError(
+                f"Unknown models: {', '.join(sorted(unknown_models))}. "
+                f"Choose from {', '.join(sorted(history_models))}"
+            )
+
+        for model_name in model_names:
+            model = history_models[model_name]
+            if model_name not in HISTORY_RETENTION_POLICIES:
+                self.stdout.write(f"{model_name}: no retention policy")
+            elif options["dry_run"]:
+                archivable_count = len(find_archivable_history_records(model))
+                self.stdout.write(
+                    f"{model_name}: {archivable_count} of {model.history.count()} "
+                    "historical records would be archived"
+                )
+            else:
+                archived_count = archive_history(model)
+                self.stdout.write(
+                    f"{model_name}: {archived_count} historical records archived"
+                )
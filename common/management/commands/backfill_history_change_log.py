@@ -0,0 +1,85 @@
+import heapq
+from operator import itemgetter
+
+from django.contrib.contenttypes.models import ContentType
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from common.history import get_change_log_entries, get_history_models
+from common.history_archive import read_history_archive
+from common.history_diff import get_diff_plan
+from common.models import HistoryChangeLog
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes the change log of existing historical records, which is "
+        "otherwise only written when a historical record is saved. Run it "
+        "once after the change log table has been created"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            help="Only process this model, as app_label.model_name, "
+            "can be given more than once",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of change log entries written at once",
+        )
+
+    def handle(self, *args, **options):
+        history_models = get_history_models()
+        model_names = options["model"] or sorted(history_models)
+        unknown_models = set(model_names) - set(history_models)
+        if unknown_models:
+            raise CommandError(
+                f"Unknown models: {', '.join(sorted(unknown_models))}. "
+                f"Choose from {', '.join(sorted(history_models))}"
+            )
+
+        for model_name in model_names:
+            entry_count = self.backfill(
+                history_models[model_name], options["batch_size"]
+            )
+            self.stdout.write(f"{model_name}: {entry_count} changes")
+
+    @transaction.atomic
+    def backfill(self, model, batch_size):
+        """Rewrite the change log of a model, going through the diffed
+        columns of its historical records, including archived ones, once,
+        in order"""
+
+        content_type = ContentType.objects.get_for_model(model)
+        HistoryChangeLog.objects.filter(content_type=content_type).delete()
+        plan = get_diff_plan(model)
+        history_order = itemgetter(
+            plan.index["id"], plan.index["history_date"], plan.index["history_id"]
+        )
+
+        # Archived historical records are diffed with the others
+        archived_rows = sorted(
+            (plan.get_row(history_obj) for history_obj in read_history_archive(model)),
+            key=history_order,
+        )
+        rows = plan.get_rows(
+            model.history.order_by("id", "history_date", "history_id")
+        ).iterator(chunk_size=batch_size)
+
+        entries = []
+        entry_count = 0
+        for row, changes in plan.diff_rows(
+            heapq.merge(rows, archived_rows, key=history_order)
+        ):
+            entries.extend(get_change_log_entries(plan, row, changes, content_type))
+            if len(entries) >= batch_size:
+                HistoryChangeLog.objects.bulk_create(entries)
+                entry_count += len(entries)
+                entries = []
+
+        HistoryChangeLog.objects.bulk_create(entries)
+        return entry_count + len(entries)
@@ -0,0 +1,345 @@
+import json
+import os
+import random
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import override_settings
+
+from collection.models import Plasmid
+from collection.oligo.binding_sites import (
+    OligoSeedIndex,
+    binding_sites_as_genbank_features,
+)
+from collection.oligo.primer_library import primer_entry
+from collection.shared import map_cache
+from collection.shared.admin import (
+    convert_map_gbk_to_dna,
+    create_map_preview,
+    get_map_features,
+)
+from collection.shared.genbank import (
+    MapFeature,
+    MapRecord,
+    add_features,
+    parse_genbank,
+)
+from collection.shared.map_features import read_map
+from collection.shared.snapgene_dna import format_dna
+from collection.shared.snapgene_server import (
+    SNAPGENE_SERVER_CONFIG,
+    SnapGeneServerError,
+    request_snapgene_server,
+    reset_snapgene_pool,
+)
+from snapgene.pyclasses.config import Config
+from snapgene.stand_in_server import start_stand_in_servers
+
+from .run_snapgene_stand_in import add_stand_in_arguments, get_stand_in_options
+
+BENCHMARK_DIR = os.path.join(settings.MEDIA_ROOT, "temp")
+
+
+def percentile(values, percent):
+    """Nearest-rank percentile"""
+
+    values = sorted(values)
+    if not values:
+        return 0
+    return values[max(int(round(percent / 100 * len(values) + 0.5)) - 1, 0)]
+
+
+def random_sequence(rng, length):
+    return "".join(rng.choice("ACGT") for _ in range(length))
+
+
+def synthetic_map(rng, length=6000):
+    """A random circular map with a few features"""
+
+    features = [
+        MapFeature(f"feature {i}", "misc_feature", [(start, start + 700)], 1)
+        for i, start in enumerate(range(1, length - 700, 1000))
+    ]
+    return MapRecord("benchmark", random_sequence(rng, length), True, features)
+
+
+def synthetic_primers(rng, sequence, count):
+    """Random primers, a tenth of which bind the map"""
+
+    primers = []
+    for oligo_id in range(1, count + 1):
+        primer_length = rng.randint(18, 30)
+        if oligo_id % 10 == 0:
+            start = rng.randrange(len(sequence) - primer_length)
+            primer_sequence = sequence[start : start + primer_length]
+        else:
+            primer_sequence = random_sequence(rng, primer_length)
+        primers.append(primer_entry(oligo_id, primer_sequence))
+    return primers
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks the map pipeline against stand-in SnapGene servers, or "
+        "the configured servers with --external: latency of plasmid map "
+        "processing, as done in the background after a save, its throughput "
+        "when maps are processed concurrently and the latency of finding "
+        "oligos in a map. Reports p50/p95 latencies. Saving records is not "
+        "timed, no records are saved to the database"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--external",
+            action="store_true",
+            help="Use the configured SnapGene servers instead of stand-ins",
+        )
+        parser.add_argument(
+            "--port",
+            type=int,
+            action="append",
+            help="Port of a stand-in server, can be given more than once. "
+            "By default, two servers on ports 5710 and 5711",
+        )
+        add_stand_in_arguments(parser)
+        parser.add_argument(
+            "--map",
+            action="append",
+            help="SnapGene .dna or GenBank map to use, can be given more than "
+            "once. GenBank maps are converted to .dna first, as when they are "
+            "uploaded. By default, a random 6 kb map is used",
+        )
+        parser.add_argument(
+            "--maps",
+            type=int,
+            default=30,
+            help="Number of maps processed per benchmark",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=4,
+            help="Number of maps processed concurrently",
+        )
+        parser.add_argument(
+            "--oligos",
+            type=int,
+            default=2000,
+            help="Number of oligos in the primer library",
+        )
+        parser.add_argument(
+            "--find-oligos",
+            type=int,
+            default=20,
+            help="Number of times oligos are searched in a map",
+        )
+        parser.add_argument(
+            "--use-cache",
+            action="store_true",
+            help="Use the map cache, which is disabled by default so that "
+            "every map hits the servers",
+        )
+        parser.add_argument(
+            "--json", action="store_true", help="Print the results as JSON"
+        )
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options["seed"])
+        self.work_dir = os.path.join(BENCHMARK_DIR, f"benchmark_{uuid4()}")
+        os.makedirs(self.work_dir)
+
+        servers = []
+        if options["external"]:
+            server_ports = Config(SNAPGENE_SERVER_CONFIG).get_server_ports()
+        else:
+            server_ports, servers = start_stand_in_servers(
+                options["port"] or [5710, 5711], **get_stand_in_options(options)
+            )
+        reset_snapgene_pool(server_ports)
+
+        if not options["use_cache"]:
+            map_cache.MAP_CACHE_MAX_SIZE_MB = 0
+
+        try:
+            # Do not mail the admins about injected errors
+            with override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"
+            ):
+                results = self.run_benchmarks(options)
+        finally:
+            reset_snapgene_pool()
+            for server in servers:
+                server.stop()
+            shutil.rmtree(self.work_dir, ignore_errors=True)
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{'benchmark':<32}{'n':>5}{'errors':>8}{'p50 ms':>9}{'p95 ms':>9}"
+            f"{'max ms':>9}{'per s':>8}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<32}{result['n']:>5}{result['errors']:>8}"
+                f"{result['p50_ms']:>9.0f}{result['p95_ms']:>9.0f}"
+                f"{result['max_ms']:>9.0f}{result['per_second']:>8.1f}"
+            )
+
+    def run_benchmarks(self, options):
+        map_paths = options["map"] or [self.write_synthetic_map()]
+        primers_path, index = self.write_primer_library(map_paths[0], options)
+
+        results = {}
+        results["map processing"] = self.measure(
+            lambda i: self.process_new_map(map_paths[i % len(map_paths)], i),
+            options["maps"],
+            1,
+        )
+        results[f"map processing ({options['concurrency']} concurrent)"] = self.measure(
+            lambda i: self.process_new_map(map_paths[i % len(map_paths)], i),
+            options["maps"],
+            options["concurrency"],
+        )
+
+        obj = self.new_obj(0)
+        self.process_map(obj, map_paths[0])
+        results["find_oligos (SnapGene)"] = self.measure(
+            lambda i: self.find_oligos_snapgene(obj, primers_path),
+            options["find_oligos"],
+            1,
+        )
+        results["find_oligos (native)"] = self.measure(
+            lambda i: self.find_oligos_native(obj, index),
+            options["find_oligos"],
+            1,
+        )
+
+        return results
+
+    def measure(self, function, count, concurrency):
+        """Run function count times with concurrency threads and return
+        latency percentiles and throughput"""
+
+        def timed(i):
+            start_time = time.monotonic()
+            try:
+                function(i)
+                error = False
+            except (SnapGeneServerError, OSError):
+                error = True
+            return time.monotonic() - start_time, error
+
+        start_time = time.monotonic()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            timings = list(executor.map(timed, range(count)))
+        elapsed = time.monotonic() - start_time
+
+        latencies = [duration * 1000 for duration, error in timings if not error]
+        return {
+            "n": count,
+            "errors": sum(error for _, error in timings),
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "max_ms": max(latencies, default=0),
+            "per_second": len(latencies) / elapsed if elapsed else 0,
+        }
+
+    def write_synthetic_map(self):
+        map_path = os.path.join(self.work_dir, "synthetic.dna")
+        with open(map_path, "wb") as fhandle:
+            fhandle.write(format_dna(synthetic_map(self.rng)))
+        return map_path
+
+    def write_primer_library(self, map_path, options):
+        sequence = read_map(map_path).sequence
+        primers = synthetic_primers(self.rng, sequence, options["oligos"])
+
+        primers_path = os.path.join(self.work_dir, "primers.json")
+        with open(primers_path, "w") as fhandle:
+            json.dump(primers, fhandle)
+
+        index = OligoSeedIndex(
+            (oligo_id, primer["Sequence"]) for oligo_id, primer in enumerate(primers, 1)
+        )
+        return primers_path, index
+
+    def new_obj(self, number):
+        """An unsaved plasmid whose map files are in the work directory"""
+
+        name = os.path.join(
+            os.path.relpath(self.work_dir, settings.MEDIA_ROOT), f"{number}_{uuid4()}"
+        )
+        obj = Plasmid(id=number + 1, name=f"benchmark {number}")
+        obj.map.name = f"{name}.dna"
+        obj.map_png.name = f"{name}.png"
+        obj.map_gbk.name = f"{name}.gbk"
+        return obj
+
+    def process_map(self, obj, map_path):
+        """Process a map as after saving a plasmid: convert a GenBank map
+        to .dna, detect common features, create the preview and .gbk map
+        and get the map features"""
+
+        if map_path.lower().endswith((".gbk", ".gb")):
+            shutil.copyfile(map_path, obj.map_gbk.path)
+            convert_map_gbk_to_dna(obj.map_gbk.path, obj.map.path)
+        else:
+            shutil.copyfile(map_path, obj.map.path)
+        create_map_preview(obj, True)
+        get_map_features(obj)
+
+    def process_new_map(self, map_path, number):
+        obj = self.new_obj(number)
+        try:
+            self.process_map(obj, map_path)
+        finally:
+            for file_path in [obj.map.path, obj.map_png.path, obj.map_gbk.path]:
+                if os.path.exists(file_path):
+                    os.unlink(file_path)
+
+    def find_oligos_snapgene(self, obj, primers_path):
+        """Find oligos in a map with SnapGene server, as
+        AdminOligosInMap.find_oligos_in_map"""
+
+        dna_temp_path = os.path.join(self.work_dir, str(uuid4()))
+        gbk_temp_path = os.path.join(self.work_dir, f"{uuid4()}.gb")
+        request_snapgene_server(
+            {
+                "request": "importPrimersFromList",
+                "inputFile": obj.map.path,
+                "inputPrimersFile": primers_path,
+                "outputFile": dna_temp_path,
+            },
+            60000,
+        )
+        request_snapgene_server(
+            {
+                "request": "exportDNAFile",
+                "inputFile": dna_temp_path,
+                "outputFile": gbk_temp_path,
+                "exportFilter": "biosequence.gb",
+            },
+            10000,
+        )
+        with open(gbk_temp_path) as fhandle:
+            fhandle.read()
+        os.unlink(dna_temp_path)
+        os.unlink(gbk_temp_path)
+
+    def find_oligos_native(self, obj, index):
+        """Find oligos in the .gbk map, as
+        AdminOligosInMap.find_oligos_in_map_gbk"""
+
+        with open(obj.map_gbk.path, encoding="utf-8", errors="replace") as fhandle:
+            gbk_data = fhandle.read()
+        record = parse_genbank(gbk_data)
+        binding_sites = index.find_binding_sites(record.sequence, record.circular)
+        add_features(
+            gbk_data, binding_sites_as_genbank_features(binding_sites, len(record))
+        )
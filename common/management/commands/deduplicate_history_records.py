@@ -0,0 +1,76 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from common.history import get_history_models
+from common.history_dedup import (
+    delete_duplicate_history_records,
+    find_duplicate_history_records,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Deletes historical records that only differ from the previous "
+        "record of the same object by their last changed date. By default, "
+        "only the history of objects changed in the last 8 days is checked, "
+        "as in the weekly tasks"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            help="Only process this model, as app_label.model_name, "
+            "can be given more than once",
+        )
+        parser.add_argument(
+            "--days",
+            type=int,
+            default=8,
+            help="Check the history of objects changed in this many days",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Check the whole history of all objects",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the duplicate records, do not delete them",
+        )
+
+    def handle(self, *args, **options):
+        history_models = get_history_models()
+        model_names = options["model"] or sorted(history_models)
+        unknown_models = set(model_names) - set(history_models)
+        if unknown_models:
+            raise CommandError(
+                f"Unknown models: {', '.join(sorted(unknown_models))}. "
+                f"Choose from {', '.join(sorted(history_models))}"
+            )
+
+        since = (
+            None if options["all"] else timezone.now() - timedelta(days=options["days"])
+        )
+
+        for model_name in model_names:
+            model = history_models[model_name]
+            if options["dry_run"]:
+                history_ids = find_duplicate_history_records(model, since)
+                total = model.history.count()
+                self.stdout.write(
+                    f"{model_name}: {len(history_ids)} of {total} historical "
+                    "records would be deleted"
+                )
+                if history_ids and options["verbosity"] > 1:
+                    self.stdout.write(
+                        f"  history ids: {', '.join(str(i) for i in history_ids)}"
+                    )
+            else:
+                deleted_count = delete_duplicate_history_records(model, since)
+                self.stdout.write(
+                    f"{model_name}: {deleted_count} historical records deleted"
+                )
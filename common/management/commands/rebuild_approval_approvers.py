@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from approval.approvers import refresh_approvers
+from approval.models import Approval, ApprovalApprover
+
+
+class Command(BaseCommand):
+    help = (
+        "Rewrites the approvers of all approvals, the project leaders who "
+        "can approve them, which are otherwise only updated when approvals, "
+        "FormZ projects or project leaders change, e.g. after project "
+        "leaders were changed with raw SQL"
+    )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        ApprovalApprover.objects.all().delete()
+        refresh_approvers(Approval.objects.all())
+        self.stdout.write(
+            f"{ApprovalApprover.objects.count()} approvers of "
+            f"{Approval.objects.count()} approvals"
+        )
@@ -0,0 +1,105 @@
+from django.core.management.base import BaseCommand
+
+from collection.models import Plasmid, WormStrainAllele
+from collection.shared.map_features import read_map_feature_names_bulk
+from common.admin import save_history_fields
+from formz.models import SequenceFeatureAlias
+
+MODELS = {
+    "plasmid": Plasmid,
+    "wormstrainallele": WormStrainAllele,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-detects the sequence features of plasmids and worm alleles "
+        "from their maps, without SnapGene server"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=MODELS,
+            action="append",
+            help="Only process this model, can be given more than once",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=None,
+            help="Number of processes used to read maps, by default one per CPU",
+        )
+        parser.add_argument(
+            "--replace",
+            action="store_true",
+            help="Remove sequence features that are not in the map, "
+            "like 'Re-detect sequence features' in the admin",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the changes, do not save them",
+        )
+
+    def handle(self, *args, **options):
+        feature_ids = dict(
+            SequenceFeatureAlias.objects.values_list("label", "sequence_feature_id")
+        )
+
+        for model_name in options["model"] or MODELS:
+            model = MODELS[model_name]
+            objs = {
+                obj.map.path: obj
+                for obj in model.objects.exclude(map="").prefetch_related(
+                    "sequence_features"
+                )
+            }
+            map_feature_names = read_map_feature_names_bulk(
+                objs, max_workers=options["workers"]
+            )
+
+            changed = unchanged = unreadable = 0
+            unknown_feature_names = set()
+
+            for map_path, feature_names in map_feature_names.items():
+                if feature_names is None:
+                    unreadable += 1
+                    self.stderr.write(f"Cannot read map {map_path}")
+                    continue
+
+                obj = objs[map_path]
+                current_ids = {f.id for f in obj.sequence_features.all()}
+                detected_ids = {
+                    feature_ids[name] for name in feature_names if name in feature_ids
+                }
+                unknown_feature_names.update(
+                    name for name in feature_names if name not in feature_ids
+                )
+
+                new_ids = (
+                    detected_ids if options["replace"] else current_ids | detected_ids
+                )
+                if new_ids == current_ids:
+                    unchanged += 1
+                    continue
+
+                changed += 1
+                if options["dry_run"]:
+                    continue
+
+                obj.sequence_features.set(new_ids)
+                save_history_fields(obj, obj.history.latest())
+
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"{model._meta.verbose_name_plural}: {changed} changed, "
+                    f"{unchanged} unchanged, {unreadable} maps could not be read"
+                    + (" (dry run)" if options["dry_run"] else "")
+                )
+            )
+            if unknown_feature_names:
+                self.stdout.write(
+                    "Map features not found in the database: "
+                    + ", ".join(sorted(unknown_feature_names))
+                )
@@ -0,0 +1,312 @@
+import asyncio
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from collection.models import Plasmid, WormStrainAllele
+from collection.shared import map_cache
+from collection.shared.admin import SNAPGENE_COMMON_FEATURES_PATH
+from collection.shared.snapgene_server import SNAPGENE_SERVER_CONFIG
+from snapgene.pyclasses.async_multi_client import AsyncMultiClient
+from snapgene.pyclasses.config import Config
+
+MODELS = {
+    "plasmid": Plasmid,
+    "wormstrainallele": WormStrainAllele,
+}
+CHECKPOINT_PATH = os.path.join(settings.LOG_DIR, "rerender_maps_checkpoint.json")
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-renders the .png previews and .gbk files of all plasmid and "
+        "worm allele maps on all enabled SnapGene servers, e.g. after the "
+        "common features database or SnapGene server were updated. "
+        "Progress is saved in a checkpoint file, an interrupted run "
+        "continues where it stopped. The checkpoint file is deleted once "
+        "all maps were re-rendered. To also update the sequence features "
+        "of the records, run redetect_map_sequence_features afterwards"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            choices=MODELS,
+            action="append",
+            help="Only process this model, can be given more than once",
+        )
+        parser.add_argument(
+            "--no-detect-features",
+            action="store_true",
+            help="Do not detect common features, only re-create "
+            "the .png previews and .gbk files",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=None,
+            help="Number of maps sent to the servers at once, "
+            "by default four per server",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to wait between chunks, to leave the servers "
+            "some capacity for the web app",
+        )
+        parser.add_argument(
+            "--timeout",
+            type=float,
+            default=30,
+            help="Seconds to wait for the answer to a request",
+        )
+        parser.add_argument(
+            "--in-flight",
+            type=int,
+            default=2,
+            help="Number of requests sent to each server at once, "
+            "so that servers do not wait for the next request",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            default=CHECKPOINT_PATH,
+            help=f"Path of the checkpoint file, by default {CHECKPOINT_PATH}",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore the checkpoint file and process all maps again",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report how many maps would be processed",
+        )
+
+    def load_checkpoint(self, path, restart):
+        if restart or not os.path.exists(path):
+            return {"done": {}, "failed": {}}
+        with open(path) as fhandle:
+            return json.load(fhandle)
+
+    def save_checkpoint(self, path, checkpoint):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as fhandle:
+            json.dump(checkpoint, fhandle)
+        os.replace(temp_path, path)
+
+    def delete_checkpoint(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+
+    def get_objs(self, model_names, checkpoint):
+        """Return (model name, object) for all records whose map has not
+        been processed yet"""
+
+        objs = []
+        skipped = 0
+        for model_name in model_names:
+            done_ids = set(checkpoint["done"].get(model_name, []))
+            for obj in (
+                MODELS[model_name]
+                .objects.exclude(map="")
+                .exclude(id__in=done_ids)
+                .order_by("id")
+            ):
+                if (
+                    not obj.map_png
+                    or not obj.map_gbk
+                    or not os.path.exists(obj.map.path)
+                ):
+                    skipped += 1
+                    continue
+                objs.append((model_name, obj))
+        return objs, skipped
+
+    async def request(self, client, command, timeout):
+        """Send a request and return whether it succeeded"""
+
+        response = await client.request(command, timeout)
+        return response.get("response") != "error" and response.get("code", 1) == 0
+
+    def get_detect_features_key(self, obj):
+        return map_cache.get_key(
+            obj.map.path,
+            "detectFeatures",
+            feature_db=map_cache.feature_db_version(SNAPGENE_COMMON_FEATURES_PATH),
+        )
+
+    def cache_rendered_files(self, obj):
+        """Store the .png preview and .gbk file of a map in the map cache"""
+
+        map_cache.set_file(
+            map_cache.get_key(
+                obj.map.path, "generatePNGMap", title=obj.map_preview_title
+            ),
+            obj.map_png.path,
+        )
+        map_cache.set_file(
+            map_cache.get_key(obj.map.path, "exportDNAFile"), obj.map_gbk.path
+        )
+
+    async def render_map(self, client, obj, detect_features, timeout):
+        """Detect common features and re-create the .png preview and .gbk
+        file of a map. Returns whether this succeeded. Files are hashed and
+        copied to the map cache in threads, not to block the event loop"""
+
+        if detect_features:
+            cache_key = await asyncio.to_thread(self.get_detect_features_key, obj)
+            command = {
+                "request": "detectFeatures",
+                "inputFile": obj.map.path,
+                "outputFile": obj.map.path,
+                "featureDatabase": SNAPGENE_COMMON_FEATURES_PATH,
+            }
+            if not await self.request(client, command, timeout):
+                return False
+            await asyncio.to_thread(map_cache.set_file, cache_key, obj.map.path)
+
+        png_command = {
+            "request": "generatePNGMap",
+            "inputFile": obj.map.path,
+            "outputPng": obj.map_png.path,
+            "title": obj.map_preview_title,
+            "showEnzymes": True,
+            "showFeatures": True,
+            "showPrimers": True,
+            "showORFs": False,
+        }
+        gbk_command = {
+            "request": "exportDNAFile",
+            "inputFile": obj.map.path,
+            "outputFile": obj.map_gbk.path,
+            "exportFilter": "biosequence.gb",
+        }
+        if not all(
+            await asyncio.gather(
+                self.request(client, png_command, timeout),
+                self.request(client, gbk_command, timeout),
+            )
+        ):
+            return False
+
+        await asyncio.to_thread(self.cache_rendered_files, obj)
+        return True
+
+    async def render_chunk(self, client, chunk, detect_features, timeout):
+        """Re-render a chunk of maps. All requests are sent to the servers
+        at once, they are processed as servers become free. Returns the
+        objects that failed"""
+
+        results = await asyncio.gather(
+            *(
+                self.render_map(client, obj, detect_features, timeout)
+                for _, obj in chunk
+            )
+        )
+        return [item for item, success in zip(chunk, results) if not success]
+
+    def handle(self, *args, **options):
+        server_ports = Config(SNAPGENE_SERVER_CONFIG).get_server_ports()
+        if not server_ports:
+            raise CommandError("No enabled SnapGene server found in its configuration")
+
+        if options["chunk_size"] is not None and options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1")
+
+        checkpoint = self.load_checkpoint(options["checkpoint"], options["restart"])
+        objs, skipped = self.get_objs(options["model"] or MODELS, checkpoint)
+
+        self.stdout.write(
+            f"{len(objs)} maps to process on {len(server_ports)} servers, "
+            f"{sum(len(ids) for ids in checkpoint['done'].values())} already done, "
+            f"{skipped} skipped because of missing files"
+        )
+        if options["dry_run"]:
+            return
+        if not objs:
+            # All maps were done by earlier runs, the next run starts over
+            self.delete_checkpoint(options["checkpoint"])
+            return
+
+        asyncio.run(self.render_maps(server_ports, objs, checkpoint, options))
+
+    async def render_maps(self, server_ports, objs, checkpoint, options):
+        chunk_size = options["chunk_size"] or 4 * len(server_ports)
+        processed = 0
+        failed = []
+        start_time = time.monotonic()
+
+        async with AsyncMultiClient(
+            server_ports, max_in_flight=options["in_flight"]
+        ) as client:
+            for chunk_start in range(0, len(objs), chunk_size):
+                chunk = objs[chunk_start : chunk_start + chunk_size]
+                failed_chunk = await self.render_chunk(
+                    client,
+                    chunk,
+                    not options["no_detect_features"],
+                    options["timeout"],
+                )
+                failed.extend(failed_chunk)
+                failed_keys = {(model_name, obj.id) for model_name, obj in failed_chunk}
+
+                for model_name, obj in chunk:
+                    done_ids = checkpoint["done"].setdefault(model_name, [])
+                    failed_ids = checkpoint["failed"].setdefault(model_name, [])
+                    if (model_name, obj.id) in failed_keys:
+                        if obj.id not in failed_ids:
+                            failed_ids.append(obj.id)
+                    else:
+                        done_ids.append(obj.id)
+                        if obj.id in failed_ids:
+                            failed_ids.remove(obj.id)
+                self.save_checkpoint(options["checkpoint"], checkpoint)
+
+                processed += len(chunk)
+                elapsed = time.monotonic() - start_time
+                rate = processed / elapsed if elapsed else 0
+                eta = (len(objs) - processed) / rate if rate else 0
+                self.stdout.write(
+                    f"{processed}/{len(objs)} maps, {len(failed)} failed, "
+                    f"{rate:.1f} maps/s, elapsed {format_duration(elapsed)}, "
+                    f"ETA {format_duration(eta)}"
+                )
+
+                if options["pause"] and processed < len(objs):
+                    await asyncio.sleep(options["pause"])
+
+            latencies = client.latency_histograms()
+
+        for request, latency in latencies.items():
+            self.stdout.write(
+                f"{request}: {latency['count']} requests, "
+                f"mean {latency['mean']:.0f} ms, p50 {latency['p50']:.0f} ms, "
+                f"p95 {latency['p95']:.0f} ms, max {latency['max']:.0f} ms"
+            )
+
+        for model_name, obj in failed:
+            self.stderr.write(f"Could not re-render the map of {model_name} {obj.id}")
+
+        summary = (
+            f"{processed - len(failed)} maps re-rendered, {len(failed)} failed "
+            f"in {format_duration(time.monotonic() - start_time)}"
+        )
+        if failed:
+            self.stdout.write(
+                self.style.WARNING(f"{summary}. Run the command again to retry them")
+            )
+        else:
+            # The run is complete, the next one processes all maps again
+            self.delete_checkpoint(options["checkpoint"])
+            self.stdout.write(self.style.SUCCESS(summary))
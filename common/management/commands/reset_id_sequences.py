@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from common.history import get_history_models
+from common.id_allocation import get_id_sequence_reset_sql, reset_id_sequences
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets the id sequences of collection and order records to the "
+        "largest id in their tables. Run it after ids were assigned without "
+        "the sequence, e.g. after importing records with their ids"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--model",
+            action="append",
+            help="Only process this model, as app_label.model_name, "
+            "can be given more than once",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print the SQL statements, do not run them",
+        )
+
+    def handle(self, *args, **options):
+        models = get_history_models()
+        model_names = options["model"] or sorted(models)
+        unknown_models = set(model_names) - set(models)
+        if unknown_models:
+            raise CommandError(
+                f"Unknown models: {', '.join(sorted(unknown_models))}. "
+                f"Choose from {', '.join(sorted(models))}"
+            )
+
+        selected_models = [models[model_name] for model_name in model_names]
+        if options["dry_run"]:
+            for sql in get_id_sequence_reset_sql(selected_models):
+                self.stdout.write(sql)
+        else:
+            reset_id_sequences(selected_models)
+            self.stdout.write(f"{len(selected_models)} id sequences reset")
@@ -0,0 +1,100 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from snapgene.pyclasses.config import format_config
+from snapgene.stand_in_server import start_stand_in_servers
+
+
+def add_stand_in_arguments(parser):
+    """Arguments that set the behaviour of stand-in servers"""
+
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.2,
+        help="Seconds each request takes, 0.2 by default",
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0.1,
+        help="Up to this many seconds are randomly added to each request",
+    )
+    parser.add_argument(
+        "--failure-rate",
+        type=float,
+        default=0,
+        help="Fraction of requests that fail with an error code",
+    )
+    parser.add_argument(
+        "--timeout-rate",
+        type=float,
+        default=0,
+        help="Fraction of requests that are only answered after --timeout-delay",
+    )
+    parser.add_argument(
+        "--timeout-delay",
+        type=float,
+        default=60,
+        help="Seconds after which requests selected by --timeout-rate are answered",
+    )
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+
+
+def get_stand_in_options(options):
+    return {
+        "latency": options["latency"],
+        "jitter": options["jitter"],
+        "failure_rate": options["failure_rate"],
+        "timeout_rate": options["timeout_rate"],
+        "timeout_delay": options["timeout_delay"],
+        "seed": options["seed"],
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs stand-in SnapGene servers, to develop or benchmark the map "
+        "pipeline without a SnapGene license. To use them, set "
+        "SNAPGENE_SERVER_CONFIG to the file written with --write-config"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--port",
+            type=int,
+            action="append",
+            help="Port of a stand-in server, can be given more than once. "
+            "By default, two servers on ports 5700 and 5701",
+        )
+        parser.add_argument(
+            "--write-config",
+            metavar="PATH",
+            help="Write a SnapGene server configuration file for the servers",
+        )
+        add_stand_in_arguments(parser)
+
+    def handle(self, *args, **options):
+        tcp_ports = options["port"] or [5700, 5701]
+
+        if options["write_config"]:
+            with open(options["write_config"], "w") as fhandle:
+                fhandle.write(format_config(tcp_ports))
+
+        _, servers = start_stand_in_servers(tcp_ports, **get_stand_in_options(options))
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Stand-in SnapGene servers listening on ports "
+                f"{', '.join(str(p) for p in tcp_ports)}. Quit with CONTROL-C"
+            )
+        )
+
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for server in servers:
+                server.stop()
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+
+from common.notifications import (
+    NOTIFICATION_BATCH_SIZE,
+    send_all_queued_notifications,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Sends the queued e-mail notifications that are due, as the "
+        "background task does. To test it without a mail server, run a "
+        "local SMTP debug server, e.g. python -m aiosmtpd -n -l "
+        "localhost:1025, and set EMAIL_HOST to localhost and EMAIL_PORT "
+        "to 1025"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=NOTIFICATION_BATCH_SIZE,
+            help="Number of notifications sent over one connection",
+        )
+
+    def handle(self, *args, **options):
+        sent_count = send_all_queued_notifications(options["batch_size"])
+        self.stdout.write(f"{sent_count} notifications sent")
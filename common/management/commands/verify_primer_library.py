@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from collection.oligo.primer_library import (
+    build_primer_library,
+    get_primer_entries,
+    get_versions,
+    library_lock,
+    read_primer_library,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compares the primer library used to find oligos in maps with all "
+        "oligos and rebuilds it if they differ. The library is otherwise "
+        "only updated when oligos are saved or deleted one by one, not when "
+        "they are changed in bulk or with raw SQL"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report whether the library is up to date",
+        )
+
+    def handle(self, *args, **options):
+        with library_lock():
+            versions = get_versions()
+            entries = get_primer_entries()
+            if versions and read_primer_library(versions[0][2]) == entries:
+                self.stdout.write(
+                    f"The library of {len(entries)} primers is up to date"
+                )
+                return
+
+            if options["dry_run"]:
+                self.stdout.write("The library is out of date")
+                return
+
+            build_primer_library()
+            self.stdout.write(f"The library was rebuilt with {len(entries)} primers")
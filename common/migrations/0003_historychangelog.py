@@ -0,0 +1,82 @@
+# Generated by Django 4.2.17 on 2026-10-18 08:46
+
+from django.conf import settings
+import django.core.serializers.json
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("contenttypes", "0002_remove_content_type_name"),
+        ("common", "0002_user_is_pi_user_oidc_id"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="HistoryChangeLog",
+            fields=[
+                (
+                    "id",
+                    models.AutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("object_id", models.PositiveIntegerField()),
+                ("history_id", models.PositiveIntegerField()),
+                ("field", models.CharField(max_length=100)),
+                (
+                    "old_value",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                    ),
+                ),
+                (
+                    "new_value",
+                    models.JSONField(
+                        encoder=django.core.serializers.json.DjangoJSONEncoder,
+                        null=True,
+                    ),
+                ),
+                ("timestamp", models.DateTimeField()),
+                (
+                    "content_type",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="contenttypes.contenttype",
+                    ),
+                ),
+                (
+                    "history_user",
+                    models.ForeignKey(
+                        null=True,
+                        on_delete=django.db.models.deletion.SET_NULL,
+                        related_name="+",
+                        to=settings.AUTH_USER_MODEL,
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "history change",
+                "verbose_name_plural": "history changes",
+                "indexes": [
+                    models.Index(
+                        fields=["content_type", "object_id", "-timestamp"],
+                        name="common_hist_content_4c57bd_idx",
+                    ),
+                    models.Index(
+                        fields=["content_type", "history_id"],
+                        name="common_hist_content_caca40_idx",
+                    ),
+                    models.Index(
+                        fields=["content_type", "field", "-timestamp"],
+                        name="common_hist_content_a6cc22_idx",
+                    ),
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,181 @@
+from contextlib import suppress
+from datetime import timedelta
+
+from background_task import background
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Notification
+
+NOTIFICATION_BATCH_SIZE = getattr(settings, "NOTIFICATION_BATCH_SIZE", 100)
+NOTIFICATION_MAX_ATTEMPTS = getattr(settings, "NOTIFICATION_MAX_ATTEMPTS", 5)
+NOTIFICATION_RETRY_DELAY = getattr(settings, "NOTIFICATION_RETRY_DELAY", 300)
+NOTIFICATION_SENDING_TIMEOUT = getattr(settings, "NOTIFICATION_SENDING_TIMEOUT", 600)
+
+
+def queue_mails(datatuple):
+    """Queue e-mails, given as (subject, message, from_email,
+    recipient_list, html_message) tuples, with one INSERT and schedule
+    the task that sends them once the transaction is committed"""
+
+    notifications = Notification.objects.bulk_create(
+        [
+            Notification(
+                subject=subject,
+                message=message,
+                from_email=from_email,
+                recipients=list(recipient_list),
+                html_message=html_message or "",
+            )
+            for subject, message, from_email, recipient_list, html_message in datatuple
+        ]
+    )
+    if notifications:
+        transaction.on_commit(lambda: send_notifications())
+    return notifications
+
+
+def queue_mail(subject, message, from_email, recipient_list, html_message=None):
+    """Queue an e-mail, with the arguments of send_mail"""
+
+    return queue_mails([(subject, message, from_email, recipient_list, html_message)])
+
+
+def get_email_message(notification, connection):
+    email = EmailMultiAlternatives(
+        notification.subject,
+        notification.message,
+        notification.from_email,
+        notification.recipients,
+        connection=connection,
+    )
+    if notification.html_message:
+        email.attach_alternative(notification.html_message, "text/html")
+    return email
+
+
+def claim_notifications(batch_size):
+    """Mark a batch of the notifications that are due as being sent, in a
+    short transaction, and return them. Notifications claimed by another
+    worker are skipped, unless it did not finish sending them within
+    NOTIFICATION_SENDING_TIMEOUT seconds"""
+
+    now = timezone.now()
+    with transaction.atomic():
+        notifications = list(
+            Notification.objects.select_for_update(skip_locked=True)
+            .filter(status__in=["queued", "sending"], next_attempt_date_time__lte=now)
+            .order_by("next_attempt_date_time", "id")[:batch_size]
+        )
+        for notification in notifications:
+            notification.status = "sending"
+            notification.attempts += 1
+            notification.next_attempt_date_time = now + timedelta(
+                seconds=NOTIFICATION_SENDING_TIMEOUT
+            )
+        Notification.objects.bulk_update(
+            notifications, ["status", "attempts", "next_attempt_date_time"]
+        )
+
+    return notifications
+
+
+def send_queued_notifications(batch_size=NOTIFICATION_BATCH_SIZE):
+    """Send a batch of the queued notifications that are due over one SMTP
+    connection and return the number sent.
+
+    The notifications are claimed first, so that no row is locked while
+    they are sent. A notification that cannot be sent is retried after a
+    delay that doubles with each attempt. After NOTIFICATION_MAX_ATTEMPTS
+    attempts it is marked as failed and no longer retried"""
+
+    notifications = claim_notifications(batch_size)
+    if not notifications:
+        return 0
+
+    sent_count = 0
+    connection = get_connection()
+    try:
+        connection.open()
+    except Exception as e:
+        connection_error = e
+    else:
+        connection_error = None
+
+    now = timezone.now()
+    for notification in notifications:
+        error = connection_error
+        if error is None:
+            try:
+                connection.send_messages([get_email_message(notification, connection)])
+            except Exception as e:
+                error = e
+
+        if error is None:
+            notification.status = "sent"
+            notification.sent_date_time = timezone.now()
+            notification.last_error = ""
+            sent_count += 1
+        else:
+            notification.last_error = f"{error.__class__.__name__}: {error}"
+            if notification.attempts >= NOTIFICATION_MAX_ATTEMPTS:
+                notification.status = "failed"
+            else:
+                notification.status = "queued"
+                notification.next_attempt_date_time = now + timedelta(
+                    seconds=NOTIFICATION_RETRY_DELAY * 2 ** (notification.attempts - 1)
+                )
+
+    # The statuses are saved even if the connection cannot be closed cleanly
+    if connection_error is None:
+        with suppress(Exception):
+            connection.close()
+
+    with transaction.atomic():
+        Notification.objects.bulk_update(
+            notifications,
+            [
+                "status",
+                "last_error",
+                "next_attempt_date_time",
+                "sent_date_time",
+            ],
+        )
+
+    return sent_count
+
+
+def send_all_queued_notifications(batch_size=NOTIFICATION_BATCH_SIZE):
+    """Send the queued notifications that are due, batch by batch, and
+    return the number sent"""
+
+    sent_count = 0
+    while True:
+        batch_sent_count = send_queued_notifications(batch_size)
+        sent_count += batch_sent_count
+        # Stop when no due notification is left or a whole batch failed,
+        # e.g. because the mail server is down
+        if not batch_sent_count:
+            break
+
+    # Schedule the retries
+    next_notification = (
+        Notification.objects.filter(status__in=["queued", "sending"])
+        .order_by("next_attempt_date_time")
+        .first()
+    )
+    if next_notification:
+        send_notifications(schedule=next_notification.next_attempt_date_time)
+
+    return sent_count
+
+
+# A pending task is replaced when the task is scheduled again, so that at
+# most one is waiting
+@background(schedule=0, remove_existing_tasks=True)
+def send_notifications():
+    """Send the queued notifications in the background"""
+
+    send_all_queued_notifications()
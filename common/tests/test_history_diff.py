@@ -0,0 +1,156 @@
+import datetime
+
+from django.test import SimpleTestCase
+
+from collection.models import Plasmid
+from common.history_diff import get_diff_plan
+
+HistoricalPlasmid = Plasmid.history.model
+
+
+def historical_plasmid(history_id, **kwargs):
+    values = {
+        "id": 1,
+        "name": "pTest",
+        "selection": "Amp",
+        "created_by_id": 1,
+        "history_formz_projects": [1, 2],
+        "map": "collection/plasmids/dna/p1_pTest.dna",
+    }
+    values.update(kwargs)
+    return HistoricalPlasmid(history_id=history_id, **values)
+
+
+def diff_against(old_history_obj, new_history_obj):
+    """The changes as previously written to the change log, with file
+    fields as their names"""
+
+    delta = new_history_obj.diff_against(
+        old_history_obj, excluded_fields=Plasmid._history_view_ignore_fields
+    )
+    return sorted(
+        (
+            change.field,
+            getattr(change.old, "name", change.old),
+            getattr(change.new, "name", change.new),
+        )
+        for change in delta.changes
+    )
+
+
+class DiffPlanTest(SimpleTestCase):
+    def setUp(self):
+        self.plan = get_diff_plan(Plasmid)
+
+    def diff(self, old_history_obj, new_history_obj):
+        return self.plan.diff(
+            self.plan.get_row(old_history_obj), self.plan.get_row(new_history_obj)
+        )
+
+    def assertSameDiff(self, old_history_obj, new_history_obj):
+        changes = self.diff(old_history_obj, new_history_obj)
+        self.assertEqual(changes, diff_against(old_history_obj, new_history_obj))
+        return changes
+
+    def test_no_changes(self):
+        self.assertEqual(
+            self.assertSameDiff(historical_plasmid(1), historical_plasmid(2)), []
+        )
+
+    def test_changes(self):
+        old_history_obj = historical_plasmid(1)
+        new_history_obj = historical_plasmid(
+            2,
+            name="pTest2",
+            parent_vector_id=5,
+            destroyed_date=datetime.date(2024, 1, 31),
+            history_formz_projects=[1, 3],
+            map="collection/plasmids/dna/p1_pTest2.dna",
+        )
+
+        self.assertEqual(
+            self.assertSameDiff(old_history_obj, new_history_obj),
+            [
+                ("destroyed_date", None, datetime.date(2024, 1, 31)),
+                ("history_formz_projects", [1, 2], [1, 3]),
+                (
+                    "map",
+                    "collection/plasmids/dna/p1_pTest.dna",
+                    "collection/plasmids/dna/p1_pTest2.dna",
+                ),
+                ("name", "pTest", "pTest2"),
+                ("parent_vector", None, 5),
+            ],
+        )
+
+    def test_ignored_fields(self):
+        old_history_obj = historical_plasmid(1)
+        new_history_obj = historical_plasmid(
+            2,
+            last_changed_date_time=datetime.datetime(2024, 1, 31, tzinfo=datetime.UTC),
+            last_changed_approval_by_pi=True,
+            approval_user_id=1,
+            map_status="done",
+            map_missing_features=["lac promoter"],
+        )
+
+        self.assertEqual(self.assertSameDiff(old_history_obj, new_history_obj), [])
+
+    def test_arrays_are_compared_as_sets(self):
+        """Unlike diff_against, reordered arrays are not a change"""
+
+        old_history_obj = historical_plasmid(1)
+        new_history_obj = historical_plasmid(2, history_formz_projects=[2, 1])
+
+        self.assertEqual(self.diff(old_history_obj, new_history_obj), [])
+        self.assertEqual(
+            diff_against(old_history_obj, new_history_obj),
+            [("history_formz_projects", [1, 2], [2, 1])],
+        )
+        self.assertEqual(
+            self.diff(historical_plasmid(1, history_documents=None), old_history_obj),
+            [],
+        )
+
+    def test_empty_file_is_no_file(self):
+        old_history_obj = historical_plasmid(1, map=None)
+        new_history_obj = historical_plasmid(2, map="")
+
+        self.assertEqual(self.diff(old_history_obj, new_history_obj), [])
+        self.assertEqual(
+            self.diff(new_history_obj, historical_plasmid(3)),
+            [("map", None, "collection/plasmids/dna/p1_pTest.dna")],
+        )
+
+    def test_diff_rows(self):
+        history_objs = [
+            historical_plasmid(1),
+            historical_plasmid(2, name="pTest2"),
+            historical_plasmid(3, name="pTest3", selection="Kan"),
+            historical_plasmid(4, id=2),
+            historical_plasmid(5, id=2, history_formz_projects=[]),
+        ]
+
+        changes = [
+            (self.plan.get(row, "history_id"), row_changes)
+            for row, row_changes in self.plan.diff_rows(
+                self.plan.get_row(history_obj) for history_obj in history_objs
+            )
+        ]
+
+        self.assertEqual(
+            changes,
+            [
+                (2, diff_against(history_objs[0], history_objs[1])),
+                (3, diff_against(history_objs[1], history_objs[2])),
+                (5, diff_against(history_objs[3], history_objs[4])),
+            ],
+        )
+        self.assertEqual(
+            [row_changes for _, row_changes in changes],
+            [
+                [("name", "pTest", "pTest2")],
+                [("name", "pTest2", "pTest3"), ("selection", "Amp", "Kan")],
+                [("history_formz_projects", [1, 2], [])],
+            ],
+        )
@@ -214,6 +214,21 @@ if ALLOW_OIDC:
     MIDDLEWARE += ["mozilla_django_oidc.middleware.SessionRefresh"]
 OIDC_RENEW_ID_TOKEN_EXPIRY_SECONDS = 86400  # 24 h
 
+# SnapGene server settings
+SNAPGENE_SERVER_CONFIG = None  # default /etc/snapgene-server/snapgene-server.conf
+SNAPGENE_CLIENT_POOL_SIZE = 2  # clients kept ready per server
+SNAPGENE_CLIENT_CHECKOUT_TIMEOUT = 5  # seconds to wait for a free client
+SNAPGENE_CLIENT_PROBE_AFTER = 60  # seconds idle before a client is probed on use
+SNAPGENE_CLIENT_PROBE_TIMEOUT = 1000  # ms to wait for the answer to a probe
+SNAPGENE_BREAKER_FAILURE_THRESHOLD = 3  # failed requests before a server is skipped
+SNAPGENE_BREAKER_RESET_TIMEOUT = 30  # seconds a failing server is skipped
+SNAPGENE_RETRY_ATTEMPTS = 3
+SNAPGENE_CALL_DEADLINE = 30  # seconds for a request, including retries
+SNAPGENE_UNAVAILABLE_RETRY_DELAY = 60  # seconds between retries of pending maps
+MAP_CACHE_DIR = BASE_DIR / "uploads/map_cache"
+MAP_CACHE_MAX_SIZE_MB = 500  # 0 disables the cache of map previews, .gbk maps, etc.
+PRIMER_LIBRARY_DIR = BASE_DIR / "uploads/primer_library"
+
 # Other settings
 FILE_UPLOAD_PERMISSIONS = 0o664
 LOGIN_URL = "/login/"
@@ -234,4 +249,25 @@ ALLOWED_DOC_FILE_EXTS = [
     "dna",
 ]
 FILE_SIZE_LIMIT_MB = 2
+HISTORY_PAGE_SIZE = 20  # changes per page of the history view
+HISTORY_ARCHIVE_DIR = BASE_DIR / "history_archive"
+# Historical records of a model that are neither among the last keep_versions
+# versions of an object (at least 2) nor newer than keep_days are archived
+# weekly. Creation records are always kept. E.g.
+# {"ordering.order": {"keep_versions": 10, "keep_days": 365}}
+HISTORY_RETENTION_POLICIES = {}
+# Seconds for which the filter options of the approval changelist are cached.
+# They are recomputed when approvals are created or deleted, in all processes
+# if CACHES is set to a shared cache
+APPROVAL_FACETS_CACHE_TIMEOUT = 300
+# E-mail notifications are queued and sent by a background task, in batches
+# of NOTIFICATION_BATCH_SIZE over one connection. A notification that cannot
+# be sent is retried after NOTIFICATION_RETRY_DELAY seconds, doubled after
+# each attempt, and marked as failed after NOTIFICATION_MAX_ATTEMPTS attempts
+NOTIFICATION_BATCH_SIZE = 100
+NOTIFICATION_MAX_ATTEMPTS = 5
+NOTIFICATION_RETRY_DELAY = 300
+# Notifications that a worker claimed but did not finish sending within
+# NOTIFICATION_SENDING_TIMEOUT seconds are sent again by another one
+NOTIFICATION_SENDING_TIMEOUT = 600
 AUTH_USER_MODEL = "common.User"
@@ -4,30 +4,14 @@ from datetime import timedelta
 from background_task.models import CompletedTask
 from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.core.mail import send_mail
 from django.urls import reverse
 from django.utils import timezone
 
-from approval.models import Approval
-from collection.models import (
-    Antibody,
-    CellLine,
-    EColiStrain,
-    HistoricalAntibody,
-    HistoricalCellLine,
-    HistoricalEColiStrain,
-    HistoricalOligo,
-    HistoricalPlasmid,
-    HistoricalSaCerevisiaeStrain,
-    HistoricalScPombeStrain,
-    HistoricalWormStrain,
-    Oligo,
-    Plasmid,
-    SaCerevisiaeStrain,
-    ScPombeStrain,
-    WormStrain,
-)
-from ordering.models import HistoricalOrder, Order
+from approval.models import Approval, ApprovalApprover
+from common.history import get_history_models
+from common.history_archive import archive_history
+from common.history_dedup import delete_duplicate_history_records
+from common.notifications import queue_mail, send_all_queued_notifications
 
 User = get_user_model()
 SITE_TITLE = getattr(settings, "SITE_TITLE", "Lab DB")
@@ -41,15 +25,11 @@ def get_formz_project_leader_emails(qs):
 
     qs = qs.exclude(content_type__model__in=["order", "oligo"])
 
-    ids = []
-
-    for approval_obj in qs:
-        project_leader_ids = list(
-            approval_obj.content_object.formz_projects.all().values_list(
-                "project_leader", flat=True
-            )
-        )
-        ids.extend(project_leader_ids)
+    ids = list(
+        ApprovalApprover.objects.filter(approval__in=qs)
+        .values_list("user", flat=True)
+        .distinct()
+    )
 
     pi_user_id = User.objects.get(is_pi=True).id
 
@@ -82,68 +62,31 @@ if (
     """.format(ALLOWED_HOSTS[0], APPROVAL_URL, SITE_TITLE)
     )
 
-    send_mail(
+    queue_mail(
         "{} weekly notification".format(SITE_TITLE),
         EMAIL_MESSAGE_TXT,
         SERVER_EMAIL_ADDRESS,
         PROJECT_LEADER_EMAILS,
     )
 
-# Delete all completed tasks
-
-CompletedTask.objects.all().delete()
-
-
-def delete_dup_hist_rec_ids(model, time_delta):
-    """Delete history items that differ just by last_changed_date_time"""
+# Send queued notifications, including ones left over if the background
+# task worker is not running
 
-    def pairwise(iterable):
-        """Create pairs of consecutive items from
-        iterable"""
+send_all_queued_notifications()
 
-        import itertools
-
-        a, b = itertools.tee(iterable)
-        next(b, None)
-        return zip(a, b)
-
-    items_to_check = model.objects.filter(last_changed_date_time__gte=time_delta)
+# Delete all completed tasks
 
-    hist_item_ids_delete = []
+CompletedTask.objects.all().delete()
 
-    for item in items_to_check:
-        history_records = item.history.all()
-        if history_records.count() > 1:
-            history_pairs = pairwise(history_records)
-            for history_element in history_pairs:
-                newer_record = history_element[0]
-                older_record = history_element[1]
-                delta = newer_record.diff_against(older_record)
-                changed_fields = delta.changed_fields
-                if (
-                    "last_changed_date_time" in changed_fields
-                    and len(changed_fields) == 1
-                ):
-                    hist_item_ids_delete.append(delta.new_record.history_id)
 
-    return hist_item_ids_delete
+# Delete historical records that only differ by last_changed_date_time
 
+NOW_MINUS_8DAYS = timezone.now() - timedelta(days=8)
 
-MODELS = {
-    Plasmid: HistoricalPlasmid,
-    SaCerevisiaeStrain: HistoricalSaCerevisiaeStrain,
-    Oligo: HistoricalOligo,
-    ScPombeStrain: HistoricalScPombeStrain,
-    EColiStrain: HistoricalEColiStrain,
-    CellLine: HistoricalCellLine,
-    Antibody: HistoricalAntibody,
-    WormStrain: HistoricalWormStrain,
-    Order: HistoricalOrder,
-}
+for model in get_history_models().values():
+    delete_duplicate_history_records(model, NOW_MINUS_8DAYS)
 
-NOW_MINUS_8DAYS = timezone.now() - timedelta(days=8)
+# Archive historical records outside the retention policies
 
-for model, history_model in MODELS.items():
-    ids_to_delete = delete_dup_hist_rec_ids(model, NOW_MINUS_8DAYS)
-    if ids_to_delete:
-        history_model.objects.filter(history_id__in=ids_to_delete).delete()
+for model in get_history_models().values():
+    archive_history(model)
@@ -10,8 +10,7 @@ from adminactions.mass_update import (
 from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.admin import helpers
-from django.core.exceptions import ObjectDoesNotExist
-from django.core.mail import send_mail
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.db.transaction import atomic
 from django.forms.models import ModelMultipleChoiceField, modelform_factory
 from django.http import HttpResponseRedirect
@@ -21,6 +20,8 @@ from django.utils.encoding import smart_str
 from django.utils.safestring import mark_safe
 
 from common.export import export_objects
+from common.history import bulk_update_with_history
+from common.notifications import queue_mails
 
 from .export import OrderChemicalExportResource, OrderExportResource
 from .forms import MassUpdateOrderForm
@@ -42,9 +43,10 @@ def change_order_status(request, queryset, origin_status, destination_status):
         messages.error(request, "Nice try, you are not allowed to do that.")
         return
     else:
-        for order in queryset.filter(status=origin_status):
+        orders = list(queryset.filter(status=origin_status))
+        for order in orders:
             order.status = destination_status
-            order.save()
+        bulk_update_with_history(queryset.model, orders, ["status"], request.user)
 
 
 @admin.action(description="Change STATUS to ARRANGED")
@@ -82,7 +84,9 @@ def change_order_status_to_delivered(modeladmin, request, queryset):
         messages.error(request, "Nice try, you are not allowed to do that.")
         return
     else:
-        for order in queryset.filter(status="arranged"):
+        orders = list(queryset.filter(status="arranged").select_related("created_by"))
+        mails = []
+        for order in orders:
             # If an order does not have a delivery date and its status changes
             # to 'delivered', set the date for delivered_date to the current
             # date.
@@ -97,14 +101,22 @@ def change_order_status_to_delivered(modeladmin, request, queryset):
                     "admin/ordering/order/order_email_delivered.txt",
                     {"order": order, "SITE_TITLE": SITE_TITLE},
                 )
-                send_mail(
-                    "Delivery notification",
-                    message,
-                    SERVER_EMAIL_ADDRESS,
-                    [order.created_by.email],
-                    fail_silently=True,
+                mails.append(
+                    (
+                        "Delivery notification",
+                        message,
+                        SERVER_EMAIL_ADDRESS,
+                        [order.created_by.email],
+                        None,
+                    )
                 )
-            order.save()
+        bulk_update_with_history(
+            queryset.model,
+            orders,
+            ["status", "delivered_date", "sent_email"],
+            request.user,
+        )
+        queue_mails(mails)
 
 
 @admin.action(description="Export orders")
@@ -147,18 +159,58 @@ def mass_update(modeladmin, request, queryset):
 
     def _doit():
         errors = {}
-        updated = 0
+        model_fields = {
+            field.name: field
+            for field in modeladmin.model._meta.get_fields()
+            if field.concrete
+        }
+        history_array_fields = getattr(modeladmin.model, "_history_array_fields", {})
+        updated_fields = set()
+        relations = {}
+        records = []
         for record in queryset:
             for field_name, value_or_func in list(form.cleaned_data.items()):
+                field = model_fields.get(field_name)
+                if field is None:
+                    continue
+                if field.many_to_many:
+                    # Relations are set together with the other fields,
+                    # their history array field is saved with them
+                    relations[field_name] = value_or_func
+                    history_field_name = f"history_{field_name}"
+                    if history_field_name in history_array_fields:
+                        setattr(
+                            record,
+                            history_field_name,
+                            sorted(obj.id for obj in value_or_func),
+                        )
+                        updated_fields.add(history_field_name)
+                    continue
                 if callable(value_or_func):
                     old_value = getattr(record, field_name)
                     setattr(record, field_name, value_or_func(old_value))
                 else:
                     setattr(record, field_name, value_or_func)
+                updated_fields.add(field_name)
             if clean:
-                record.clean()
-            record.save()
-            updated += 1
+                try:
+                    record.clean()
+                except ValidationError as e:
+                    errors[record.pk] = "; ".join(e.messages)
+                    continue
+            record.strip_text_fields()
+            records.append(record)
+
+        with atomic():
+            for record in records:
+                for field_name, value in relations.items():
+                    getattr(record, field_name).set(value)
+            updated = bulk_update_with_history(
+                modeladmin.model,
+                records,
+                updated_fields,
+                request.user,
+            )
         if updated:
             messages.info(request, f"Updated {updated} records")
 
@@ -306,8 +358,8 @@ def mass_update(modeladmin, request, queryset):
         form, modeladmin.get_fieldsets(request), {}, [], model_admin=modeladmin
     )
     media = modeladmin.media + adminForm.media
-    dthandler = (
-        lambda obj: obj.isoformat() if isinstance(obj, datetime.date) else str(obj)
+    dthandler = lambda obj: (
+        obj.isoformat() if isinstance(obj, datetime.date) else str(obj)
     )
     tpl = "adminactions/mass_update.html"
     ctx = {
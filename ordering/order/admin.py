@@ -5,7 +5,6 @@ from django.conf import settings
 from django.contrib import admin, messages
 from django.contrib.auth import get_user_model
 from django.core.exceptions import PermissionDenied
-from django.core.mail import send_mail
 from django.db import models
 from django.db.models import Subquery
 from django.http import HttpResponse, HttpResponseRedirect
@@ -20,6 +19,9 @@ from common.admin import (
     SimpleHistoryWithSummaryAdmin,
     save_history_fields,
 )
+from common.history import defer_change_log
+from common.id_allocation import allocate_id
+from common.notifications import queue_mail
 
 from ..models import (
     CostUnit,
@@ -392,42 +394,35 @@ class OrderAdmin(
     def cost_unit_name(self, instance):
         return instance.cost_unit.name
 
+    def save_form(self, request, form, change):
+        # The change log is written once the history array fields are
+        # saved, in save_related
+        obj = super().save_form(request, form, change)
+        defer_change_log(obj)
+        return obj
+
     def save_model(self, request, obj, form, change):
         # Save new order
         def save_new(request, obj):
             # If an order is new, assign the request user to it only if the
             # order's created_by attribute is not null
-            obj.id = (
-                self.model.objects.order_by("-id").first().id + 1
-                if self.model.objects.exists()
-                else 1
-            )
+            obj.id = allocate_id(self.model)
             try:
                 obj.created_by
             except Exception:
                 obj.created_by = request.user
-            obj.save()
-            # Automatically create internal_order_number and add it
-            # to record
+            # Automatically create internal_order_number, before the order
+            # is saved so that it is saved, with one historical record, once
             if not obj.internal_order_no:
                 obj.internal_order_no = (
                     f"{obj.pk}-{timezone.now().date().strftime('%y%m%d')}"
                 )
             obj.save()
-            # Delete the first history record, which doesn't contain an
-            # internal_order_number, and change the newer history record's
-            # history_type from changed (~) to created (+). This gets rid of a
-            # duplicate history record created when automatically generating
-            # an internal_order_number
-            obj.history.last().delete()
-            history_obj = obj.history.first()
-            history_obj.history_type = "+"
-            history_obj.save()
             # Create approval record
             if not request.user.is_pi:
                 obj.approval.create(
                     activity_type="created",
-                    activity_user=obj.history.latest().created_by,
+                    activity_user=obj.created_by,
                 )
                 self.model.objects.filter(id=obj.pk).update(created_approval_by_pi=True)
             # Send email to Lab Managers if an order is urgent
@@ -466,23 +461,16 @@ class OrderAdmin(
                         "admin/ordering/order/order_email_urgent.txt",
                         {"user": request.user, "order": obj, "site_title": SITE_TITLE},
                     )
-                    try:
-                        send_mail(
-                            "New urgent order",
-                            message,
-                            SERVER_EMAIL_ADDRESS,
-                            ORDER_EMAIL_ADDRESSES,
-                            fail_silently=False,
-                        )
-                        messages.success(
-                            request,
-                            "The lab managers have been informed of your urgent order.",
-                        )
-                    except Exception:
-                        messages.warning(
-                            request,
-                            "Your urgent order was added to the Order list. However, the lab managers have not been informed of it.",
-                        )
+                    queue_mail(
+                        "New urgent order",
+                        message,
+                        SERVER_EMAIL_ADDRESS,
+                        ORDER_EMAIL_ADDRESSES,
+                    )
+                    messages.success(
+                        request,
+                        "The lab managers will be informed of your urgent order.",
+                    )
 
         # Save existing order
         def save_existing(request, obj):
@@ -519,22 +507,15 @@ class OrderAdmin(
                                 "admin/ordering/order/order_email_delivered.txt",
                                 {"order": order, "site_title": SITE_TITLE},
                             )
-                            try:
-                                send_mail(
-                                    "Delivery notification",
-                                    message,
-                                    SERVER_EMAIL_ADDRESS,
-                                    [obj.created_by.email],
-                                    fail_silently=False,
-                                )
-                                messages.success(
-                                    request, "Delivery notification was sent."
-                                )
-                            except Exception:
-                                messages.warning(
-                                    request,
-                                    "Could not send delivery notification.",
-                                )
+                            queue_mail(
+                                "Delivery notification",
+                                message,
+                                SERVER_EMAIL_ADDRESS,
+                                [obj.created_by.email],
+                            )
+                            messages.success(
+                                request, "Delivery notification will be sent."
+                            )
             obj.save()
             # Delete order history for used-up or cancelled items
             if obj.status in ["used up", "cancelled"] and obj.history.exists():
@@ -181,9 +181,7 @@ class Order(SaveWithoutHistoricalRecord, HistoryFieldMixin):
     def __str__(self):
         return "{} - {}".format(self.id, self.part_description)
 
-    def save(
-        self, force_insert=False, force_update=False, using=None, update_fields=None
-    ):
+    def strip_text_fields(self):
         # Remove trailing whitespace and internal new-line characters from specific fields
         self.supplier = self.supplier.strip().replace("\n", " ")
         self.supplier_part_no = self.supplier_part_no.strip().replace("\n", " ")
@@ -193,6 +191,10 @@ class Order(SaveWithoutHistoricalRecord, HistoryFieldMixin):
         self.cas_number = self.cas_number.strip().replace("\n", " ")
         self.ghs_pictogram_old = self.ghs_pictogram_old.strip().replace("\n", " ")
 
+    def save(
+        self, force_insert=False, force_update=False, using=None, update_fields=None
+    ):
+        self.strip_text_fields()
         super().save(force_insert, force_update, using, update_fields)
 
 
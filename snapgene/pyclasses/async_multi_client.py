@@ -0,0 +1,351 @@
+import asyncio
+import bisect
+import itertools
+import json
+import time
+from collections import deque
+
+import zmq
+import zmq.asyncio
+
+
+# histogram of response times in milliseconds, with fixed buckets
+class LatencyHistogram:
+    BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, 60000]
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, milliseconds):
+        self.counts[bisect.bisect_left(self.BUCKETS, milliseconds)] += 1
+        self.count += 1
+        self.total += milliseconds
+        self.max = max(self.max, milliseconds)
+
+    # returns the upper bound of the bucket that contains the percentile,
+    # at most the maximum response time
+    def percentile(self, percent):
+        if not self.count:
+            return 0
+        rank = percent / 100 * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank:
+                return (
+                    min(self.BUCKETS[i], self.max)
+                    if i < len(self.BUCKETS)
+                    else self.max
+                )
+        return self.max
+
+    def as_dict(self):
+        buckets = {
+            f"<={bound}": count for bound, count in zip(self.BUCKETS, self.counts)
+        }
+        buckets[f">{self.BUCKETS[-1]}"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "mean": self.total / self.count if self.count else 0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "max": self.max,
+            "buckets": buckets,
+        }
+
+
+# one dealer socket connected to a snapgene server daemon. Each request is
+# sent with its id as an envelope frame, which the REP socket of the server
+# returns with the response. This way several requests can be in flight at
+# the same time and responses are matched to their requests.
+# A server answers one request at a time, so while a request whose deadline
+# has passed is still being processed, the connection is late and no
+# further request is sent to it
+class DealerConnection:
+    def __init__(self, index, port, context):
+        self.index = index
+        self.port = port
+        self.context = context
+        self.pending = {}
+        self.late = set()
+        self.socket = None
+        self.receiver = None
+        self.open()
+
+    def open(self):
+        self.socket = self.context.socket(zmq.DEALER)
+        self.socket.setsockopt(zmq.LINGER, 0)
+        self.socket.connect("tcp://localhost:%s" % self.port)
+
+    def start(self):
+        self.receiver = asyncio.ensure_future(self.receive())
+
+    async def receive(self):
+        while True:
+            frames = await self.socket.recv_multipart()
+            future = self.pending.pop(frames[0], None)
+            if future is None or future.done():
+                continue
+            # a response that cannot be decoded only fails its request
+            try:
+                future.set_result(json.loads(frames[-1]))
+            except ValueError as e:
+                future.set_exception(e)
+
+    async def send(self, request_id, command):
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        await self.socket.send_multipart(
+            [request_id, b"", json.dumps(command).encode()]
+        )
+        return future
+
+    def forget(self, request_id):
+        self.pending.pop(request_id, None)
+
+    def close(self):
+        if self.receiver is not None:
+            self.receiver.cancel()
+        self.socket.close()
+
+    # replaces the socket, e.g. when the server never answered a late
+    # request because it was restarted. The requests in flight fail
+    def reconnect(self):
+        self.close()
+        pending, self.pending = self.pending, {}
+        for future in pending.values():
+            if not future.done():
+                future.set_exception(
+                    ConnectionResetError(
+                        "Reconnected to snapgene server %s" % self.index
+                    )
+                )
+        self.open()
+        self.start()
+
+
+# a request waiting to be sent or in flight
+class Job:
+    def __init__(self, command, timeout):
+        self.command = command
+        self.timeout = timeout
+        self.future = asyncio.get_running_loop().create_future()
+
+
+# asyncio client to send requests to multiple snapgene server daemons.
+# the caller must supply a dict of server indices to tcp ports, as returned
+# by Config.get_server_ports(). Up to max_in_flight requests are sent to
+# each server at once, which queues them, so that a server never waits
+# for the next request. Requests are load balanced across servers, each has
+# its own deadline and can be cancelled by cancelling the awaiting task.
+# After a request timed out, a server gets no further request until it has
+# answered it, or until late_timeout seconds later, when its connection is
+# reset.
+#
+# must be created and used within a running event loop, e.g.
+#   async with AsyncMultiClient(ports) as client:
+#       response = await client.request(command, timeout=10)
+class AsyncMultiClient:
+    def __init__(
+        self,
+        tcp_ports,
+        zmq_context=None,
+        max_in_flight=2,
+        late_timeout=60,
+        verbosity=0,
+    ):
+        if not tcp_ports:
+            raise Exception("No snapgene server is enabled in the configuration file")
+
+        self.zmq_context = zmq_context or zmq.asyncio.Context.instance()
+        self.max_in_flight = max_in_flight
+        self.late_timeout = late_timeout
+        self.verbosity = verbosity
+        self.request_ids = itertools.count()
+
+        self.connections = {
+            index: DealerConnection(index, port, self.zmq_context)
+            for index, port in tcp_ports.items()
+        }
+
+        # requests for any server and for specific servers
+        self.queue = deque()
+        self.server_queues = {index: deque() for index in self.connections}
+        self.condition = asyncio.Condition()
+
+        # response times per request type
+        self.histograms = {}
+
+        self.workers = []
+        for connection in self.connections.values():
+            connection.start()
+            for _ in range(max_in_flight):
+                self.workers.append(asyncio.ensure_future(self.work(connection)))
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        self.close()
+
+    # returns the next job for a connection, requests for the
+    # specific server first, or None while the connection is late
+    def next_job(self, connection):
+        if connection.late:
+            return None
+        for queue in (self.server_queues[connection.index], self.queue):
+            while queue:
+                job = queue.popleft()
+                if not job.future.done():
+                    return job
+        return None
+
+    async def work(self, connection):
+        while True:
+            async with self.condition:
+                job = self.next_job(connection)
+                while job is None:
+                    await self.condition.wait()
+                    job = self.next_job(connection)
+
+            request_id = str(next(self.request_ids)).encode()
+            start_time = time.time()
+            if self.verbosity >= 2:
+                print(job.command)
+
+            try:
+                response_future = await connection.send(request_id, job.command)
+                response = await asyncio.wait_for(
+                    asyncio.shield(response_future), job.timeout
+                )
+                self.complete_job(job, connection, response, start_time)
+            except asyncio.TimeoutError:
+                self.fail_job(job, connection, "timeout")
+                await self.wait_for_late_response(
+                    connection, request_id, response_future
+                )
+            except asyncio.CancelledError:
+                connection.forget(request_id)
+                if not job.future.done():
+                    job.future.cancel()
+                raise
+            except Exception as e:
+                # an unexpected error only fails its job, not the worker
+                connection.forget(request_id)
+                self.fail_job(job, connection, "%s: %s" % (type(e).__name__, e))
+
+    def complete_job(self, job, connection, response, start_time):
+        response_time = (time.time() - start_time) * 1000
+        response["responseTime"] = "{:0.2f}".format(response_time)
+        response["serverIndex"] = connection.index
+        self.histograms.setdefault(job.command.get("request"), LatencyHistogram()).add(
+            response_time
+        )
+        if self.verbosity >= 1:
+            print(json.dumps(response, sort_keys=True, indent=4, separators=(",", ":")))
+
+        if not job.future.done():
+            job.future.set_result(response)
+
+    # the server is still processing a request whose deadline has passed,
+    # and would only answer the requests sent after it late. Waits for the
+    # late response, whose content is ignored, before the connection takes
+    # jobs again
+    async def wait_for_late_response(self, connection, request_id, response_future):
+        connection.late.add(request_id)
+        try:
+            await asyncio.wait_for(response_future, self.late_timeout)
+        except asyncio.TimeoutError:
+            connection.reconnect()
+        except Exception:
+            # the connection was reset or the response could not be decoded
+            pass
+        finally:
+            connection.late.discard(request_id)
+            connection.forget(request_id)
+
+        async with self.condition:
+            self.condition.notify_all()
+
+    # returns the command marked as failed, like MutliClient
+    def fail_job(self, job, connection, reason):
+        error = dict(job.command)
+        error["serverIndex"] = connection.index
+        error["response"] = "error"
+        error["reason"] = reason
+        if not job.future.done():
+            job.future.set_result(error)
+
+    async def submit(self, command, timeout=None, server_index=None):
+        job = Job(command, timeout)
+        async with self.condition:
+            if server_index is None:
+                self.queue.append(job)
+            else:
+                self.server_queues[server_index].append(job)
+            self.condition.notify_all()
+        return job
+
+    # sends a request and returns its response. timeout is in seconds,
+    # from when the request is sent to a server. A request that times out
+    # returns the command with "response": "error" and "reason": "timeout",
+    # like MutliClient.doBatch. Cancelling the awaiting task cancels the
+    # request
+    async def request(self, command, timeout=None, server_index=None):
+        job = await self.submit(command, timeout, server_index)
+        try:
+            return await asyncio.shield(job.future)
+        except asyncio.CancelledError:
+            job.future.cancel()
+            raise
+
+    # sends requests and yields (command, response) as responses arrive.
+    # if all is True, each command is sent to every server
+    async def iter_batch(self, commandList, all=False, timeout=None):
+        if all:
+            requests = [
+                (command, server_index)
+                for server_index in self.connections
+                for command in commandList
+            ]
+        else:
+            requests = [(command, None) for command in commandList]
+
+        async def send(command, server_index):
+            return command, await self.request(command, timeout, server_index)
+
+        tasks = [
+            asyncio.ensure_future(send(command, server_index))
+            for command, server_index in requests
+        ]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    # like MutliClient.doBatch, but timeout (in milliseconds) applies to each
+    # request and a slow request does not fail the others
+    async def doBatch(self, commandList, all, timeout):
+        return [
+            response
+            async for _, response in self.iter_batch(
+                commandList, all, None if timeout is None else timeout / 1000
+            )
+        ]
+
+    def latency_histograms(self):
+        return {
+            request: histogram.as_dict()
+            for request, histogram in self.histograms.items()
+        }
+
+    def close(self):
+        for worker in self.workers:
+            worker.cancel()
+        for connection in self.connections.values():
+            connection.close()
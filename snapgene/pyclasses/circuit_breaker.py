@@ -0,0 +1,81 @@
+import threading
+import time
+
+
+# circuit breaker for one snapgene server daemon.
+# after failure_threshold consecutive failures (e.g. timeouts) the breaker
+# opens and no requests are sent to the server for reset_timeout seconds.
+# afterwards a single trial request is let through (half open). If it
+# succeeds the breaker closes again, otherwise it opens for another
+# reset_timeout seconds.
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.lock = threading.Lock()
+        self.state = self.CLOSED
+        self.failure_count = 0
+        self.opened_at = 0
+        self.trial_in_progress = False
+
+    # returns whether a request may be sent to the server now. In the half
+    # open state, only one caller is allowed to send the trial request
+    def allow(self):
+        with self.lock:
+            if self.state == self.CLOSED:
+                return True
+
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self.trial_in_progress = False
+
+            if self.trial_in_progress:
+                return False
+            self.trial_in_progress = True
+            return True
+
+    # returns whether a request could be sent to the server now,
+    # without reserving the trial request of a half open breaker
+    def is_available(self):
+        with self.lock:
+            if self.state == self.OPEN:
+                return time.monotonic() - self.opened_at >= self.reset_timeout
+            return not (self.state == self.HALF_OPEN and self.trial_in_progress)
+
+    def record_success(self):
+        with self.lock:
+            self.state = self.CLOSED
+            self.failure_count = 0
+            self.trial_in_progress = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failure_count += 1
+            if (
+                self.state == self.HALF_OPEN
+                or self.failure_count >= self.failure_threshold
+            ):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+            self.trial_in_progress = False
+
+    # releases the trial request of a half open breaker without a result,
+    # e.g. when no client could be checked out to send it
+    def release(self):
+        with self.lock:
+            self.trial_in_progress = False
+
+    def get_state(self):
+        with self.lock:
+            if (
+                self.state == self.OPEN
+                and time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                return self.HALF_OPEN
+            return self.state
@@ -13,6 +13,10 @@ class Client:
         self.poller = zmq.Poller()
         self.poller.register(self.socket, zmq.POLLIN)
 
+        # a REQ socket whose request was not answered cannot send another
+        # request, such a client must be closed and replaced
+        self.healthy = True
+
     # returns the time of the last request
     def lastRequestTime(self):
         return self.last_request_time
@@ -20,16 +24,32 @@ class Client:
     # does a request, waits for a response and returns it.
     # if the response times out then an Exception is thrown.
     def requestResponse(self, request, timeout):
-        self.socket.send_json(request)
+        try:
+            self.socket.send_json(request)
+        except Exception:
+            self.healthy = False
+            raise
 
         sockets = dict(self.poller.poll(timeout))
         if self.socket in sockets:
             response = self.socket.recv_json()
             return response
         else:
+            self.healthy = False
             raise Exception("Request timeout")
 
+    # sends a cheap request and returns whether the server answered within
+    # timeout ms. Any answer, even an error code, shows that the socket and
+    # the server are alive
+    def probe(self, timeout):
+        try:
+            self.requestResponse({"request": "reportVersions"}, timeout)
+        except Exception:
+            return False
+        return True
+
     def close(self):
+        self.healthy = False
         self.poller.unregister(self.socket)
         self.socket.setsockopt(zmq.LINGER, 0)
         self.socket.close()
@@ -0,0 +1,178 @@
+import threading
+import time
+from collections import deque
+
+from .circuit_breaker import CircuitBreaker
+from .client import Client
+
+
+# pool of ready clients for one or more snapgene server daemons.
+# the caller must supply a dict of server indices to tcp ports, as returned
+# by Config.get_server_ports(), and a zmq context. For each server, size
+# clients are kept ready. A client is checked out for the duration of one
+# or more requests and must be checked in again afterwards.
+# each server has a circuit breaker, see CircuitBreaker, which callers use
+# to skip servers that are down.
+# a client that was idle for more than probe_after seconds is probed on
+# checkout, see Client.probe, and replaced if its server does not answer
+# within probe_timeout ms, so that a dead socket is not found by failing a
+# real request. Clients in use are checked by their requests.
+class ClientPool:
+    def __init__(
+        self,
+        tcp_ports,
+        zmq_context,
+        size=2,
+        checkout_timeout=5.0,
+        failure_threshold=3,
+        reset_timeout=30.0,
+        probe_after=60.0,
+        probe_timeout=1000,
+    ):
+        if not tcp_ports:
+            raise Exception("No snapgene server is enabled in the configuration file")
+
+        self.tcp_ports = dict(tcp_ports)
+        self.zmq_context = zmq_context
+        self.size = size
+        self.checkout_timeout = checkout_timeout
+        self.probe_after = probe_after
+        self.probe_timeout = probe_timeout
+        self.condition = threading.Condition()
+        self.closed = False
+
+        # the order in which servers are tried, rotated on each checkout so that
+        # requests are spread across all daemons
+        self.server_order = deque(self.tcp_ports)
+
+        # idle clients and the number of clients that exist, per server
+        self.idle = {server_index: deque() for server_index in self.tcp_ports}
+        self.count = {server_index: 0 for server_index in self.tcp_ports}
+
+        self.breakers = {
+            server_index: CircuitBreaker(failure_threshold, reset_timeout)
+            for server_index in self.tcp_ports
+        }
+
+        for server_index in self.tcp_ports:
+            for _ in range(self.size):
+                self.idle[server_index].append(self.new_client(server_index))
+
+    def new_client(self, server_index):
+        client = Client(self.tcp_ports[server_index], self.zmq_context)
+        client.server_index = server_index
+        client.idle_since = time.monotonic()
+        self.count[server_index] += 1
+        return client
+
+    def discard_client(self, client):
+        self.count[client.server_index] -= 1
+        try:
+            client.close()
+        except Exception:
+            pass
+
+    # returns the indices of the servers in the order they should be tried.
+    # if server_index is given, only that server is tried
+    def get_server_order(self, server_index=None):
+        if server_index is not None:
+            return [server_index]
+        self.server_order.rotate(-1)
+        return list(self.server_order)
+
+    # returns the indices of the servers whose circuit breaker is not open,
+    # in the order they should be tried
+    def get_available_servers(self):
+        with self.condition:
+            server_indices = self.get_server_order()
+        return [
+            server_index
+            for server_index in server_indices
+            if self.breakers[server_index].is_available()
+        ]
+
+    # get an idle, healthy client or create a new one if a server has
+    # fewer than size clients. Returns None if neither is possible
+    def take_client(self, server_index=None):
+        server_indices = self.get_server_order(server_index)
+
+        for index in server_indices:
+            idle_clients = self.idle[index]
+            while idle_clients:
+                client = idle_clients.pop()
+                if client.healthy:
+                    return client
+                self.discard_client(client)
+
+        for index in server_indices:
+            if self.count[index] < self.size:
+                return self.new_client(index)
+
+        return None
+
+    # whether a client was idle long enough to be probed before use
+    def needs_probe(self, client):
+        return (
+            self.probe_after is not None
+            and time.monotonic() - client.idle_since > self.probe_after
+        )
+
+    # check out a client, waiting up to timeout seconds for one to
+    # become available. If none does, an Exception is thrown
+    def checkout(self, server_index=None, timeout=None):
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            with self.condition:
+                while True:
+                    if self.closed:
+                        raise Exception("The snapgene client pool is closed")
+
+                    client = self.take_client(server_index)
+                    if client:
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise Exception("No snapgene client available")
+                    self.condition.wait(remaining)
+
+            # the probe is sent without holding the lock. A client that fails
+            # it is unhealthy, checking it in discards it
+            if not self.needs_probe(client) or client.probe(self.probe_timeout):
+                return client
+            self.checkin(client)
+
+    # return a client to the pool. Clients whose last request failed are
+    # closed, a replacement is created when next needed
+    def checkin(self, client):
+        with self.condition:
+            if self.closed or not client.healthy:
+                self.discard_client(client)
+            else:
+                client.idle_since = time.monotonic()
+                self.idle[client.server_index].append(client)
+            self.condition.notify()
+
+    # returns the number of idle and existing clients and the state of the
+    # circuit breaker per server
+    def status(self):
+        with self.condition:
+            return {
+                server_index: {
+                    "port": self.tcp_ports[server_index],
+                    "idle": len(self.idle[server_index]),
+                    "clients": self.count[server_index],
+                    "breaker": self.breakers[server_index].get_state(),
+                }
+                for server_index in self.tcp_ports
+            }
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            for idle_clients in self.idle.values():
+                while idle_clients:
+                    self.discard_client(idle_clients.pop())
+            self.condition.notify_all()
@@ -1,11 +1,14 @@
 import configparser
 
 
+DEFAULT_CONFIG_PATH = "/etc/snapgene-server/snapgene-server.conf"
+
+
 class Config:
-    def __init__(self):
+    def __init__(self, config_path=None):
         # read the config file first
         self.cfile = configparser.RawConfigParser()
-        self.cfile.read("/etc/snapgene-server/snapgene-server.conf")
+        self.cfile.read(config_path or DEFAULT_CONFIG_PATH)
 
     # lookup the tcp port to use for a particular server index.  If
     # the port is not specified or if enable=0, then 0 is returned.
@@ -47,6 +50,15 @@ class Config:
         return ret
 
 
+# returns the contents of a configuration file for servers on the given
+# tcp ports, e.g. for stand-in servers
+def format_config(tcp_ports):
+    return "".join(
+        "[server%s]\nenable = 1\ntcpPort = %s\n\n" % (i, port)
+        for i, port in enumerate(tcp_ports, 1)
+    )
+
+
 # prase the pidfile
 # pidfileDir = config.get("common","pidfileDir");
 # print "dir is %s " % pidfileDir;
@@ -1,8 +1,10 @@
 import argparse
+import asyncio
 import json
 import sys
 
 import zmq
+from pyclasses.async_multi_client import AsyncMultiClient
 from pyclasses.config import Config
 from pyclasses.multi_client import MutliClient
 
@@ -36,6 +38,22 @@ parser.add_argument(
     help="timeout for any one request in seconds.  For multiple commands as long as one command "
     "is finished before TIMEOUT then the dispatcher will continue.  The default is 10 seconds.",
 )
+parser.add_argument(
+    "-C",
+    metavar="CONFIG",
+    default=None,
+    help="read the server configuration from the CONFIG file instead of "
+    "/etc/snapgene-server/snapgene-server.conf, e.g. for stand-in servers",
+)
+parser.add_argument(
+    "-a",
+    metavar="IN_FLIGHT",
+    type=int,
+    default=0,
+    help="use the asyncio dispatcher, which sends up to IN_FLIGHT requests to each server "
+    "at once. TIMEOUT then applies to each request and the response times are summarized "
+    "at the end.  By default, requests are sent one at a time per server",
+)
 parser.add_argument(
     "-v",
     metavar="VERBOSITY",
@@ -85,7 +103,7 @@ else:
 
 # load the configuration.  If a specific index is specified just read that
 try:
-    config = Config()
+    config = Config(args.C)
     if args.s == "any":
         all = False
         server_ports = config.get_server_ports()
@@ -102,7 +120,33 @@ except Exception as e:
     print("Reason:", e)
     sys.exit(2)
 
+
+# send the commands with the asyncio dispatcher and print the response times
+async def dispatch():
+    async with AsyncMultiClient(
+        server_ports, max_in_flight=args.a, verbosity=verbosity
+    ) as client:
+        await client.doBatch(commandList, all, int(args.t * 1000))
+        print(
+            json.dumps(
+                client.latency_histograms(),
+                sort_keys=True,
+                indent=4,
+                separators=(",", ":"),
+            )
+        )
+
+
 # send the commands
+if args.a > 0:
+    try:
+        asyncio.run(dispatch())
+    except Exception as e:
+        print("Error when dispatching messages")
+        print("Reason:", e)
+        sys.exit(3)
+    sys.exit(0)
+
 try:
     client = MutliClient(server_ports, zmq.Context(), verbosity)
     client.doBatch(commandList, all, int(args.t * 1000))
@@ -0,0 +1,215 @@
+import json
+import random
+import shutil
+import struct
+import threading
+import zlib
+
+import zmq
+
+from collection.shared.genbank import MapFeature, format_genbank
+from collection.shared.map_features import read_map
+from collection.shared.snapgene_dna import format_dna
+
+COMPLEMENT = str.maketrans("ACGTN", "TGCAN")
+
+
+def format_png(width=1, height=1):
+    """Return a blank white PNG image"""
+
+    def chunk(chunk_type, data):
+        return (
+            struct.pack(">I", len(data))
+            + chunk_type
+            + data
+            + struct.pack(">I", zlib.crc32(chunk_type + data))
+        )
+
+    rows = b"".join(b"\x00" + b"\xff\xff\xff" * width for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(rows))
+        + chunk(b"IEND", b"")
+    )
+
+
+def find_primers(record, primers):
+    """Return primer_bind features for exact matches of primers on both
+    strands of a map"""
+
+    sequence = record.sequence.upper()
+    length = len(sequence)
+    features = []
+    for primer in primers:
+        primer_sequence = primer["Sequence"].upper()
+        if not primer_sequence or len(primer_sequence) > length:
+            continue
+        # For circular maps, also find primers that bind across the origin
+        template = sequence + (
+            sequence[: len(primer_sequence) - 1] if record.circular else ""
+        )
+        for strand, query in (
+            (1, primer_sequence),
+            (-1, primer_sequence.translate(COMPLEMENT)[::-1]),
+        ):
+            start = template.find(query)
+            while start != -1 and start < length:
+                end = start + len(query)
+                segments = (
+                    [(start + 1, end)]
+                    if end <= length
+                    else [(start + 1, length), (1, end - length)]
+                )
+                features.append(
+                    MapFeature(primer["Name"], "primer_bind", segments, strand)
+                )
+                start = template.find(query, start + 1)
+    return features
+
+
+class StandInServer:
+    """Stand-in for a SnapGene server daemon, for development and
+    benchmarks without a SnapGene license. It answers the requests sent by
+    this project on a zmq REP socket, one at a time like SnapGene server,
+    using simple implementations: common features are not detected,
+    previews are blank images and only exact primer matches are found.
+
+    Each request takes latency (+ up to jitter) seconds. A fraction
+    failure_rate of the requests fail with error code 1, a fraction
+    timeout_rate is only answered after timeout_delay seconds"""
+
+    def __init__(
+        self,
+        tcp_port,
+        zmq_context=None,
+        latency=0.0,
+        jitter=0.0,
+        failure_rate=0.0,
+        timeout_rate=0.0,
+        timeout_delay=60.0,
+        seed=None,
+    ):
+        self.tcp_port = tcp_port
+        self.zmq_context = zmq_context or zmq.Context.instance()
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self.timeout_delay = timeout_delay
+        self.random = random.Random(seed)
+        self.stopped = threading.Event()
+        self.thread = None
+        self.request_count = 0
+
+        self.handlers = {
+            "detectFeatures": self.detect_features,
+            "generatePNGMap": self.generate_png_map,
+            "exportDNAFile": self.export_dna_file,
+            "reportFeatures": self.report_features,
+            "importDNAFile": self.import_dna_file,
+            "importPrimersFromList": self.import_primers_from_list,
+            "reportVersions": self.report_versions,
+        }
+
+    def start(self):
+        socket = self.zmq_context.socket(zmq.REP)
+        socket.setsockopt(zmq.LINGER, 0)
+        socket.bind(f"tcp://127.0.0.1:{self.tcp_port}")
+        self.thread = threading.Thread(target=self.serve, args=(socket,), daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+
+    def serve(self, socket):
+        poller = zmq.Poller()
+        poller.register(socket, zmq.POLLIN)
+        try:
+            while not self.stopped.is_set():
+                if not poller.poll(100):
+                    continue
+                request = socket.recv_json()
+                socket.send_json(self.respond(request))
+        finally:
+            socket.close()
+
+    def respond(self, request):
+        self.request_count += 1
+        delay = self.latency + self.random.uniform(0, self.jitter)
+        fate = self.random.random()
+
+        if fate < self.timeout_rate:
+            self.stopped.wait(self.timeout_delay)
+            return {"code": 1, "error": "Injected timeout"}
+
+        self.stopped.wait(delay)
+
+        if fate < self.timeout_rate + self.failure_rate:
+            return {"code": 1, "error": "Injected failure"}
+
+        handler = self.handlers.get(request.get("request"))
+        if handler is None:
+            return {"code": 2, "error": f"Unknown request {request.get('request')}"}
+
+        try:
+            response = handler(request) or {}
+        except Exception as err:
+            return {"code": 3, "error": str(err)}
+
+        response["code"] = 0
+        return response
+
+    def detect_features(self, request):
+        if request["inputFile"] != request["outputFile"]:
+            shutil.copyfile(request["inputFile"], request["outputFile"])
+
+    def generate_png_map(self, request):
+        with open(request["outputPng"], "wb") as fhandle:
+            fhandle.write(format_png())
+
+    def export_dna_file(self, request):
+        with open(request["outputFile"], "w") as fhandle:
+            fhandle.write(format_genbank(read_map(request["inputFile"])))
+
+    def report_features(self, request):
+        return {
+            "features": [
+                {"name": feature.name, "type": feature.type}
+                for feature in read_map(request["inputFile"]).features
+                if feature.type != "source"
+            ]
+        }
+
+    def import_dna_file(self, request):
+        with open(request["outputFile"], "wb") as fhandle:
+            fhandle.write(format_dna(read_map(request["inputFile"])))
+
+    def import_primers_from_list(self, request):
+        record = read_map(request["inputFile"])
+        with open(request["inputPrimersFile"]) as fhandle:
+            primers = json.load(fhandle)
+        record.features = record.features + find_primers(record, primers)
+
+        with open(request["outputFile"], "wb") as fhandle:
+            fhandle.write(format_dna(record))
+
+    def report_versions(self, request):
+        return {"serverVersion": "stand-in"}
+
+
+def start_stand_in_servers(tcp_ports, **kwargs):
+    """Start a stand-in server for each port. Returns a dict of server
+    indices to ports, as returned by Config.get_server_ports(), and the
+    servers"""
+
+    servers = []
+    for tcp_port in tcp_ports:
+        server = StandInServer(tcp_port, **kwargs)
+        server.start()
+        servers.append(server)
+
+    return {i: port for i, port in enumerate(tcp_ports, 1)}, servers
@@ -0,0 +1,48 @@
+// For /templates/admin/collection/map_status.html
+
+// While a map is pending or being processed, poll its status and update
+// the status shown at the top of the change form
+
+const mapStatusPollInterval = 3000;
+
+function updateMapStatus() {
+  const statusElement = document.getElementById("map-status");
+  if (statusElement === null) return;
+
+  const status = statusElement.dataset.status;
+  if (status !== "pending" && status !== "processing") return;
+
+  fetch(statusElement.dataset.url, { cache: "no-store" })
+    .then((response) => response.json())
+    .then((data) => {
+      statusElement.classList.remove(`map-status-${status}`);
+      statusElement.classList.add(`map-status-${data.status}`);
+      statusElement.dataset.status = data.status;
+      statusElement.getElementsByClassName("map-status-display")[0].innerText =
+        data.status_display;
+      statusElement.getElementsByClassName("map-status-message")[0].innerText =
+        data.message;
+
+      if (data.status === "pending" || data.status === "processing") {
+        setTimeout(updateMapStatus, mapStatusPollInterval);
+      } else if (data.status === "done") {
+        if (data.missing_features.length > 0) {
+          const missingFeatures = document.createElement("span");
+          missingFeatures.classList.add("missing-formz-features");
+          missingFeatures.style = "background-color:rgba(255,0,0,0.2)";
+          missingFeatures.innerText = data.missing_features.join(", ");
+          statusElement.appendChild(missingFeatures);
+        }
+        // Offer to reload the page to show the new map files and features
+        const reloadLink = document.createElement("a");
+        reloadLink.href = window.location.href;
+        reloadLink.innerText = " Reload page";
+        statusElement.appendChild(reloadLink);
+      }
+    })
+    .catch(() => setTimeout(updateMapStatus, mapStatusPollInterval));
+}
+
+window.addEventListener("load", () =>
+  setTimeout(updateMapStatus, mapStatusPollInterval)
+);